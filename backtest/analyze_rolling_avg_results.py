@@ -5,110 +5,303 @@
 使い方:
   python analyze_rolling_avg_results.py
   python analyze_rolling_avg_results.py 2023-08  # 指定月以降のみ分析
+  python analyze_rolling_avg_results.py --input backtest_horizon_results.csv --top 20  # 大きな結果ファイルも一定メモリで集計
+  python analyze_rolling_avg_results.py --periods 2022-03,2023-08        # 期間ごとの精度を比較
+  python analyze_rolling_avg_results.py --heatmap stability_heatmap.csv  # 全ての開始月・終了月の組の精度
+  python analyze_rolling_avg_results.py --profile                        # ステージごとの時間・メモリを出力
 """
 
-import sys
+import argparse
 import csv
+import heapq
 import math
-from typing import List, Dict
-from datetime import datetime
-
-def load_results(csv_path: str) -> List[Dict]:
-    """バックテスト結果を読み込む"""
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        return list(reader)
-
-def filter_by_start_month(results: List[Dict], start_month: str) -> List[Dict]:
-    """指定月以降の結果のみを抽出"""
-    return [r for r in results if r['target_month'] >= start_month]
-
-def calculate_metrics(errors: List[float]) -> Dict:
-    """誤差指標を計算"""
-    n = len(errors)
-    if n == 0:
-        return {'mean': 0, 'mae': 0, 'rmse': 0}
-
-    mean_error = sum(errors) / n
-    mae = sum(abs(e) for e in errors) / n
-    rmse = math.sqrt(sum(e**2 for e in errors) / n)
-
-    return {
-        'mean': mean_error,
-        'mae': mae,
-        'rmse': rmse
-    }
-
-def analyze_distribution(errors: List[float]) -> Dict[str, int]:
-    """誤差分布を計算"""
-    bins = {
-        '0-1%': 0,
-        '1-2%': 0,
-        '2-3%': 0,
-        '3-5%': 0,
-        '5-10%': 0,
-        '10%+': 0
-    }
-
-    for e in errors:
-        abs_e = abs(e)
-        if abs_e < 1:
-            bins['0-1%'] += 1
-        elif abs_e < 2:
-            bins['1-2%'] += 1
-        elif abs_e < 3:
-            bins['2-3%'] += 1
-        elif abs_e < 5:
-            bins['3-5%'] += 1
-        elif abs_e < 10:
-            bins['5-10%'] += 1
-        else:
-            bins['10%+'] += 1
-
-    return bins
-
-def get_worst_predictions(results: List[Dict], pair: str, n: int = 5) -> List[Dict]:
-    """最も外れた予想を取得"""
-    pair_results = []
-    for r in results:
-        error = abs(float(r[f'error_pct_{pair}']))
-        pair_results.append({
-            'month': r['target_month'],
-            'error': error,
-            'pred': float(r[f'pred_{pair}']),
-            'actual': float(r[f'actual_{pair}'])
-        })
-
-    pair_results.sort(key=lambda x: x['error'], reverse=True)
-    return pair_results[:n]
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+from profiling import add_profile_argument, setup_profiler
+
+PAIRS = ('USDJPY', 'USDTRY', 'TRYJPY')
+
+# 誤差分布の区間（|誤差| の上限、最後の区間は上限なし）
+BIN_EDGES = (1, 2, 3, 5, 10)
+BIN_NAMES = ('0-1%', '1-2%', '2-3%', '3-5%', '5-10%', '10%+')
+
+class PairMetrics:
+    """
+    1通貨ペアの誤差を1行ずつ集計（メモリは上位 k 件分のみ）
+
+    平均誤差・MAE・RMSE は合計から、誤差分布は区間の二分探索、
+    最も外れた予想は大きさ k のヒープで求める。
+    """
+
+    def __init__(self, top_k: int = 5):
+        self.top_k = top_k
+        self.count = 0
+        self.sum = 0.0
+        self.abs_sum = 0.0
+        self.sq_sum = 0.0
+        self.bins = [0] * len(BIN_NAMES)
+        self._worst = []  # (|誤差|, -行番号, 月, 予想, 実績) の最小ヒープ
+
+    def add(self, error: float, month: str, pred: float, actual: float):
+        abs_error = abs(error)
+        self.count += 1
+        self.sum += error
+        self.abs_sum += abs_error
+        self.sq_sum += error**2
+        self.bins[bisect_right(BIN_EDGES, abs_error)] += 1
+
+        # 同じ誤差なら先に出た行を優先（-行番号が大きいほど先）
+        if len(self._worst) < self.top_k:
+            heapq.heappush(self._worst, (abs_error, -self.count, month, pred, actual))
+        elif abs_error > self._worst[0][0]:
+            heapq.heapreplace(self._worst, (abs_error, -self.count, month, pred, actual))
+
+    def metrics(self) -> Dict:
+        """誤差指標（平均誤差・MAE・RMSE）"""
+        n = self.count
+        if n == 0:
+            return {'mean': 0, 'mae': 0, 'rmse': 0}
+        return {
+            'mean': self.sum / n,
+            'mae': self.abs_sum / n,
+            'rmse': math.sqrt(self.sq_sum / n)
+        }
+
+    def distribution(self) -> Dict[str, int]:
+        """誤差分布"""
+        return dict(zip(BIN_NAMES, self.bins))
+
+    def worst(self) -> List[Dict]:
+        """最も外れた予想（誤差の大きい順）"""
+        return [{'month': month, 'error': error, 'pred': pred, 'actual': actual}
+                for error, _, month, pred, actual in sorted(self._worst, reverse=True)]
+
+class ResultsSummary:
+    """バックテスト結果を1回の走査で集計した結果"""
+
+    def __init__(self, pairs: Iterable[str] = PAIRS, top_k: int = 5):
+        self.pairs = {pair: PairMetrics(top_k) for pair in pairs}
+        self.total_count = 0
+        self.count = 0
+        self.first_month = None
+        self.last_month = None
+
+def summarize_results(csv_path: str, start_month: str = None, top_k: int = 5,
+                      pairs: Iterable[str] = PAIRS, end_month: str = None) -> ResultsSummary:
+    """
+    バックテスト結果CSVを1行ずつ読みながら全ての指標を集計
+
+    ファイル全体を読み込まないので、大規模なスイープの結果（数億行）でもメモリは一定。
+
+    Args:
+        start_month: 指定月以降（target_month >= start_month）の行だけを集計
+        end_month: 指定月より前（target_month < end_month）の行だけを集計
+    """
+    summary = ResultsSummary(pairs, top_k)
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        target = header.index('target_month')
+        columns = [(summary.pairs[pair], header.index(f'error_pct_{pair}'),
+                    header.index(f'pred_{pair}'), header.index(f'actual_{pair}'))
+                   for pair in summary.pairs]
+
+        for row in reader:
+            summary.total_count += 1
+            month = row[target]
+            if (start_month and month < start_month) or (end_month and month >= end_month):
+                continue
+            summary.count += 1
+            if summary.first_month is None:
+                summary.first_month = month
+            summary.last_month = month
+            for metrics, error, pred, actual in columns:
+                metrics.add(float(row[error]), month, float(row[pred]), float(row[actual]))
+
+    return summary
+
+class ErrorIndex:
+    """
+    誤差の累積和インデックス（target_month 順）
+
+    Σe・Σ|e|・Σe² の累積和を一度だけ作っておき、任意の期間 [start, end) の
+    平均誤差・MAE・RMSE を累積和の差から O(1) で求める（期間の境界は二分探索）。
+    開始月ごとに結果を絞り込み直す必要がない。
+    """
+
+    def __init__(self, months: List[str], errors: Dict[str, np.ndarray]):
+        order = sorted(range(len(months)), key=months.__getitem__)
+        self.months = [months[i] for i in order]
+        self.pairs = tuple(errors)
+        self._prefix = {}
+        for pair, values in errors.items():
+            e = np.asarray(values, dtype=np.float64)[order]
+            self._prefix[pair] = tuple(np.concatenate(([0.0], np.cumsum(x))) for x in (e, np.abs(e), e * e))
+
+    @classmethod
+    def from_csv(cls, csv_path: str, pairs: Iterable[str] = PAIRS) -> 'ErrorIndex':
+        """結果CSVから target_month と誤差列だけを読んで作る"""
+        pairs = tuple(pairs)
+        months = []
+        errors = {pair: array('d') for pair in pairs}
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            target = header.index('target_month')
+            columns = [(errors[pair], header.index(f'error_pct_{pair}')) for pair in pairs]
+            for row in reader:
+                months.append(row[target])
+                for values, i in columns:
+                    values.append(float(row[i]))
+        return cls(months, {pair: np.frombuffer(values) for pair, values in errors.items()})
+
+    def span(self, start_month: str = None, end_month: str = None) -> Tuple[int, int]:
+        """期間 [start_month, end_month) の行の範囲"""
+        i = bisect_left(self.months, start_month) if start_month else 0
+        j = bisect_left(self.months, end_month) if end_month else len(self.months)
+        return i, max(i, j)
+
+    def metrics(self, pair: str, start_month: str = None, end_month: str = None) -> Dict:
+        """期間 [start_month, end_month) の件数・平均誤差・MAE・RMSE"""
+        i, j = self.span(start_month, end_month)
+        n = j - i
+        if n == 0:
+            return {'count': 0, 'mean': 0, 'mae': 0, 'rmse': 0}
+        total, abs_total, sq_total = (float(p[j] - p[i]) for p in self._prefix[pair])
+        return {
+            'count': n,
+            'mean': total / n,
+            'mae': abs_total / n,
+            'rmse': math.sqrt(max(sq_total, 0.0) / n)
+        }
+
+    def heatmap(self, pair: str, min_months: int = 1) -> Dict[str, np.ndarray]:
+        """
+        全ての (開始月, 終了月) の組の誤差指標
+
+        Returns:
+            {'months': 月の一覧 (U,), 'count' / 'mean' / 'mae' / 'rmse': (開始月, 終了月) の行列}
+            終了月はその月を含む。開始月 > 終了月、または月数が min_months 未満の要素は NaN
+        """
+        months, first = np.unique(np.array(self.months), return_index=True)
+        bounds = np.append(first, len(self.months))
+        lo, hi = bounds[:-1][:, None], bounds[1:][None, :]
+        count = (hi - lo).astype(np.float64)
+
+        span = np.arange(len(months))
+        valid = (span[None, :] - span[:, None] + 1) >= min_months
+        with np.errstate(invalid='ignore', divide='ignore'):
+            total, abs_total, sq_total = ((p[hi] - p[lo]) / count for p in self._prefix[pair])
+        result = {
+            'months': months,
+            'count': count,
+            'mean': total,
+            'mae': abs_total,
+            'rmse': np.sqrt(np.maximum(sq_total, 0.0)),
+        }
+        for name in ('count', 'mean', 'mae', 'rmse'):
+            result[name] = np.where(valid & (count > 0), result[name], np.nan)
+        return result
+
+def write_heatmap(index: ErrorIndex, output_file: str, min_months: int = 1):
+    """全ての (開始月, 終了月) の組の誤差指標を縦長CSVに保存"""
+    maps = {pair: index.heatmap(pair, min_months) for pair in index.pairs}
+    first = maps[index.pairs[0]]
+    months = first['months'].tolist()
+    starts, ends = np.nonzero(~np.isnan(first['count']))
+
+    fieldnames = ['start_month', 'end_month', 'count']
+    for pair in index.pairs:
+        fieldnames += [f'mae_{pair}', f'rmse_{pair}', f'bias_{pair}']
+    columns = [[months[i] for i in starts.tolist()], [months[j] for j in ends.tolist()],
+               first['count'][starts, ends].astype(np.int64).tolist()]
+    for pair in index.pairs:
+        for name in ('mae', 'rmse', 'mean'):
+            columns.append(maps[pair][name][starts, ends].tolist())
+
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(zip(*columns))
+
+def parse_periods(spec: str) -> List[Tuple[str, str]]:
+    """'2022-03,2023-08:2025-01' を [(開始月, 終了月), ...] に変換（終了月は含まない）"""
+    periods = []
+    for part in spec.split(','):
+        start, _, end = part.partition(':')
+        periods.append((start or None, end or None))
+    return periods
 
 def main():
-    csv_path = 'backtest_rolling_avg_results.csv'
+    parser = argparse.ArgumentParser(description='3カ月平均ベースのバックテスト結果を分析')
+    parser.add_argument('start_month', nargs='?', help='指定月以降のみ分析（例: 2023-08）')
+    parser.add_argument('--input', default='backtest_rolling_avg_results.csv', help='バックテスト結果CSV')
+    parser.add_argument('--top', type=int, default=5, help='最も外れた予想の表示件数')
+    parser.add_argument('--end', help='指定月より前のみ分析（例: 2025-01）')
+    parser.add_argument('--periods', help='期間ごとの精度を比較（例: 2022-03,2023-08 や 2023-08:2025-01）')
+    parser.add_argument('--heatmap', help='全ての開始月・終了月の組の精度をCSVに保存')
+    parser.add_argument('--min-months', type=int, default=1, help='--heatmap に含める最短の月数')
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    prof = setup_profiler('analyze_rolling_avg_results', args.profile)
+
+    if args.periods or args.heatmap:
+        # 累積和インデックスで期間ごとの精度を O(1) で求める
+        with prof.stage('load') as stage:
+            index = ErrorIndex.from_csv(args.input)
+            stage.rows = len(index.months)
+        if args.periods:
+            print(f"{'期間':<20} {'件数':>5} " + ' '.join(f"{pair + ' MAE':>11} {'RMSE':>6} {'bias':>6}" for pair in index.pairs))
+            print("-" * 90)
+            for start, end in parse_periods(args.periods):
+                label = f"{start or '最初'} 〜 {end or ''}".strip()
+                line = f"{label:<20} {index.metrics(index.pairs[0], start, end)['count']:>5} "
+                for pair in index.pairs:
+                    m = index.metrics(pair, start, end)
+                    line += f" {m['mae']:>10.2f}% {m['rmse']:>5.2f}% {m['mean']:>+5.2f}%"
+                print(line)
+        if args.heatmap:
+            with prof.stage('analyze', rows=len(index.months)):
+                write_heatmap(index, args.heatmap, args.min_months)
+            print(f"\n[OK] Heatmap saved to {args.heatmap}")
+        return
+
+    csv_path = args.input
 
     # 開始月の指定
-    start_month = sys.argv[1] if len(sys.argv) > 1 else None
+    start_month = args.start_month
 
     print("=" * 70)
     print("3カ月平均ベース バックテスト結果分析")
     print("=" * 70)
 
-    # データ読み込み
-    results = load_results(csv_path)
-    total_count = len(results)
+    # データを1回だけ走査して全ての指標を集計
+    with prof.stage('analyze') as stage:
+        summary = summarize_results(csv_path, start_month, args.top, end_month=args.end)
+        stage.rows = summary.total_count
+    pairs = list(summary.pairs)
 
-    if start_month:
-        results = filter_by_start_month(results, start_month)
+    if start_month and args.end:
+        print(f"\n分析期間: {start_month} 以降 {args.end} より前")
+    elif start_month:
         print(f"\n分析期間: {start_month} 以降")
+    elif args.end:
+        print(f"\n分析期間: {args.end} より前")
     else:
         print(f"\n分析期間: 全期間")
 
-    print(f"対象月数: {len(results)}ヶ月 (全体: {total_count}ヶ月)")
-    if results:
-        print(f"期間: {results[0]['target_month']} 〜 {results[-1]['target_month']}")
+    print(f"対象月数: {summary.count}ヶ月 (全体: {summary.total_count}ヶ月)")
+    if summary.count:
+        print(f"期間: {summary.first_month} 〜 {summary.last_month}")
 
     # 各通貨ペアの分析
-    pairs = ['USDJPY', 'USDTRY', 'TRYJPY']
-
     print("\n" + "=" * 70)
     print("1. 精度指標サマリー")
     print("=" * 70)
@@ -117,11 +310,10 @@ def main():
 
     all_metrics = {}
     for pair in pairs:
-        errors = [float(r[f'error_pct_{pair}']) for r in results]
-        metrics = calculate_metrics(errors)
+        metrics = summary.pairs[pair].metrics()
         all_metrics[pair] = metrics
 
-        print(f"{pair:<10} {len(errors):<6} {metrics['mean']:>+8.2f}%  {metrics['mae']:>10.2f}%  {metrics['rmse']:>8.2f}%")
+        print(f"{pair:<10} {summary.pairs[pair].count:<6} {metrics['mean']:>+8.2f}%  {metrics['mae']:>10.2f}%  {metrics['rmse']:>8.2f}%")
 
     # 誤差分布
     print("\n" + "=" * 70)
@@ -129,22 +321,22 @@ def main():
     print("=" * 70)
 
     for pair in pairs:
-        errors = [float(r[f'error_pct_{pair}']) for r in results]
-        distribution = analyze_distribution(errors)
+        count = summary.pairs[pair].count
+        distribution = summary.pairs[pair].distribution()
 
         print(f"\n{pair}:")
-        for bin_name, count in distribution.items():
-            pct = (count / len(errors)) * 100 if errors else 0
+        for bin_name, n in distribution.items():
+            pct = (n / count) * 100 if count else 0
             bar = "■" * int(pct / 2)
-            print(f"  {bin_name:<8}: {count:>3}件 ({pct:>5.1f}%) {bar}")
+            print(f"  {bin_name:<8}: {n:>3}件 ({pct:>5.1f}%) {bar}")
 
     # 最も外れた予想
     print("\n" + "=" * 70)
-    print("3. 最も外れた予想 Top 5")
+    print(f"3. 最も外れた予想 Top {args.top}")
     print("=" * 70)
 
     for pair in pairs:
-        worst = get_worst_predictions(results, pair, 5)
+        worst = summary.pairs[pair].worst()
         print(f"\n{pair}:")
         for i, w in enumerate(worst, 1):
             print(f"  {i}. {w['month']}: 誤差 {w['error']:.2f}% (予想 {w['pred']:.2f} vs 実績 {w['actual']:.2f})")
@@ -183,7 +375,7 @@ def main():
         print(f"  {pair}: {mean_error:+.2f}% ({bias_str})")
 
     # 期間別比較の提案
-    if not start_month and len(results) >= 28:
+    if not start_month and summary.count >= 28:
         print("\n" + "=" * 70)
         print("安定期のみの分析を見るには:")
         print(f"  python {sys.argv[0]} 2023-08")
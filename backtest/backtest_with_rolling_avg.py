@@ -7,21 +7,150 @@
 使い方:
   python backtest_with_rolling_avg.py --base-month 2022-03
   python backtest_with_rolling_avg.py --output my_results.csv
+  python backtest_with_rolling_avg.py --comprehensive --point-in-time  # 基準月時点で公表済みのPPPのみ使用
+  python backtest_with_rolling_avg.py --comprehensive --vectorized --quiet  # 配列演算で一括実行
+  python backtest_with_rolling_avg.py --comprehensive --vectorized --json   # 誤差統計をJSONで出力
+  python backtest_with_rolling_avg.py --horizons 1-12                       # 1〜12カ月先の予想を一括評価
+  python backtest_with_rolling_avg.py --comprehensive --vectorized --profile # ステージごとの時間・メモリを出力
 """
 
 import argparse
 import csv
+import json
 import math
+import os
+import sys
 from typing import Dict, List, Tuple
 
-def load_monthly_data(csv_path: str) -> List[Dict]:
-    """月次MCIデータ（3カ月平均含む）を読み込む"""
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        return list(reader)
+import numpy as np
 
-def get_month_data(data: List[Dict], target_month: str) -> Dict:
-    """指定月のデータを取得"""
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+from columnar import load_columns
+from ppp_store import PPPStore, load_ppp_store
+from profiling import add_profile_argument, setup_profiler
+
+# get_month_data が返す数値列
+MONTH_FIELDS = ('m_USD', 'm_JPY', 'm_TRY',
+                'avg_delta_m_USD_3m', 'avg_delta_m_JPY_3m', 'avg_delta_m_TRY_3m',
+                'S_USDJPY', 'S_USDTRY', 'S_TRYJPY', 'PPP_JPY', 'PPP_TRY')
+OPTIONAL_FIELDS = ('avg_delta_m_USD_3m', 'avg_delta_m_JPY_3m', 'avg_delta_m_TRY_3m')
+
+def period_unit(period: str) -> str:
+    """期間ラベルの単位（'YYYY-MM' は M、'YYYY-MM-DD' は D、'YYYY-MM-DDThh:mm:ss' は s）"""
+    return 'M' if len(period) == 7 else 'D' if len(period) == 10 else 's'
+
+def period_number(period: str) -> int:
+    """'YYYY-MM' は1970-01からの月数、'YYYY-MM-DD' は日数、時刻付きは1970-01-01からの秒数に変換"""
+    return int(np.datetime64(period, period_unit(period)).astype(np.int64))
+
+class PeriodData:
+    """
+    期間（月・日・時刻）で索引付けした月次MCIデータ
+
+    読み込み時に一度だけ各列を float64 配列に変換し、期間番号（1970年からの月数・日数・秒数）
+    から行番号への索引を作る。get / next_period はどちらも O(1)。
+    """
+
+    def __init__(self, rows: List[Dict]):
+        self._setup([row['date'] for row in rows], {
+            name: np.array([float(row[name]) if row[name] else np.nan for row in rows])
+            for name in MONTH_FIELDS
+        })
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> 'PeriodData':
+        """列配列（columnar.load_columns の戻り値）から作る"""
+        dates = columns['date']
+        if np.asarray(dates).dtype.kind == 'M':
+            dates = np.datetime_as_string(dates)
+        data = cls.__new__(cls)
+        data._setup([str(d) for d in dates],
+                    {name: np.asarray(columns[name], dtype=np.float64) for name in MONTH_FIELDS})
+        return data
+
+    def _setup(self, dates: List[str], columns: Dict[str, np.ndarray]):
+        self.dates = dates
+        self.unit = period_unit(dates[0]) if dates else 'M'
+        self.periods = np.array(dates, dtype=f'datetime64[{self.unit}]').astype(np.int64)
+        self.columns = columns
+
+        # 期間が等間隔なら添字は (periods - first) / step、そうでなければ dict で引く
+        steps = np.diff(self.periods)
+        self._first = int(self.periods[0]) if len(dates) else 0
+        self._step = int(steps[0]) if len(steps) else 1
+        self._contiguous = bool(self._step > 0 and (steps == self._step).all())
+        self._position = None if self._contiguous else {p: i for i, p in enumerate(self.periods.tolist())}
+
+        # 行 dict 生成用（numpy スカラーを介さない）。配列演算だけなら作らない
+        self._values = None
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __iter__(self):
+        """従来の行リストと同様に {'date': ...} を順に返す"""
+        return ({'date': d} for d in self.dates)
+
+    def __getitem__(self, i: int) -> Dict:
+        return {'date': self.dates[i]}
+
+    def index(self, period: str) -> int:
+        """期間の行番号（存在しなければ ValueError）"""
+        p = period_number(period)
+        if self._contiguous:
+            i, r = divmod(p - self._first, self._step)
+            if r == 0 and 0 <= i < len(self.dates):
+                return i
+        elif p in self._position:
+            return self._position[p]
+        raise ValueError(f"Month {period} not found in data")
+
+    def row(self, i: int) -> Dict:
+        """行番号 i のデータ（get_month_data と同じ形式）"""
+        if self._values is None:
+            self._values = {name: values.tolist() for name, values in self.columns.items()}
+        result = {'date': self.dates[i]}
+        for name in MONTH_FIELDS:
+            value = self._values[name][i]
+            result[name] = None if name in OPTIONAL_FIELDS and value != value else value
+        return result
+
+    def get(self, period: str) -> Dict:
+        """指定期間のデータ"""
+        return self.row(self.index(period))
+
+    def next_period(self, period: str) -> str:
+        """次の期間（月次は暦の翌月、日次・時刻はデータ上の次の期間）"""
+        if len(period) == 7:
+            return get_next_month(period)
+        i = self.index(period) + 1
+        if i >= len(self.dates):
+            raise ValueError(f"No period after {period} in data")
+        return self.dates[i]
+
+    def target_indices(self, horizon: int = 1) -> np.ndarray:
+        """各行の horizon 期間先（月次は暦の月、日次・時刻は行）の行番号。対象がなければ -1"""
+        n = len(self.dates)
+        if self.unit != 'M':
+            return np.where(np.arange(n) + horizon < n, np.arange(n) + horizon, -1)
+        nxt = self.periods + horizon
+        pos = np.searchsorted(self.periods, nxt)
+        found = pos < n
+        found[found] = self.periods[pos[found]] == nxt[found]
+        return np.where(found, pos, -1)
+
+def load_monthly_data(csv_path: str) -> PeriodData:
+    """
+    月次MCIデータ（3カ月平均含む）を読み込み、期間で索引付けする
+
+    列指向形式（tools/columnar.py の <name>.cols）がCSVより新しければそちらをメモリマップで読む。
+    """
+    return PeriodData.from_columns(load_columns(csv_path, ('date',) + MONTH_FIELDS))
+
+def get_month_data(data, target_month: str) -> Dict:
+    """指定月のデータを取得（PeriodData なら O(1)、行リストなら線形探索）"""
+    if isinstance(data, PeriodData):
+        return data.get(target_month)
     for row in data:
         if row['date'] == target_month:
             return {
@@ -82,27 +211,44 @@ def predict_next_month_rates(base_data: Dict, target_ppp: Dict) -> Dict:
         'pred_m_TRY': pred_m_try
     }
 
-def run_single_backtest(data: List[Dict], base_month: str) -> Dict:
+def point_in_time_ppp(ppp_store: PPPStore, base_month: str, target_month: str) -> Dict:
+    """
+    基準月時点で公表済みだったPPPから予想対象月のPPPを取得
+
+    対象年の値が未公表なら、公表済みの直近年の値を使う（先読みしない）。
+    """
+    known = ppp_store.as_of(base_month)
+    return {
+        'PPP_JPY': known.known('JPY', target_month),
+        'PPP_TRY': known.known('TRY', target_month),
+    }
+
+def run_single_backtest(data, base_month: str, ppp_store: PPPStore = None) -> Dict:
     """
     単一月のバックテストを実行
 
     Args:
-        data: 全月次データ
-        base_month: 基準月 (YYYY-MM)
+        data: 全月次データ（PeriodData、または行 dict のリスト）
+        base_month: 基準月 (YYYY-MM、日次データなら YYYY-MM-DD)
+        ppp_store: 指定時は予想対象月のPPPを基準月時点のヴィンテージから取得
+                   （未指定時はデータ上の予想対象月PPPを使う従来方式）
 
     Returns:
         バックテスト結果
     """
-    target_month = get_next_month(base_month)
-
     try:
+        target_month = data.next_period(base_month) if isinstance(data, PeriodData) else get_next_month(base_month)
         base_data = get_month_data(data, base_month)
         target_data = get_month_data(data, target_month)
     except ValueError as e:
         return {'error': str(e)}
 
     # 予想を実行
-    prediction = predict_next_month_rates(base_data, target_data)
+    if ppp_store is not None:
+        target_ppp = point_in_time_ppp(ppp_store, base_month, target_month)
+    else:
+        target_ppp = target_data
+    prediction = predict_next_month_rates(base_data, target_ppp)
 
     if prediction is None:
         return {'error': f'No 3-month average data available for {base_month}'}
@@ -129,37 +275,40 @@ def run_single_backtest(data: List[Dict], base_month: str) -> Dict:
         'avg_delta_m_TRY': base_data['avg_delta_m_TRY_3m']
     }
 
-def run_comprehensive_backtest(data: List[Dict], output_file: str):
+def run_comprehensive_backtest(data, output_file: str, ppp_store: PPPStore = None, quiet: bool = False):
     """
     全期間のバックテストを実行
 
     Args:
-        data: 全月次データ
+        data: 全月次データ（行 dict のリストなら最初に一度だけ PeriodData に変換）
         output_file: 出力CSVファイル名
+        ppp_store: 指定時はポイントインタイムのPPPで予想（run_single_backtest 参照）
+        quiet: True なら進捗・結果を表示しない
     """
+    log = (lambda *args: None) if quiet else print
+    if not isinstance(data, PeriodData):
+        data = PeriodData(list(data))
     results = []
 
     # 2022-02から2025-10まで（2025-11を予想対象とするため）
-    for row in data:
-        base_month = row['date']
-
+    for base_month in data.dates:
         # 最終月はスキップ（予想対象がない）
-        if base_month == data[-1]['date']:
+        if base_month == data.dates[-1]:
             continue
 
-        print(f"Running backtest: {base_month} -> {get_next_month(base_month)}")
-        result = run_single_backtest(data, base_month)
+        log(f"Running backtest: {base_month} -> {data.next_period(base_month)}")
+        result = run_single_backtest(data, base_month, ppp_store)
 
         if 'error' in result:
-            print(f"  Skipped: {result['error']}")
+            log(f"  Skipped: {result['error']}")
             continue
 
         results.append(result)
 
         # 結果を表示
-        print(f"  USDJPY: {result['pred_USDJPY']:.2f} (actual: {result['actual_USDJPY']:.2f}, error: {result['error_pct_USDJPY']:+.2f}%)")
-        print(f"  USDTRY: {result['pred_USDTRY']:.2f} (actual: {result['actual_USDTRY']:.2f}, error: {result['error_pct_USDTRY']:+.2f}%)")
-        print(f"  TRYJPY: {result['pred_TRYJPY']:.2f} (actual: {result['actual_TRYJPY']:.2f}, error: {result['error_pct_TRYJPY']:+.2f}%)")
+        log(f"  USDJPY: {result['pred_USDJPY']:.2f} (actual: {result['actual_USDJPY']:.2f}, error: {result['error_pct_USDJPY']:+.2f}%)")
+        log(f"  USDTRY: {result['pred_USDTRY']:.2f} (actual: {result['actual_USDTRY']:.2f}, error: {result['error_pct_USDTRY']:+.2f}%)")
+        log(f"  TRYJPY: {result['pred_TRYJPY']:.2f} (actual: {result['actual_TRYJPY']:.2f}, error: {result['error_pct_TRYJPY']:+.2f}%)")
 
     # CSVに保存
     if results:
@@ -169,33 +318,278 @@ def run_comprehensive_backtest(data: List[Dict], output_file: str):
             writer.writeheader()
             writer.writerows(results)
 
-        print(f"\n[OK] Results saved to {output_file}")
-        print(f"  Total predictions: {len(results)}")
+        log(f"\n[OK] Results saved to {output_file}")
+        log(f"  Total predictions: {len(results)}")
     else:
         print("\n[ERROR] No valid results to save")
 
+# run_single_backtest / run_vectorized_backtest の出力列
+RESULT_FIELDS = ('base_month', 'target_month',
+                 'pred_USDJPY', 'actual_USDJPY', 'error_pct_USDJPY',
+                 'pred_USDTRY', 'actual_USDTRY', 'error_pct_USDTRY',
+                 'pred_TRYJPY', 'actual_TRYJPY', 'error_pct_TRYJPY',
+                 'avg_delta_m_USD', 'avg_delta_m_JPY', 'avg_delta_m_TRY')
+PAIRS = ('USDJPY', 'USDTRY', 'TRYJPY')
+
+def exp_exact(x: np.ndarray) -> np.ndarray:
+    """
+    要素ごとの math.exp
+
+    np.exp のSIMD実装は libm と最終ビットが異なることがあるため、
+    従来の predict_next_month_rates と完全に同じ値を出すためにこちらを使う。
+    """
+    return np.fromiter(map(math.exp, np.asarray(x).tolist()), dtype=np.float64, count=np.size(x))
+
+def summarize_errors(columns: Dict) -> Dict[str, Dict[str, float]]:
+    """通貨ペアごとの誤差統計（件数・MAE・RMSE・平均誤差）"""
+    summary = {}
+    for pair in PAIRS:
+        errors = np.asarray(columns[f'error_pct_{pair}'], dtype=np.float64)
+        n = len(errors)
+        summary[pair] = {
+            'count': n,
+            'mae': float(np.abs(errors).mean()) if n else math.nan,
+            'rmse': float(np.sqrt((errors ** 2).mean())) if n else math.nan,
+            'bias': float(errors.mean()) if n else math.nan,
+        }
+    return summary
+
+def run_vectorized_backtest(data: PeriodData, ppp_store: PPPStore = None) -> Dict:
+    """
+    全期間のバックテストを配列演算で一括実行（run_comprehensive_backtest と同じ結果）
+
+    Returns:
+        {'columns': {RESULT_FIELDS の列}, 'summary': summarize_errors の結果}
+    """
+    if not isinstance(data, PeriodData):
+        data = PeriodData(list(data))
+    c = data.columns
+
+    # 予想対象があり、3カ月平均のある基準月だけ
+    target = data.target_indices()
+    valid = (target >= 0) & ~np.isnan(c['avg_delta_m_USD_3m'])
+    b = np.flatnonzero(valid)
+    t = target[valid]
+
+    pred_m_usd = c['m_USD'][b] + c['avg_delta_m_USD_3m'][b]
+    pred_m_jpy = c['m_JPY'][b] + c['avg_delta_m_JPY_3m'][b]
+    pred_m_try = c['m_TRY'][b] + c['avg_delta_m_TRY_3m'][b]
+
+    base_months = [data.dates[i] for i in b.tolist()]
+    target_months = [data.dates[i] for i in t.tolist()]
+    if ppp_store is not None:
+        ppp = [point_in_time_ppp(ppp_store, bm, tm) for bm, tm in zip(base_months, target_months)]
+        ppp_jpy = np.array([p['PPP_JPY'] for p in ppp])
+        ppp_try = np.array([p['PPP_TRY'] for p in ppp])
+    else:
+        ppp_jpy = c['PPP_JPY'][t]
+        ppp_try = c['PPP_TRY'][t]
+
+    # S = PPP * exp(m_A - m_B)
+    pred = {
+        'USDJPY': ppp_jpy * exp_exact(pred_m_usd - pred_m_jpy),
+        'USDTRY': ppp_try * exp_exact(pred_m_usd - pred_m_try),
+    }
+    pred['TRYJPY'] = pred['USDJPY'] / pred['USDTRY']
+
+    columns = {'base_month': base_months, 'target_month': target_months}
+    for pair in PAIRS:
+        actual = c[f'S_{pair}'][t]
+        columns[f'pred_{pair}'] = pred[pair]
+        columns[f'actual_{pair}'] = actual
+        columns[f'error_pct_{pair}'] = ((pred[pair] - actual) / actual) * 100
+    for currency in ('USD', 'JPY', 'TRY'):
+        columns[f'avg_delta_m_{currency}'] = c[f'avg_delta_m_{currency}_3m'][b]
+
+    return {'columns': columns, 'summary': summarize_errors(columns)}
+
+HORIZON_FIELDS = ('horizon', 'base_month', 'target_month',
+                  'pred_USDJPY', 'actual_USDJPY', 'error_pct_USDJPY',
+                  'pred_USDTRY', 'actual_USDTRY', 'error_pct_USDTRY',
+                  'pred_TRYJPY', 'actual_TRYJPY', 'error_pct_TRYJPY')
+
+def run_multi_horizon_backtest(data: PeriodData, horizons=range(1, 13), ppp_store: PPPStore = None) -> Dict:
+    """
+    複数の予想期間（h期間先）のバックテストを1回の走査で実行
+
+    基準月の m座標と3カ月平均変動は全ての h で共通に使い、h期間先の予想は
+    pred_m = m + h × avg_delta_m（変動が続くと仮定）とする。h=1 は run_vectorized_backtest と同じ。
+
+    Returns:
+        {'horizons': [h, ...], 'base_month': [...],
+         'target_month': [[...], ...]  # (予想期間, 基準月)、対象がなければ None
+         'pred' / 'actual' / 'error_pct': (予想期間, 基準月, 通貨ペア) の配列（対象がなければ NaN）,
+         'summary': {h: summarize_errors の結果}}
+    """
+    if not isinstance(data, PeriodData):
+        data = PeriodData(list(data))
+    c = data.columns
+    horizons = [int(h) for h in horizons]
+    if not horizons or min(horizons) < 1:
+        raise ValueError(f"Horizons must be positive: {horizons}")
+
+    # 3カ月平均のある基準月（全ての h で共通）
+    b = np.flatnonzero(~np.isnan(c['avg_delta_m_USD_3m']))
+    base_months = [data.dates[i] for i in b.tolist()]
+    m = {cur: c[f'm_{cur}'][b] for cur in ('USD', 'JPY', 'TRY')}
+    avg = {cur: c[f'avg_delta_m_{cur}_3m'][b] for cur in ('USD', 'JPY', 'TRY')}
+
+    shape = (len(horizons), len(b), len(PAIRS))
+    pred_cube = np.full(shape, np.nan)
+    actual_cube = np.full(shape, np.nan)
+    target_months = []
+    for k, h in enumerate(horizons):
+        target = data.target_indices(h)[b]
+        has = np.flatnonzero(target >= 0)
+        t = target[has]
+        target_months.append([data.dates[i] if i >= 0 else None for i in target.tolist()])
+
+        if ppp_store is not None:
+            ppp = [point_in_time_ppp(ppp_store, base_months[i], data.dates[j])
+                   for i, j in zip(has.tolist(), t.tolist())]
+            ppp_jpy = np.array([p['PPP_JPY'] for p in ppp])
+            ppp_try = np.array([p['PPP_TRY'] for p in ppp])
+        else:
+            ppp_jpy = c['PPP_JPY'][t]
+            ppp_try = c['PPP_TRY'][t]
+
+        pred_usd = m['USD'][has] + h * avg['USD'][has]
+        pred_jpy = m['JPY'][has] + h * avg['JPY'][has]
+        pred_try = m['TRY'][has] + h * avg['TRY'][has]
+        usdjpy = ppp_jpy * exp_exact(pred_usd - pred_jpy)
+        usdtry = ppp_try * exp_exact(pred_usd - pred_try)
+        pred_cube[k, has] = np.column_stack([usdjpy, usdtry, usdjpy / usdtry])
+        actual_cube[k, has] = np.column_stack([c[f'S_{pair}'][t] for pair in PAIRS])
+
+    error_cube = (pred_cube - actual_cube) / actual_cube * 100
+    summary = {}
+    for k, h in enumerate(horizons):
+        has = ~np.isnan(error_cube[k, :, 0])
+        summary[h] = summarize_errors({f'error_pct_{pair}': error_cube[k, has, j]
+                                       for j, pair in enumerate(PAIRS)})
+
+    return {'horizons': horizons, 'base_month': base_months, 'target_month': target_months,
+            'pred': pred_cube, 'actual': actual_cube, 'error_pct': error_cube, 'summary': summary}
+
+def write_horizon_csv(result: Dict, output_file: str):
+    """run_multi_horizon_backtest の誤差キューブを (予想期間, 基準月) の縦長CSVに保存"""
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HORIZON_FIELDS)
+        for k, h in enumerate(result['horizons']):
+            pred = result['pred'][k].tolist()
+            actual = result['actual'][k].tolist()
+            error = result['error_pct'][k].tolist()
+            for i, base_month in enumerate(result['base_month']):
+                target_month = result['target_month'][k][i]
+                if target_month is None:
+                    continue
+                row = [h, base_month, target_month]
+                for j in range(len(PAIRS)):
+                    row += [pred[i][j], actual[i][j], error[i][j]]
+                writer.writerow(row)
+
+def write_backtest_csv(columns: Dict, output_file: str, chunk_rows: int = 65536):
+    """
+    run_vectorized_backtest の列を run_comprehensive_backtest と同じ形式のCSVに保存
+
+    Python のリストへの変換は chunk_rows 行ずつ（行数が多くてもメモリが増えない）。
+    """
+    n = len(columns[RESULT_FIELDS[0]])
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(RESULT_FIELDS)
+        for start in range(0, n, chunk_rows):
+            stop = min(start + chunk_rows, n)
+            values = [columns[name][start:stop] if isinstance(columns[name], list)
+                      else np.asarray(columns[name][start:stop]).tolist() for name in RESULT_FIELDS]
+            writer.writerows(zip(*values))
+
+def parse_horizons(spec: str) -> List[int]:
+    """'1-12' や '1,3,6' を予想期間の列に変換"""
+    horizons = []
+    for part in spec.split(','):
+        if '-' in part:
+            lo, hi = map(int, part.split('-'))
+            horizons.extend(range(lo, hi + 1))
+        else:
+            horizons.append(int(part))
+    return sorted(set(horizons))
+
 def main():
     parser = argparse.ArgumentParser(description='月次MCI価格予想バックテスト（3カ月平均ベース）')
     parser.add_argument('--base-month', type=str, help='基準月 (YYYY-MM形式、例: 2022-03)')
-    parser.add_argument('--output', type=str, default='backtest_rolling_avg_results.csv',
-                       help='出力CSVファイル名（包括的バックテスト用）')
+    parser.add_argument('--output', type=str, default=None,
+                       help='出力CSVファイル名（既定: backtest_rolling_avg_results.csv、'
+                            '--horizons 指定時は backtest_horizon_results.csv）')
     parser.add_argument('--comprehensive', action='store_true',
                        help='全期間の包括的バックテストを実行')
+    parser.add_argument('--point-in-time', action='store_true',
+                       help='予想対象月のPPPを基準月時点で公表済みの値に限定（先読み防止）')
+    parser.add_argument('--vectorized', action='store_true',
+                       help='包括的バックテストを配列演算で一括実行（結果は同じ）')
+    parser.add_argument('--quiet', action='store_true',
+                       help='進捗を表示しない')
+    parser.add_argument('--json', action='store_true',
+                       help='誤差統計をJSONで標準出力に出す（--vectorized / --horizons 用）')
+    parser.add_argument('--horizons', type=str,
+                       help='複数の予想期間を一括評価（例: 1-12, 1,3,6）')
+    add_profile_argument(parser)
 
     args = parser.parse_args()
+    quiet = args.quiet or args.json
+    prof = setup_profiler('backtest_with_rolling_avg', args.profile)
 
     # データ読み込み
     csv_path = '../dataset/monthly_mci_backtest_ready_2022_2025.csv'
-    print(f"Loading data from {csv_path}...")
-    data = load_monthly_data(csv_path)
-    print(f"Loaded {len(data)} months of data\n")
-
-    if args.comprehensive:
-        # 包括的バックテスト
-        run_comprehensive_backtest(data, args.output)
+    if not quiet:
+        print(f"Loading data from {csv_path}...")
+    with prof.stage('load') as stage:
+        data = load_monthly_data(csv_path)
+        stage.rows = len(data)
+    if not quiet:
+        print(f"Loaded {len(data)} months of data\n")
+
+    ppp_store = load_ppp_store() if args.point_in_time else None
+    output = args.output or 'backtest_rolling_avg_results.csv'
+
+    if args.horizons:
+        # 複数の予想期間を1回の走査で評価
+        horizons = parse_horizons(args.horizons)
+        output = args.output or 'backtest_horizon_results.csv'
+        with prof.stage('compute', rows=len(data)):
+            result = run_multi_horizon_backtest(data, horizons, ppp_store)
+        with prof.stage('write', rows=len(horizons) * len(result['base_month'])):
+            write_horizon_csv(result, output)
+        if args.json:
+            print(json.dumps({'output': output, 'summary': result['summary']}, indent=2))
+        elif not quiet:
+            print(f"[OK] Results saved to {output}")
+            print(f"{'h':>3} " + ' '.join(f"{pair + ' MAE':>11} {'RMSE':>6}" for pair in PAIRS))
+            for h, stats in result['summary'].items():
+                print(f"{h:>3} " + ' '.join(f"{stats[pair]['mae']:>10.2f}% {stats[pair]['rmse']:>5.2f}%"
+                                          for pair in PAIRS))
+    elif args.comprehensive and args.vectorized:
+        # 配列演算による包括的バックテスト
+        with prof.stage('compute', rows=len(data)):
+            result = run_vectorized_backtest(data, ppp_store)
+        with prof.stage('write', rows=len(result['columns']['base_month'])):
+            write_backtest_csv(result['columns'], output)
+        if args.json:
+            print(json.dumps({'output': output, 'summary': result['summary']}, indent=2))
+        elif not quiet:
+            print(f"[OK] Results saved to {output}")
+            for pair, stats in result['summary'].items():
+                print(f"  {pair}: n={stats['count']}, MAE={stats['mae']:.2f}%, "
+                      f"RMSE={stats['rmse']:.2f}%, bias={stats['bias']:+.2f}%")
+    elif args.comprehensive:
+        # 包括的バックテスト（1カ月ずつ予想してCSVに保存するので書き出しも compute に含む）
+        with prof.stage('compute', rows=len(data)):
+            run_comprehensive_backtest(data, output, ppp_store, quiet)
     elif args.base_month:
         # 単一月のバックテスト
-        result = run_single_backtest(data, args.base_month)
+        with prof.stage('compute', rows=1):
+            result = run_single_backtest(data, args.base_month, ppp_store)
 
         if 'error' in result:
             print(f"Error: {result['error']}")
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+m座標のモンテカルロ・シナリオ生成（ファンチャート・予想区間）
+
+backtest_with_rolling_avg.py の「基準月の m + 3カ月平均変動」という1本のシナリオの代わりに、
+過去の月次変動ベクトル (delta_m_USD, delta_m_JPY, delta_m_TRY) から多数の経路を生成する。
+
+  bootstrap  : 過去の変動ベクトルを月ごとに復元抽出（3通貨の同時分布をそのまま使う）
+  parametric : 過去の変動の平均・共分散を持つ多変量正規分布から抽出
+
+経路は (経路, 期間, 通貨) の配列として一括で計算する。最後の通貨（TRY）の m は
+他の通貨の和の符号反転として求めるので、全ての経路・期間で Σm = 0 が厳密に成り立つ。
+レートは S = PPP × exp(m_A - m_B) で戻し、期間ごとの分位点をファンチャートにする。
+
+経路は BLOCK_SIZE ごとのブロックに分け、各ブロックの乱数は SeedSequence(seed).spawn で
+作った子シードから生成する。プロセス数に関係なく同じ seed なら同じ結果になる。
+
+使い方:
+  python monte_carlo.py                                   # 最新月から12カ月先まで、10万経路
+  python monte_carlo.py --paths 1000000 --mode parametric --workers 8
+  python monte_carlo.py --base-month 2024-06 --horizon 6  # 実績と予想区間を比較
+  python monte_carlo.py --ppp-try 13.5 --plot fan.png     # PPPシナリオを指定、図を保存
+"""
+
+import argparse
+import csv
+import os
+import sys
+from multiprocessing import Pool
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+from columnar import load_columns
+
+CURRENCIES = ('USD', 'JPY', 'TRY')
+PAIRS = ('USDJPY', 'USDTRY', 'TRYJPY')
+MODES = ('bootstrap', 'parametric')
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+BLOCK_SIZE = 100_000
+
+# ワーカーが参照する入力（initializer で設定）
+_inputs = {}
+
+
+def load_history(csv_path: str, base_month: str = None, lookback: int = None) -> Dict:
+    """
+    基準月までの m 座標・変動ベクトル・PPP を読み込む
+
+    Args:
+        base_month: 基準月（None なら最新月）
+        lookback: 変動ベクトルとして使う直近の月数（None なら全期間）
+
+    Returns:
+        {'dates', 'base', 'm0': (K,), 'deltas': (N, K), 'PPP_JPY', 'PPP_TRY', 'columns'}
+    """
+    names = ['date', 'S_USDJPY', 'S_USDTRY', 'S_TRYJPY', 'PPP_JPY', 'PPP_TRY']
+    names += [f'm_{c}' for c in CURRENCIES] + [f'delta_m_{c}' for c in CURRENCIES]
+    columns = load_columns(csv_path, names)
+    dates = np.datetime_as_string(columns['date']).tolist()
+
+    base = len(dates) - 1 if base_month is None else dates.index(base_month)
+    deltas = np.column_stack([np.asarray(columns[f'delta_m_{c}'], dtype=np.float64)[:base + 1]
+                              for c in CURRENCIES])
+    deltas = deltas[~np.isnan(deltas).any(axis=1)]
+    if lookback:
+        deltas = deltas[-lookback:]
+    if len(deltas) < 2:
+        raise ValueError(f"Not enough monthly deltas before {dates[base]}")
+
+    return {
+        'dates': dates,
+        'base': base,
+        'm0': np.array([float(columns[f'm_{c}'][base]) for c in CURRENCIES]),
+        'deltas': deltas,
+        'PPP_JPY': float(columns['PPP_JPY'][base]),
+        'PPP_TRY': float(columns['PPP_TRY'][base]),
+        'columns': columns,
+    }
+
+
+def sample_deltas(deltas: np.ndarray, n_paths: int, horizon: int, mode: str,
+                  rng: np.random.Generator) -> np.ndarray:
+    """
+    変動ベクトルを抽出 -> (経路, 期間, K-1)
+
+    最後の通貨は Σ = 0 から決まるので、最初の K-1 通貨分だけを返す。
+    """
+    free = deltas[:, :-1]
+    if mode == 'bootstrap':
+        return free[rng.integers(0, len(free), size=(n_paths, horizon))]
+    if mode == 'parametric':
+        mean = free.mean(axis=0)
+        cov = np.cov(free, rowvar=False).reshape(len(mean), len(mean))
+        return rng.multivariate_normal(mean, cov, size=(n_paths, horizon))
+    raise ValueError(f"Unknown mode: {mode}, expected one of {MODES}")
+
+
+def simulate_m_paths(m0: np.ndarray, deltas: np.ndarray, n_paths: int, horizon: int, mode: str,
+                     rng: np.random.Generator) -> np.ndarray:
+    """
+    m 座標の経路 -> (経路, 期間, K)
+
+    最初の K-1 通貨は m0 + 累積変動、最後の通貨はその和の符号反転（Σm = 0 が厳密に成り立つ）。
+    """
+    free = m0[:-1] + np.cumsum(sample_deltas(deltas, n_paths, horizon, mode, rng), axis=1)
+    m = np.empty(free.shape[:2] + (len(m0),))
+    m[..., :-1] = free
+    m[..., -1] = -free.sum(axis=-1)
+    return m
+
+
+def paths_to_rates(m: np.ndarray, ppp_jpy, ppp_try) -> np.ndarray:
+    """
+    m 座標の経路をレートに変換 -> (経路, 期間, 通貨ペア)
+
+    ppp_jpy, ppp_try はスカラーまたは期間ごとの配列 (期間,)
+    """
+    rates = np.empty(m.shape[:2] + (len(PAIRS),))
+    rates[..., 0] = np.asarray(ppp_jpy) * np.exp(m[..., 0] - m[..., 1])
+    rates[..., 1] = np.asarray(ppp_try) * np.exp(m[..., 0] - m[..., 2])
+    rates[..., 2] = rates[..., 0] / rates[..., 1]
+    return rates
+
+
+def _init(inputs: Dict):
+    _inputs.update(inputs)
+
+
+def _simulate_block(block: int) -> np.ndarray:
+    """1ブロック分の経路をブロック固有のシードで生成し、レートを返す"""
+    p = _inputs
+    n = min(p['block_size'], p['n_paths'] - block * p['block_size'])
+    rng = np.random.default_rng(p['seeds'][block])
+    m = simulate_m_paths(p['m0'], p['deltas'], n, p['horizon'], p['mode'], rng)
+    return paths_to_rates(m, p['ppp_jpy'], p['ppp_try'])
+
+
+def simulate(m0: np.ndarray, deltas: np.ndarray, ppp_jpy, ppp_try, n_paths: int = 100_000,
+             horizon: int = 12, mode: str = 'bootstrap', seed: int = 0, workers: int = 1,
+             block_size: int = BLOCK_SIZE) -> np.ndarray:
+    """
+    レートの経路を生成 -> (経路, 期間, 通貨ペア)
+
+    経路はブロックごとに SeedSequence(seed) の子シードで生成するので、workers に関係なく同じ結果になる。
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}, expected one of {MODES}")
+    n_blocks = -(-n_paths // block_size)
+    inputs = {
+        'm0': np.asarray(m0, dtype=np.float64), 'deltas': np.asarray(deltas, dtype=np.float64),
+        'ppp_jpy': ppp_jpy, 'ppp_try': ppp_try, 'n_paths': n_paths, 'horizon': horizon,
+        'mode': mode, 'block_size': block_size,
+        'seeds': np.random.SeedSequence(seed).spawn(n_blocks),
+    }
+
+    if workers <= 1 or n_blocks == 1:
+        _init(inputs)
+        try:
+            blocks = [_simulate_block(b) for b in range(n_blocks)]
+        finally:
+            _inputs.clear()
+    else:
+        with Pool(min(workers, n_blocks), initializer=_init, initargs=(inputs,)) as pool:
+            blocks = pool.map(_simulate_block, range(n_blocks))
+    return np.concatenate(blocks)
+
+
+def fan_chart(rates: np.ndarray, quantiles: Sequence[float] = QUANTILES) -> np.ndarray:
+    """期間ごと・通貨ペアごとの分位点 -> (分位点, 期間, 通貨ペア)"""
+    return np.quantile(rates, quantiles, axis=0)
+
+
+def plot_fan(fan: np.ndarray, months: List[str], output: str, quantiles: Sequence[float] = QUANTILES):
+    """ファンチャートを画像に保存（外側の分位点ほど薄く塗る）"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(len(PAIRS), 1, figsize=(10, 3 * len(PAIRS)), sharex=True)
+    x = np.arange(len(months))
+    n = len(quantiles)
+    for j, (pair, ax) in enumerate(zip(PAIRS, axes)):
+        for k in range(n // 2):
+            ax.fill_between(x, fan[k, :, j], fan[n - 1 - k, :, j], color='tab:blue',
+                            alpha=0.15 + 0.2 * k, linewidth=0,
+                            label=f'{quantiles[k]:.0%}-{quantiles[n - 1 - k]:.0%}')
+        if n % 2:
+            ax.plot(x, fan[n // 2, :, j], color='tab:blue', label='median')
+        ax.set_ylabel(pair)
+        ax.grid(True, alpha=0.3)
+        ax.legend(loc='upper left', fontsize=8)
+    axes[-1].set_xticks(x)
+    axes[-1].set_xticklabels(months, rotation=45)
+    fig.tight_layout()
+    fig.savefig(output, dpi=150)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='m座標のモンテカルロ・シナリオ生成（ファンチャート）')
+    parser.add_argument('--base-month', type=str, help='基準月（既定: 最新月）')
+    parser.add_argument('--horizon', type=int, default=12, help='予想期間（カ月、既定: 12）')
+    parser.add_argument('--paths', type=int, default=100_000, help='経路数（既定: 100000）')
+    parser.add_argument('--mode', choices=MODES, default='bootstrap', help='抽出方法')
+    parser.add_argument('--lookback', type=int, help='使う変動ベクトルの直近月数（既定: 全期間）')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    parser.add_argument('--workers', type=int, default=None, help='プロセス数（既定: CPUコア数）')
+    parser.add_argument('--ppp-jpy', type=float, help='PPP_JPY のシナリオ値（既定: 基準月の値）')
+    parser.add_argument('--ppp-try', type=float, help='PPP_TRY のシナリオ値（既定: 基準月の値）')
+    parser.add_argument('--output', default='monte_carlo_fan.csv', help='ファンチャートのCSV')
+    parser.add_argument('--plot', help='ファンチャートの画像（PNG）')
+    args = parser.parse_args()
+
+    csv_path = '../dataset/monthly_mci_backtest_ready_2022_2025.csv'
+    history = load_history(csv_path, args.base_month, args.lookback)
+    base_month = history['dates'][history['base']]
+    ppp_jpy = args.ppp_jpy if args.ppp_jpy is not None else history['PPP_JPY']
+    ppp_try = args.ppp_try if args.ppp_try is not None else history['PPP_TRY']
+
+    rates = simulate(history['m0'], history['deltas'], ppp_jpy, ppp_try, args.paths, args.horizon,
+                     args.mode, args.seed, args.workers or os.cpu_count() or 1)
+    fan = fan_chart(rates)
+
+    # 予想対象月と、データにあれば実績
+    base = np.datetime64(base_month, 'M')
+    months = [str(base + h) for h in range(1, args.horizon + 1)]
+    position = {d: i for i, d in enumerate(history['dates'])}
+    columns = history['columns']
+    actual = np.full((args.horizon, len(PAIRS)), np.nan)
+    for h, month in enumerate(months):
+        if month in position:
+            actual[h] = [float(columns[f'S_{pair}'][position[month]]) for pair in PAIRS]
+
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['horizon', 'target_month', 'pair'] + [f'q{q * 100:02.0f}' for q in QUANTILES] + ['actual'])
+        for h, month in enumerate(months):
+            for j, pair in enumerate(PAIRS):
+                writer.writerow([h + 1, month, pair] + fan[:, h, j].tolist()
+                                + ['' if np.isnan(actual[h, j]) else actual[h, j]])
+
+    print(f"=== Monte Carlo: {args.paths} paths ({args.mode}, {len(history['deltas'])} monthly deltas) "
+          f"from {base_month} ===")
+    print(f"PPP_JPY={ppp_jpy:.2f}, PPP_TRY={ppp_try:.4f}\n")
+    lo, mid, hi = 0, len(QUANTILES) // 2, len(QUANTILES) - 1
+    for j, pair in enumerate(PAIRS):
+        print(f"{pair} ({QUANTILES[lo]:.0%} / median / {QUANTILES[hi]:.0%})")
+        covered = 0
+        observed = 0
+        for h, month in enumerate(months):
+            line = f"  {month}: {fan[lo, h, j]:>10.4f} {fan[mid, h, j]:>10.4f} {fan[hi, h, j]:>10.4f}"
+            if not np.isnan(actual[h, j]):
+                inside = fan[lo, h, j] <= actual[h, j] <= fan[hi, h, j]
+                covered += inside
+                observed += 1
+                line += f"   actual {actual[h, j]:.4f} {'(in)' if inside else '(OUT)'}"
+            print(line)
+        if observed:
+            print(f"  coverage: {covered}/{observed}")
+        print()
+
+    if args.plot:
+        plot_fan(fan, months, args.plot)
+        print(f"[OK] Fan chart saved to {args.plot}")
+    print(f"[OK] Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+移動平均の窓 × PPP方式 × 平滑化方式のパラメータスイープ
+
+add_rolling_averages.py の「補間PPP・3カ月単純平均」以外の設定もまとめて評価し、
+通貨ペアごとの MAE / RMSE でランキングする。
+
+  窓: 1〜36カ月（--windows）
+  PPP: fixed（年内固定、monthly_mci_fixed_ppp）/ interpolated（月次補間、monthly_mci_interpolated_ppp）
+  平滑化: mean（単純移動平均、min_periods=1）/ ewma（指数加重移動平均、span=窓）
+
+入力配列は共有メモリに一度だけ置き、ワーカープロセスはそれを参照する（データセットをコピーしない）。
+同じPPP方式・平滑化方式の窓はまとめて (窓, 期間) の配列演算で評価する。
+
+使い方:
+  python parameter_sweep.py
+  python parameter_sweep.py --windows 1-36 --ppp fixed,interpolated --smoothing mean,ewma --workers 8
+  python parameter_sweep.py --rank-by TRYJPY --top 20 --output sweep_results.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+from multiprocessing import Pool, shared_memory
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+from columnar import load_columns
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dataset')
+PPP_MODES = {
+    'fixed': os.path.join(DATASET_DIR, 'monthly_mci_fixed_ppp_2022_2025.csv'),
+    'interpolated': os.path.join(DATASET_DIR, 'monthly_mci_interpolated_ppp_2022_2025.csv'),
+}
+SMOOTHINGS = ('mean', 'ewma')
+PAIRS = ('USDJPY', 'USDTRY', 'TRYJPY')
+
+# 共有配列 (PPP方式, 列, 期間) の列
+FIELDS = ('m_USD', 'm_JPY', 'm_TRY', 'S_USDJPY', 'S_USDTRY', 'S_TRYJPY', 'PPP_JPY', 'PPP_TRY')
+F = {name: i for i, name in enumerate(FIELDS)}
+
+# ワーカーが参照する共有配列（initializer で設定）
+_shared = {}
+
+
+def load_inputs(modes: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """各PPP方式の月次MCIを (PPP方式, 列, 期間) の配列にまとめる"""
+    arrays = []
+    dates = None
+    for mode in modes:
+        columns = load_columns(PPP_MODES[mode], ('date',) + FIELDS)
+        mode_dates = np.datetime_as_string(columns['date']).tolist()
+        if dates is not None and mode_dates != dates:
+            raise ValueError(f"{PPP_MODES[mode]} does not cover the same months")
+        dates = mode_dates
+        arrays.append(np.vstack([np.asarray(columns[name], dtype=np.float64) for name in FIELDS]))
+
+    periods = np.array(dates, dtype='datetime64[M]')
+    if (np.diff(periods) != np.timedelta64(1, 'M')).any():
+        raise ValueError("Monthly data must contain consecutive months")
+    return np.stack(arrays), dates
+
+
+def _attach(name: str, shape: Tuple[int, ...]):
+    """ワーカー初期化: 共有メモリを読み取り専用のビューとして開く"""
+    shm = shared_memory.SharedMemory(name=name)
+    data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    data.flags.writeable = False
+    _shared['shm'] = shm  # 参照を保持（閉じられないように）
+    _shared['data'] = data
+
+
+def rolling_mean(x: np.ndarray, windows: np.ndarray) -> np.ndarray:
+    """NaN を除いた移動平均（min_periods=1）を複数の窓で一括計算 -> (窓, 期間)"""
+    valid = ~np.isnan(x)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(valid, x, 0.0))))
+    ccount = np.concatenate(([0], np.cumsum(valid)))
+    idx = np.arange(len(x))
+    lo = np.maximum(idx[None, :] - windows[:, None] + 1, 0)
+    count = ccount[idx + 1][None, :] - ccount[lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, (csum[idx + 1][None, :] - csum[lo]) / count, np.nan)
+
+
+def ewma(x: np.ndarray, windows: np.ndarray) -> np.ndarray:
+    """指数加重移動平均（span=窓、pandas の ewm(span).mean() と同じ adjust=True）-> (窓, 期間)"""
+    decay = 1 - 2 / (windows + 1.0)
+    num = np.zeros(len(windows))
+    den = np.zeros(len(windows))
+    result = np.full((len(windows), len(x)), np.nan)
+    for t, value in enumerate(x.tolist()):
+        num *= decay
+        den *= decay
+        if value == value:
+            num += value
+            den += 1.0
+        if den[0] > 0:
+            result[:, t] = num / den
+    return result
+
+
+def evaluate(task: Tuple[int, str, str, Sequence[int]]) -> List[Dict]:
+    """
+    1つのPPP方式・平滑化方式について複数の窓を評価
+
+    Args:
+        task: (PPP方式の添字, PPP方式名, 平滑化方式, 窓の列)
+
+    Returns:
+        窓ごとの {'window', 'ppp', 'smoothing', 'n', 'mae_<pair>', 'rmse_<pair>', ...}
+    """
+    mode_index, mode, smoothing, windows = task
+    data = _shared['data'][mode_index]
+    windows = np.asarray(windows, dtype=np.int64)
+    smooth = rolling_mean if smoothing == 'mean' else ewma
+
+    # 基準月 b（変動値のある2カ月目以降）→ 予想対象月 b+1
+    n = data.shape[1]
+    b = np.arange(1, n - 1)
+    t = b + 1
+
+    pred_m = {}
+    for currency in ('USD', 'JPY', 'TRY'):
+        m = data[F[f'm_{currency}']]
+        delta = np.concatenate(([np.nan], np.diff(m)))
+        pred_m[currency] = m[b][None, :] + smooth(delta, windows)[:, b]
+
+    pred = {
+        'USDJPY': data[F['PPP_JPY']][t] * np.exp(pred_m['USD'] - pred_m['JPY']),
+        'USDTRY': data[F['PPP_TRY']][t] * np.exp(pred_m['USD'] - pred_m['TRY']),
+    }
+    pred['TRYJPY'] = pred['USDJPY'] / pred['USDTRY']
+
+    rows = [{'window': int(w), 'ppp': mode, 'smoothing': smoothing, 'n': len(b)} for w in windows]
+    for pair in PAIRS:
+        actual = data[F[f'S_{pair}']][t]
+        errors = (pred[pair] - actual) / actual * 100
+        mae = np.abs(errors).mean(axis=1)
+        rmse = np.sqrt((errors ** 2).mean(axis=1))
+        for row, a, r in zip(rows, mae.tolist(), rmse.tolist()):
+            row[f'mae_{pair}'] = a
+            row[f'rmse_{pair}'] = r
+    for row in rows:
+        row['mae_mean'] = sum(row[f'mae_{p}'] for p in PAIRS) / len(PAIRS)
+        row['rmse_mean'] = sum(row[f'rmse_{p}'] for p in PAIRS) / len(PAIRS)
+    return rows
+
+
+def make_tasks(modes: Sequence[str], smoothings: Sequence[str], windows: Sequence[int],
+               workers: int) -> List[Tuple[int, str, str, List[int]]]:
+    """(PPP方式, 平滑化方式) ごとに窓を分割し、全コアに行き渡る数のタスクにする"""
+    groups = len(modes) * len(smoothings)
+    chunks = max(1, -(-workers * 4 // groups))
+    size = max(1, -(-len(windows) // chunks))
+    tasks = []
+    for i, mode in enumerate(modes):
+        for smoothing in smoothings:
+            for start in range(0, len(windows), size):
+                tasks.append((i, mode, smoothing, list(windows[start:start + size])))
+    return tasks
+
+
+def run_sweep(windows: Sequence[int], modes: Sequence[str] = tuple(PPP_MODES),
+              smoothings: Sequence[str] = SMOOTHINGS, workers: int = None,
+              rank_by: str = 'mean') -> List[Dict]:
+    """
+    グリッド全体を評価し、MAE の昇順に並べた結果を返す
+
+    Args:
+        rank_by: 'mean'（3ペアの平均MAE）または通貨ペア名
+    """
+    workers = workers or os.cpu_count() or 1
+    data, _ = load_inputs(modes)
+    tasks = make_tasks(modes, smoothings, list(windows), workers)
+
+    shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    try:
+        np.ndarray(data.shape, dtype=np.float64, buffer=shm.buf)[:] = data
+        if workers == 1:
+            _attach(shm.name, data.shape)
+            results = [row for task in tasks for row in evaluate(task)]
+        else:
+            with Pool(workers, initializer=_attach, initargs=(shm.name, data.shape)) as pool:
+                results = [row for rows in pool.imap_unordered(evaluate, tasks) for row in rows]
+    finally:
+        _shared.clear()
+        shm.close()
+        shm.unlink()
+
+    key = f'mae_{rank_by}'
+    results.sort(key=lambda r: (r[key], r['window'], r['ppp'], r['smoothing']))
+    for rank, row in enumerate(results, 1):
+        row['rank'] = rank
+    return results
+
+
+def parse_windows(spec: str) -> List[int]:
+    """'1-36' や '3,6,12' を窓の列に変換"""
+    windows = []
+    for part in spec.split(','):
+        if '-' in part:
+            lo, hi = map(int, part.split('-'))
+            windows.extend(range(lo, hi + 1))
+        else:
+            windows.append(int(part))
+    if not windows or min(windows) < 1:
+        raise ValueError(f"Invalid window specification: {spec}")
+    return sorted(set(windows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='移動平均の窓・PPP方式・平滑化方式のパラメータスイープ')
+    parser.add_argument('--windows', default='1-36', help='窓（カ月）: 例 1-36, 3,6,12（既定: 1-36）')
+    parser.add_argument('--ppp', default='fixed,interpolated', help='PPP方式（既定: fixed,interpolated）')
+    parser.add_argument('--smoothing', default='mean,ewma', help='平滑化方式（既定: mean,ewma）')
+    parser.add_argument('--workers', type=int, default=None, help='プロセス数（既定: CPUコア数）')
+    parser.add_argument('--rank-by', default='mean', choices=('mean',) + PAIRS,
+                        help='ランキングの基準（mean = 3ペアの平均MAE）')
+    parser.add_argument('--top', type=int, default=10, help='表示する上位件数')
+    parser.add_argument('--output', default='parameter_sweep_results.csv', help='出力CSV')
+    args = parser.parse_args()
+
+    modes = args.ppp.split(',')
+    smoothings = args.smoothing.split(',')
+    for mode in modes:
+        if mode not in PPP_MODES:
+            parser.error(f"unknown PPP mode {mode}, expected one of {list(PPP_MODES)}")
+    for smoothing in smoothings:
+        if smoothing not in SMOOTHINGS:
+            parser.error(f"unknown smoothing {smoothing}, expected one of {list(SMOOTHINGS)}")
+
+    windows = parse_windows(args.windows)
+    results = run_sweep(windows, modes, smoothings, args.workers, args.rank_by)
+
+    fieldnames = ['rank', 'window', 'ppp', 'smoothing', 'n']
+    for pair in PAIRS:
+        fieldnames += [f'mae_{pair}', f'rmse_{pair}']
+    fieldnames += ['mae_mean', 'rmse_mean']
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(results)
+
+    print(f"=== Parameter sweep: {len(results)} configurations (ranked by MAE {args.rank_by}) ===\n")
+    header = f"{'rank':>4} {'window':>6} {'ppp':>12} {'smooth':>6}"
+    for pair in PAIRS:
+        header += f" {pair + ' MAE':>11} {'RMSE':>6}"
+    print(header)
+    for row in results[:args.top]:
+        line = f"{row['rank']:>4} {row['window']:>6} {row['ppp']:>12} {row['smoothing']:>6}"
+        for pair in PAIRS:
+            line += f" {row[f'mae_{pair}']:>10.2f}% {row[f'rmse_{pair}']:>5.2f}%"
+        print(line)
+    print(f"\n[OK] Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
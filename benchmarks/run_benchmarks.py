@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク（MCI計算・PPP補間・データセット作成・バックテスト・結果分析）
+
+再現可能な合成データ（シード固定）を 10³〜10⁸ 行で作り、各処理の所要時間を測る。
+結果はJSONに保存し、保存済みのベースラインと比べて閾値を超えて遅くなった処理を報告する。
+
+  mci_batch            mci_engine.calculate_mci_batch（配列で一括）
+  calculate_mci        calculate_mci_from_rates.calculate_mci（1行ずつ）
+  ppp_interpolation    ppp_interpolation.interpolate_periods（日単位の線形補間）
+  deltas               build_pipeline の deltas ノード（CSV行 → 差分列を追加したCSV行）
+  rolling              build_pipeline の rolling ノード（CSV行 → 3期間移動平均を追加したCSV行）
+  dataset_csv          build_pipeline の mci_interpolated → deltas → rolling（レートのCSV行から）
+  backtest_loop        run_comprehensive_backtest（1基準期間ずつ）
+  backtest_vectorized  run_vectorized_backtest（配列で一括）
+  analysis             analyze_rolling_avg_results.summarize_results（結果CSVを1回走査）
+
+合成データの日付は 2000-01-01〜2026-01-01 を n 等分した時刻（datetime64[s]）なので、
+行数によらず期間は26年に収まる。列は各ベンチマークが必要とするものだけを作る。
+1行ずつPythonで処理するベンチマークには時間・メモリの上限行数があり、
+それを超えるサイズは skipped として記録する。
+
+使い方:
+  python3 benchmarks/run_benchmarks.py                                   # 10³, 10⁵ 行
+  python3 benchmarks/run_benchmarks.py --sizes 1e3,1e5,1e7,1e8 --only mci_batch,rolling
+  python3 benchmarks/run_benchmarks.py --compare benchmarks/baseline.json --threshold 0.25
+  python3 benchmarks/run_benchmarks.py --sizes 1e3,1e5,1e7 --save-baseline   # ベースラインを更新
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'tools'))
+sys.path.insert(0, os.path.join(HERE, '..', 'backtest'))
+sys.path.insert(0, os.path.join(HERE, '..', 'dataset'))
+from analyze_rolling_avg_results import summarize_results
+from backtest_with_rolling_avg import (PeriodData, run_comprehensive_backtest,
+                                       run_vectorized_backtest, write_backtest_csv)
+from build_pipeline import MCI_INTERPOLATED_COLUMNS, make_nodes, parse_rows
+from calculate_mci_from_rates import calculate_mci
+from mci_engine import calculate_mci_batch
+from ppp_interpolation import interpolate_periods
+
+BASELINE = os.path.join(HERE, 'baseline.json')
+RESULTS = os.path.join(HERE, 'results.json')
+DEFAULT_SIZES = '1e3,1e5'
+CURRENCIES = ('USD', 'JPY', 'TRY')
+BACKTEST_COLUMNS = ('date', 'm_USD', 'm_JPY', 'm_TRY', 'avg_delta_m_USD_3m', 'avg_delta_m_JPY_3m',
+                    'avg_delta_m_TRY_3m', 'S_USDJPY', 'S_USDTRY', 'S_TRYJPY', 'PPP_JPY', 'PPP_TRY')
+
+# 合成データの期間（行数によらず一定）
+START = np.datetime64('2000-01-01T00:00:00', 's')
+SPAN_SECONDS = int((np.datetime64('2026-01-01T00:00:00', 's') - START).astype(np.int64))
+
+# 名前 -> (準備関数, 使う列, 上限行数)。準備関数は計測対象の引数なし関数を返す
+BENCHMARKS: Dict[str, tuple] = {}
+
+
+def benchmark(name: str, columns: Sequence[str], max_rows: int = None):
+    """ベンチマークを登録するデコレータ（columns は合成データから使う列）"""
+    def register(setup: Callable):
+        BENCHMARKS[name] = (setup, tuple(columns), max_rows)
+        return setup
+    return register
+
+
+class Fixture:
+    """
+    合成データ（n行）。同じ n と seed なら常に同じ値
+
+    PPPは緩やかな趨勢、レートは PPP × exp(乖離) で乖離は振れ幅が n によらないランダムウォーク。
+    m座標・差分・3期間移動平均まで含めてバックテストの入力と同じ列を作れるが、
+    実際に作って保持するのは require() で指定された列だけ（10⁸ 行では1列 800MB）。
+    """
+
+    def __init__(self, n: int, seed: int = 0):
+        self.n = n
+        self.seed = seed
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def require(self, names: Sequence[str]):
+        """names の列を用意し、それ以外の列を解放する"""
+        self._columns = {name: self._columns[name] for name in names if name in self._columns}
+        for name in names:
+            if name not in self._columns:
+                self._columns[name] = self.build(name)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._columns[name] if name in self._columns else self.build(name)
+
+    def walk(self, k: int, start: float) -> np.ndarray:
+        """k 番目の乖離のランダムウォーク（列ごとに独立した乱数列）"""
+        rng = np.random.default_rng([self.seed, k])
+        walk = np.cumsum(rng.normal(0.0, 0.3 / np.sqrt(self.n), self.n))
+        walk += start
+        return walk
+
+    def build(self, name: str) -> np.ndarray:
+        """列を1つ作る（依存する列は保持せずに作り直す）"""
+        n = self.n
+        if name == 'date':
+            return START + np.arange(n, dtype=np.int64) * max(SPAN_SECONDS // max(n, 1), 1)
+        if name == 'PPP_JPY':
+            return 100.0 - 10.0 * np.linspace(0.0, 1.0, n)
+        if name == 'PPP_TRY':
+            return 1.5 * np.exp(2.5 * np.linspace(0.0, 1.0, n))
+        if name == 'd_USDJPY':
+            return self.walk(0, 0.15)
+        if name == 'd_USDTRY':
+            return self.walk(1, 0.9)
+        if name in ('S_USDJPY', 'S_USDTRY'):
+            pair = name[2:]
+            return self[f'PPP_{pair[3:]}'] * np.exp(self[f'd_{pair}'])
+        if name == 'S_TRYJPY':
+            return self['S_USDJPY'] / self['S_USDTRY']
+        if name.startswith('m_'):
+            mci = calculate_mci_batch(self['S_USDJPY'], self['S_USDTRY'], self['PPP_JPY'], self['PPP_TRY'])
+            return mci[name]
+        if name.startswith('delta_m_'):
+            return np.concatenate(([np.nan], np.diff(self[name[len('delta_'):]])))
+        if name.startswith('avg_delta_m_') and name.endswith('_3m'):
+            delta = self[name[len('avg_'):-len('_3m')]]
+            return pd.Series(delta).rolling(3, min_periods=1).mean().to_numpy()
+        raise KeyError(name)
+
+    def date_strings(self) -> np.ndarray:
+        return np.datetime_as_string(self['date'])
+
+    def csv_lines(self, names: Sequence[str]) -> List[str]:
+        """列 names をCSVの行（float は repr、NaN は空欄）にする"""
+        frame = pd.DataFrame({name: self[name] for name in names})
+        if 'date' in frame:
+            frame['date'] = self.date_strings()
+        out = io.StringIO()
+        frame.to_csv(out, index=False, header=False, lineterminator='\n')
+        return out.getvalue().splitlines()
+
+
+def mci_table_lines(fx: Fixture) -> List[str]:
+    """mci_interpolated ノードの出力と同じ列のCSV行"""
+    lines = fx.csv_lines(['date', 'S_USDJPY', 'S_USDTRY', 'S_TRYJPY', 'PPP_JPY', 'PPP_TRY',
+                          'd_USDJPY', 'd_USDTRY', 'm_USD', 'm_JPY', 'm_TRY'])
+    # D_mTRY・pct_TRYJPY は deltas / rolling では使わないので空欄
+    return [line + ',,' for line in lines]
+
+
+@benchmark('mci_batch', ('S_USDJPY', 'S_USDTRY', 'PPP_JPY', 'PPP_TRY'))
+def bench_mci_batch(fx, tmp):
+    return lambda: calculate_mci_batch(fx['S_USDJPY'], fx['S_USDTRY'], fx['PPP_JPY'], fx['PPP_TRY'])
+
+
+@benchmark('calculate_mci', ('S_USDJPY', 'S_USDTRY', 'PPP_JPY', 'PPP_TRY'), max_rows=10**7)
+def bench_calculate_mci(fx, tmp):
+    rows = list(zip(fx['S_USDJPY'].tolist(), fx['S_USDTRY'].tolist(),
+                    fx['PPP_JPY'].tolist(), fx['PPP_TRY'].tolist()))
+    return lambda: [calculate_mci(*row) for row in rows]
+
+
+@benchmark('ppp_interpolation', ('date',))
+def bench_ppp_interpolation(fx, tmp):
+    anchors = tuple((year, 1.5 + 0.5 * (year - 1999)) for year in range(1999, 2027))
+    return lambda: interpolate_periods(anchors, fx['date'], scheme='linear')
+
+
+@benchmark('deltas', (), max_rows=10**7)
+def bench_deltas(fx, tmp):
+    lines = mci_table_lines(fx)
+    node = make_nodes()['deltas']
+    return lambda: node.derive(MCI_INTERPOLATED_COLUMNS, lines, 0)
+
+
+@benchmark('rolling', (), max_rows=10**7)
+def bench_rolling(fx, tmp):
+    nodes = make_nodes()
+    header = MCI_INTERPOLATED_COLUMNS + nodes['deltas'].new_columns()
+    lines = nodes['deltas'].derive(MCI_INTERPOLATED_COLUMNS, mci_table_lines(fx), 0)
+    return lambda: nodes['rolling'].derive(header, lines, 0)
+
+
+@benchmark('dataset_csv', ('PPP_JPY', 'PPP_TRY'), max_rows=10**7)
+def bench_dataset_csv(fx, tmp):
+    # PPPは合成データの列を渡す（mci_interpolated.ppp は暦の連続した月が前提）
+    nodes = make_nodes()
+    rates_header = ['date', 'S_USDJPY', 'S_USDTRY']
+    rates_lines = fx.csv_lines(rates_header)
+    deltas_header = MCI_INTERPOLATED_COLUMNS + nodes['deltas'].new_columns()
+
+    def run():
+        rates = parse_rows(rates_header, rates_lines)
+        mci = nodes['mci_interpolated'].derive(rates, fx['PPP_JPY'], fx['PPP_TRY'], 0)
+        deltas = nodes['deltas'].derive(MCI_INTERPOLATED_COLUMNS, mci, 0)
+        return nodes['rolling'].derive(deltas_header, deltas, 0)
+    return run
+
+
+def _period_data(fx) -> PeriodData:
+    columns = {name: fx[name] for name in BACKTEST_COLUMNS}
+    columns['date'] = fx.date_strings()
+    return PeriodData.from_columns(columns)
+
+
+# 基準期間ごとに結果の dict を保持するのでメモリで 10⁶ 行まで
+@benchmark('backtest_loop', (), max_rows=10**6)
+def bench_backtest_loop(fx, tmp):
+    data = _period_data(fx)
+    output = os.path.join(tmp, 'backtest_loop.csv')
+    return lambda: run_comprehensive_backtest(data, output, quiet=True)
+
+
+@benchmark('backtest_vectorized', (), max_rows=10**7)
+def bench_backtest_vectorized(fx, tmp):
+    data = _period_data(fx)
+    return lambda: run_vectorized_backtest(data)
+
+
+@benchmark('analysis', (), max_rows=10**7)
+def bench_analysis(fx, tmp):
+    output = os.path.join(tmp, 'results.csv')
+    write_backtest_csv(run_vectorized_backtest(_period_data(fx))['columns'], output)
+    return lambda: summarize_results(output)
+
+
+def time_call(func: Callable, repeat: int) -> List[float]:
+    """func を repeat 回実行した所要時間（秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_benchmarks(sizes: List[int], names: List[str], repeat: int = 3, seed: int = 0,
+                   log: Callable = print) -> List[Dict]:
+    """
+    全てのサイズ・ベンチマークを実行
+
+    Returns:
+        [{'name', 'rows', 'status': 'ok' | 'skipped', 'best', 'mean', 'repeat', 'rows_per_sec'}, ...]
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            log(f"--- {n:,} rows ---")
+            fixture = Fixture(n, seed)
+            for name in names:
+                setup, columns, max_rows = BENCHMARKS[name]
+                if max_rows is not None and n > max_rows:
+                    results.append({'name': name, 'rows': n, 'status': 'skipped', 'max_rows': max_rows})
+                    log(f"  {name:<20} skipped (max {max_rows:,} rows)")
+                    continue
+                fixture.require(columns)
+                func = setup(fixture, tmp)
+                # 大きなデータは1回だけ
+                timings = time_call(func, repeat if n <= 10**6 else 1)
+                best = min(timings)
+                results.append({
+                    'name': name, 'rows': n, 'status': 'ok',
+                    'best': best, 'mean': sum(timings) / len(timings), 'repeat': len(timings),
+                    'rows_per_sec': n / best if best > 0 else None,
+                })
+                log(f"  {name:<20} {best * 1000:>12.3f} ms  ({n / best if best > 0 else 0:>14,.0f} rows/s)")
+                del func
+            del fixture
+    return results
+
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float, min_time: float) -> List[Dict]:
+    """
+    ベースラインと比較
+
+    best の比が 1 + threshold を超えたら regression、1 / (1 + threshold) 未満なら improved。
+    ベースラインが min_time 秒未満の計測は誤差が大きいので比較しない。
+    """
+    base = {(r['name'], r['rows']): r for r in baseline if r.get('status') == 'ok'}
+    report = []
+    for r in results:
+        b = base.get((r['name'], r['rows']))
+        if r['status'] != 'ok' or b is None:
+            continue
+        ratio = r['best'] / b['best'] if b['best'] > 0 else float('inf')
+        if b['best'] < min_time:
+            status = 'noise'
+        elif ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 / (1 + threshold):
+            status = 'improved'
+        else:
+            status = 'ok'
+        report.append({'name': r['name'], 'rows': r['rows'], 'baseline': b['best'],
+                       'current': r['best'], 'ratio': ratio, 'status': status})
+    return report
+
+
+def parse_sizes(spec: str) -> List[int]:
+    """'1e3,1e5' を行数の列に変換"""
+    return [int(float(s)) for s in spec.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MCIベンチマーク')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f'行数（既定: {DEFAULT_SIZES}、例: 1e3,1e5,1e7,1e8）')
+    parser.add_argument('--only', help='実行するベンチマーク（カンマ区切り）')
+    parser.add_argument('--repeat', type=int, default=3, help='繰り返し回数（10⁶ 行超は1回）')
+    parser.add_argument('--seed', type=int, default=0, help='合成データのシード')
+    parser.add_argument('--output', default=RESULTS, help='結果JSON')
+    parser.add_argument('--compare', nargs='?', const=BASELINE, help='比較するベースラインJSON')
+    parser.add_argument('--threshold', type=float, default=0.25, help='遅くなったとみなす比率（既定: 0.25 = 25%%）')
+    parser.add_argument('--min-time', type=float, default=0.001, help='比較する最短のベースライン時間（秒）')
+    parser.add_argument('--save-baseline', action='store_true', help='結果をベースラインとして保存')
+    parser.add_argument('--list', action='store_true', help='ベンチマークの一覧を表示')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (_, _, max_rows) in BENCHMARKS.items():
+            print(f"{name:<20} {'max ' + format(max_rows, ',') + ' rows' if max_rows else ''}")
+        return
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name}, expected one of {list(BENCHMARKS)}")
+
+    results = run_benchmarks(parse_sizes(args.sizes), names, args.repeat, args.seed)
+    report = {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    output = BASELINE if args.save_baseline else args.output
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+    print(f"\n[OK] Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        comparison = compare(results, baseline, args.threshold, args.min_time)
+        print(f"\n=== Compared with {args.compare} (threshold +{args.threshold:.0%}) ===")
+        for c in comparison:
+            print(f"  {c['name']:<20} {c['rows']:>12,} rows  {c['baseline'] * 1000:>10.3f} -> "
+                  f"{c['current'] * 1000:>10.3f} ms  x{c['ratio']:.2f}  {c['status']}")
+        regressions = [c for c in comparison if c['status'] == 'regression']
+        if regressions:
+            print(f"\n[REGRESSION] {len(regressions)} benchmark(s) slower than the baseline")
+            sys.exit(1)
+        print("\n[OK] No regressions")
+
+
+if __name__ == '__main__':
+    main()
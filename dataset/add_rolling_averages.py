@@ -5,25 +5,38 @@
 過去3カ月のm座標変動の平均を計算し、シナリオの中心軸として使用
 """
 
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+from profiling import pop_profile_flag, setup_profiler
+
+# --profile または MCI_PROFILE でステージごとの計測を出力
+prof = setup_profiler('add_rolling_averages', pop_profile_flag())
+
 # データを読み込み
 input_file = 'monthly_mci_with_deltas_2022_2025.csv'
 output_file = 'monthly_mci_backtest_ready_2022_2025.csv'
 
 print(f"Reading {input_file}...")
-df = pd.read_csv(input_file)
+with prof.stage('load') as stage:
+    df = pd.read_csv(input_file)
+    stage.rows = len(df)
 
 # 過去3カ月の差分の移動平均を計算
 # rolling(3, min_periods=1) を使うと、データが3ヶ月未満でも計算可能
-df['avg_delta_m_USD_3m'] = df['delta_m_USD'].rolling(window=3, min_periods=1).mean()
-df['avg_delta_m_JPY_3m'] = df['delta_m_JPY'].rolling(window=3, min_periods=1).mean()
-df['avg_delta_m_TRY_3m'] = df['delta_m_TRY'].rolling(window=3, min_periods=1).mean()
+with prof.stage('compute', rows=len(df)):
+    df['avg_delta_m_USD_3m'] = df['delta_m_USD'].rolling(window=3, min_periods=1).mean()
+    df['avg_delta_m_JPY_3m'] = df['delta_m_JPY'].rolling(window=3, min_periods=1).mean()
+    df['avg_delta_m_TRY_3m'] = df['delta_m_TRY'].rolling(window=3, min_periods=1).mean()
 
 # 結果を保存
 print(f"Saving to {output_file}...")
-df.to_csv(output_file, index=False, float_format='%.15g')
+with prof.stage('write', rows=len(df)):
+    df.to_csv(output_file, index=False, float_format='%.15g')
 
 print("\n=== Summary ===")
 print(f"Total rows: {len(df)}")
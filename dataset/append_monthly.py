@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Append new months to the monthly MCI tables without rewriting existing rows.
+
+Only the new rate rows are processed. The previous month (and, for the rolling
+averages, the last window-1 deltas) is read from the end of each table, so an
+update costs O(new rows) however long the history is:
+
+  monthly_exchange_rates_2022_2025.csv        <- the new rates
+  monthly_mci_fixed_ppp_2022_2025.csv         <- MCI, PPP_changed, D_mTRY, pct_TRYJPY
+  monthly_mci_interpolated_ppp_2022_2025.csv  <- MCI with interpolated PPP, D_mTRY
+  monthly_mci_with_deltas_2022_2025.csv       <- delta_m_*
+  monthly_mci_backtest_ready_2022_2025.csv    <- avg_delta_m_*_3m
+
+Rows are computed by the same node definitions as build_pipeline.py. Months
+that are already in the tables are skipped, so the daily refresh can pass the
+latest rates every day and only a new month is ever appended.
+
+Note: pandas' rolling mean carries a running sum over the whole history, so a
+full rebuild (build_pipeline.py --force) may differ from the appended rolling
+averages in the last bit. build_pipeline.py notices the appended files and
+revalidates them on its next run.
+
+Usage:
+  python3 append_monthly.py new_rates.csv                        # date,S_USDJPY,S_USDTRY
+  python3 append_monthly.py --date 2025-12 --usdjpy 155.2 --usdtry 42.6
+"""
+
+import argparse
+import csv
+import os
+import sys
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'tools'))
+from build_pipeline import RATES_SOURCE, BuildContext, format_line, make_nodes, parse_rows
+from csv_append import append_lines, read_tail
+
+RATES_COLUMNS = ['date', 'S_USDJPY', 'S_USDTRY']
+
+
+def read_new_rates(path: str) -> List[Dict[str, str]]:
+    """Rates CSV with date,S_USDJPY,S_USDTRY columns (values kept as written)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [{k: row[k] for k in RATES_COLUMNS} for row in csv.DictReader(f)]
+
+
+def next_month(year_month: str) -> str:
+    """Next month in YYYY-MM format."""
+    return str(np.datetime64(year_month, 'M') + 1)
+
+
+def append_months(new_rows: Sequence[Dict[str, str]], scheme: str = 'linear', window: int = 3) -> List[str]:
+    """
+    Append new months to the rates file and every derived monthly table.
+
+    Args:
+        new_rows: [{'date': 'YYYY-MM', 'S_USDJPY': ..., 'S_USDTRY': ...}, ...] in date order
+        scheme, window: must match the parameters the tables were built with
+
+    Returns:
+        The months that were appended (months already present are skipped)
+    """
+    nodes = make_nodes(scheme=scheme, window=window)
+    ctx = BuildContext(nodes)
+    fixed, interpolated = nodes['mci_fixed'], nodes['mci_interpolated']
+    deltas, rolling = nodes['deltas'], nodes['rolling']
+    rates_path = os.path.join(HERE, RATES_SOURCE)
+
+    # Tail state: the last month of every table, plus window-1 deltas for the rolling averages
+    rates_header, rates_tail, rates_newline = read_tail(rates_path, 1)
+    if not rates_tail:
+        raise ValueError(f"{RATES_SOURCE} has no rows to append to; run build_pipeline.py")
+    last = rates_tail[-1].split(',', 1)[0]
+
+    tails = {}
+    for node, n in ((fixed, 1), (interpolated, 1), (deltas, max(window - 1, 1)), (rolling, 1)):
+        header, tail, newline = read_tail(node.path, n)
+        if not tail or tail[-1].split(',', 1)[0] != last:
+            raise ValueError(f"{node.output} is not in sync with {RATES_SOURCE}; run build_pipeline.py")
+        tails[node.name] = (header, tail, newline)
+
+    expected = {
+        'mci_fixed': fixed.header(ctx),
+        'mci_interpolated': interpolated.header(ctx),
+        'deltas': tails['mci_interpolated'][0] + deltas.new_columns(),
+        'rolling': tails['deltas'][0] + rolling.new_columns(),
+    }
+    for name, header in expected.items():
+        if tails[name][0] != header:
+            raise ValueError(f"{nodes[name].output} columns do not match (window={window}?)")
+
+    # New months must continue the history without gaps
+    rows = [row for row in new_rows if row['date'] > last]
+    if not rows:
+        return []
+    expected_month = next_month(last)
+    for row in rows:
+        if row['date'] != expected_month:
+            raise ValueError(f"Expected {expected_month} after {last}, got {row['date']}")
+        expected_month = next_month(row['date'])
+
+    # The fixed-PPP table needs that year's PPP; check before anything is computed or written
+    missing = sorted({row['date'][:4] for row in rows if row['date'] not in ctx.store})
+    if missing:
+        raise ValueError(f"No PPP config for year {', '.join(missing)}; "
+                         f"add it to the PPP data (ppp_store.py) before appending these months")
+
+    # MCI tables: previous month as look-back row, PPP from the store
+    rate_lines = [format_line([row[k] for k in RATES_COLUMNS]) for row in rows]
+    rates = parse_rows(rates_header, rates_tail[-1:] + rate_lines)
+    dates = rates['date']
+    new_lines = {}
+    for node in (fixed, interpolated):
+        ppp_jpy, ppp_try = node.ppp(ctx.store, dates)
+        new_lines[node.name] = node.derive(rates, ppp_jpy, ppp_try, 1)
+
+    # Deltas and rolling averages from the carried-over tail rows
+    header, tail, _ = tails['mci_interpolated']
+    new_lines['deltas'] = deltas.derive(header, tail[-1:] + new_lines['mci_interpolated'], 1)
+    header, tail, _ = tails['deltas']
+    lookback = tail[-(window - 1):] if window > 1 else []
+    new_lines['rolling'] = rolling.derive(header, lookback + new_lines['deltas'], len(lookback))
+
+    # Everything is computed; append to every file
+    append_lines(rates_path, rate_lines, rates_newline)
+    for name in ('mci_fixed', 'mci_interpolated', 'deltas', 'rolling'):
+        append_lines(nodes[name].path, new_lines[name], tails[name][2])
+
+    return [row['date'] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Append new months to the monthly MCI tables')
+    parser.add_argument('rates', nargs='?', help='CSV with date,S_USDJPY,S_USDTRY (new months only, or any recent rows)')
+    parser.add_argument('--date', help='single month to append (YYYY-MM)')
+    parser.add_argument('--usdjpy', help='USD/JPY monthly average for --date')
+    parser.add_argument('--usdtry', help='USD/TRY monthly average for --date')
+    parser.add_argument('--window', type=int, default=3, help='rolling average window (default: 3)')
+    args = parser.parse_args()
+
+    if args.rates:
+        new_rows = read_new_rates(args.rates)
+    elif args.date and args.usdjpy and args.usdtry:
+        new_rows = [{'date': args.date, 'S_USDJPY': args.usdjpy, 'S_USDTRY': args.usdtry}]
+    else:
+        parser.error('give a rates CSV or --date, --usdjpy and --usdtry')
+
+    try:
+        appended = append_months(new_rows, window=args.window)
+    except ValueError as e:
+        # Nothing has been written when append_months raises
+        sys.exit(f"Error: {e}")
+    if appended:
+        print(f"✓ Appended {len(appended)} month(s): {', '.join(appended)}")
+    else:
+        print("✓ Nothing to append (all months already present)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+"""
+Incremental build of the monthly MCI datasets (content-hashed dependency graph).
+
+Nodes (outputs are relative to this directory):
+
+  rates             monthly_exchange_rates_2022_2025.csv            (source)
+  ppp               annual_mci_2005_2024.csv + ppp_vintages.csv     (source)
+  mci_fixed         monthly_mci_fixed_ppp_2022_2025.csv             <- rates, ppp
+  mci_interpolated  monthly_mci_interpolated_ppp_2022_2025.csv      <- rates, ppp
+  deltas            monthly_mci_with_deltas_2022_2025.csv           <- mci_interpolated
+  rolling           monthly_mci_backtest_ready_2022_2025.csv        <- deltas
+  backtest          ../backtest/backtest_rolling_avg_results.csv    <- rolling
+
+A node is up to date when the SHA-256 of its inputs (source file contents or
+upstream outputs), its parameters and its version match the stored build state
+(.build_state.json) and its output file is unchanged since the last build.
+
+A stale node does not recompute the whole table. Every output row has a
+fingerprint of exactly the input rows it depends on (e.g. the rates row, the
+previous rates row and the PPP of both months for the MCI tables, the previous
+and current row for the deltas). Only rows whose fingerprint changed are
+recomputed; the other rows are copied from the previous output and the file is
+rewritten from the first changed byte onwards. A PPP revision for 2025
+therefore recomputes the 2025 rows (plus the rows whose look-back reaches into
+them) instead of the whole history, and a node whose output did not change
+leaves its dependents up to date. The rolling averages are the exception:
+pandas' running sum makes every row depend on all earlier ones at the last-bit
+level, so that node recomputes from the first changed row to the end.
+
+Usage:
+  python3 build_pipeline.py                 # build everything that is stale
+  python3 build_pipeline.py rolling         # build a node and its dependencies
+  python3 build_pipeline.py --dry-run       # show stale nodes and dirty rows
+  python3 build_pipeline.py --force         # ignore the build state
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'tools'))
+sys.path.insert(0, os.path.join(HERE, '..', 'backtest'))
+from mci_engine import calculate_mci_batch
+from ppp_interpolation import SCHEMES, interpolate_periods, store_anchors
+from ppp_store import PPPStore
+
+STATE_FILE = os.path.join(HERE, '.build_state.json')
+STATE_VERSION = 1
+
+RATES_SOURCE = 'monthly_exchange_rates_2022_2025.csv'
+PPP_SOURCES = ('annual_mci_2005_2024.csv', 'ppp_vintages.csv')
+
+MCI_FIXED_COLUMNS = ['date', 'S_USDJPY', 'S_USDTRY', 'S_TRYJPY', 'PPP_JPY', 'PPP_TRY',
+                     'PPP_changed', 'd_USDJPY', 'd_USDTRY', 'm_USD', 'm_JPY', 'm_TRY',
+                     'D_mTRY', 'pct_TRYJPY']
+MCI_INTERPOLATED_COLUMNS = ['date', 'S_USDJPY', 'S_USDTRY', 'S_TRYJPY', 'PPP_JPY', 'PPP_TRY',
+                            'd_USDJPY', 'd_USDTRY', 'm_USD', 'm_JPY', 'm_TRY',
+                            'D_mTRY', 'pct_TRYJPY']
+CURRENCIES = ('USD', 'JPY', 'TRY')
+
+
+def file_hash(path: str, size: int = None) -> str:
+    """SHA-256 of a file's contents, or of its first `size` bytes ('' if it does not exist)."""
+    if not os.path.exists(path):
+        return ''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = size
+        while remaining is None or remaining > 0:
+            block = f.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return digest.hexdigest()
+
+
+def row_fingerprint(*parts) -> str:
+    """Short hash of everything a single output row depends on."""
+    return hashlib.blake2b('\x1f'.join(map(str, parts)).encode(), digest_size=8).hexdigest()
+
+
+def read_table(path: str) -> Tuple[List[str], List[str], str]:
+    """Read a CSV as (header, data lines without terminator, line terminator)."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+    newline = '\r\n' if '\r\n' in text else '\n'
+    lines = text.split(newline)
+    if lines and lines[-1] == '':
+        lines.pop()
+    return next(csv.reader([lines[0]])), lines[1:], newline
+
+
+def parse_rows(header: Sequence[str], lines: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Parse CSV lines into columns: 'date' as strings, everything else float64 ('' -> NaN)."""
+    rows = list(csv.reader(lines))
+    columns = {}
+    for k, name in enumerate(header):
+        values = [row[k] for row in rows]
+        if name in ('date', 'base_month', 'target_month', 'PPP_changed'):
+            columns[name] = values
+        else:
+            columns[name] = np.array([float(v) if v != '' else np.nan for v in values])
+    return columns
+
+
+def contiguous_ranges(indices: Sequence[int]) -> List[Tuple[int, int]]:
+    """[1, 2, 3, 7, 8] -> [(1, 4), (7, 9)]"""
+    ranges = []
+    for i in indices:
+        if ranges and ranges[-1][1] == i:
+            ranges[-1][1] = i + 1
+        else:
+            ranges.append([i, i + 1])
+    return [tuple(r) for r in ranges]
+
+
+def format_line(values: Sequence, float_format: Optional[str] = None) -> str:
+    """Format one CSV line like csv.writer (repr floats) or pandas (float_format, NaN -> '')."""
+    out = []
+    for v in values:
+        if isinstance(v, (float, np.floating)):
+            v = float(v)
+            if v != v:
+                out.append('')
+            else:
+                out.append(float_format % v if float_format else repr(v))
+        else:
+            out.append(str(v))
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='').writerow(out)
+    return buffer.getvalue()
+
+
+class Node:
+    """
+    A buildable table.
+
+    Subclasses declare the output file, the upstream nodes/source files, parameters
+    and CSV layout, and implement fingerprints() (one per input-aligned row) and
+    build() (output lines for a contiguous range of input rows, None = no output row).
+    """
+
+    name = ''
+    output = ''
+    deps: Tuple[str, ...] = ()
+    sources: Tuple[str, ...] = ()
+    version = 1
+    newline = '\n'
+
+    def __init__(self, **params):
+        self.params = params
+
+    def header(self, ctx: 'BuildContext') -> List[str]:
+        raise NotImplementedError
+
+    def fingerprints(self, ctx: 'BuildContext') -> List[str]:
+        raise NotImplementedError
+
+    def build(self, ctx: 'BuildContext', start: int, stop: int) -> List[Optional[str]]:
+        raise NotImplementedError
+
+    @property
+    def path(self) -> str:
+        return os.path.normpath(os.path.join(HERE, self.output))
+
+
+class BuildContext:
+    """Per-run cache of upstream tables and the PPP store."""
+
+    def __init__(self, nodes: Dict[str, Node]):
+        self.nodes = nodes
+        self._tables = {}
+        self._store = None
+
+    def table(self, name: str) -> Tuple[List[str], List[str]]:
+        """(header, data lines) of a node's output or of a source file path."""
+        if name not in self._tables:
+            path = self.nodes[name].path if name in self.nodes else os.path.join(HERE, name)
+            header, lines, _ = read_table(path)
+            self._tables[name] = (header, lines)
+        return self._tables[name]
+
+    def rows(self, name: str, start: int, stop: int) -> Dict[str, np.ndarray]:
+        """Parsed columns of rows [start, stop) of an upstream table."""
+        header, lines = self.table(name)
+        return parse_rows(header, lines[max(start, 0):stop])
+
+    def invalidate(self, name: str):
+        self._tables.pop(name, None)
+
+    @property
+    def store(self) -> PPPStore:
+        if self._store is None:
+            self._store = PPPStore.from_csv(os.path.join(HERE, PPP_SOURCES[0]),
+                                            os.path.join(HERE, PPP_SOURCES[1]))
+        return self._store
+
+
+class MCINode(Node):
+    """
+    Monthly MCI table computed from the rates and a per-month PPP.
+
+    Row i depends on rates rows i-1 and i and their PPP (D_mTRY / monthly changes).
+    """
+
+    sources = (RATES_SOURCE,) + PPP_SOURCES
+    newline = '\r\n'
+
+    def ppp(self, store: PPPStore, dates: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(PPP_JPY, PPP_TRY) for each month."""
+        raise NotImplementedError
+
+    def derive(self, rates: Dict[str, np.ndarray], ppp_jpy: np.ndarray, ppp_try: np.ndarray,
+               offset: int) -> List[str]:
+        """
+        Output lines for rates rows [offset, n).
+
+        offset is 1 when rates starts with the previous month (look-back row) and
+        0 when the first row is the first month of the table.
+        """
+        raise NotImplementedError
+
+    def _ppp(self, ctx):
+        _, lines = ctx.table(RATES_SOURCE)
+        return self.ppp(ctx.store, [line.split(',', 1)[0] for line in lines])
+
+    def fingerprints(self, ctx):
+        _, lines = ctx.table(RATES_SOURCE)
+        ppp_jpy, ppp_try = (v.tolist() for v in self._ppp(ctx))
+        keys = [(line, repr(j), repr(t)) for line, j, t in zip(lines, ppp_jpy, ppp_try)]
+        return [row_fingerprint(keys[i], keys[i - 1] if i else None) for i in range(len(keys))]
+
+    def build(self, ctx, start, stop):
+        ppp_jpy, ppp_try = self._ppp(ctx)
+        lo = max(start - 1, 0)
+        rates = ctx.rows(RATES_SOURCE, lo, stop)
+        return self.derive(rates, ppp_jpy[lo:stop], ppp_try[lo:stop], start - lo)
+
+
+class MCIFixedNode(MCINode):
+    """Monthly MCI with the annual PPP held constant within each year."""
+
+    name = 'mci_fixed'
+    output = 'monthly_mci_fixed_ppp_2022_2025.csv'
+
+    def header(self, ctx):
+        return MCI_FIXED_COLUMNS
+
+    def ppp(self, store, dates):
+        years = [int(date[:4]) for date in dates]
+        return store.lookup('JPY', years), store.lookup('TRY', years)
+
+    def derive(self, rates, ppp_jpy, ppp_try, offset):
+        mci = calculate_mci_batch(rates['S_USDJPY'], rates['S_USDTRY'], ppp_jpy, ppp_try)
+        lines = []
+        for k in range(offset, len(ppp_jpy)):
+            if k == 0:
+                changed, d_m_try, pct = '', '', ''
+            else:
+                changed = 'YES' if ppp_try[k] != ppp_try[k - 1] else 'NO'
+                d_m_try = mci['m_TRY'][k] - mci['m_TRY'][k - 1]
+                pct = (mci['S_TRYJPY'][k] / mci['S_TRYJPY'][k - 1] - 1) * 100
+            lines.append(format_line([
+                rates['date'][k], rates['S_USDJPY'][k], rates['S_USDTRY'][k], mci['S_TRYJPY'][k],
+                ppp_jpy[k], ppp_try[k], changed, mci['d_USDJPY'][k], mci['d_USDTRY'][k],
+                mci['m_USD'][k], mci['m_JPY'][k], mci['m_TRY'][k], d_m_try, pct,
+            ]))
+        return lines
+
+
+class MCIInterpolatedNode(MCINode):
+    """Monthly MCI with the annual PPP interpolated month by month (recalculate_monthly_interpolated_ppp.py)."""
+
+    name = 'mci_interpolated'
+    output = 'monthly_mci_interpolated_ppp_2022_2025.csv'
+
+    def header(self, ctx):
+        return MCI_INTERPOLATED_COLUMNS
+
+    def ppp(self, store, dates):
+        periods = np.array(dates, dtype='datetime64[M]')
+        if len(periods) > 1 and (np.diff(periods) != np.timedelta64(1, 'M')).any():
+            raise ValueError("Monthly rates must contain consecutive months")
+        first_year = self.params['first_anchor_year']
+        scheme = self.params['scheme']
+        return tuple(interpolate_periods(store_anchors(store, c, first_year), periods, scheme)
+                     for c in ('JPY', 'TRY'))
+
+    def derive(self, rates, ppp_jpy, ppp_try, offset):
+        mci = calculate_mci_batch(rates['S_USDJPY'], rates['S_USDTRY'], ppp_jpy, ppp_try)
+        pct = (mci['S_TRYJPY'] / mci['PPP_TRYJPY'] - 1) * 100
+        lines = []
+        for k in range(offset, len(ppp_jpy)):
+            d_m_try = mci['m_TRY'][k] - mci['m_TRY'][k - 1] if k else ''
+            lines.append(format_line([
+                rates['date'][k], rates['S_USDJPY'][k], rates['S_USDTRY'][k], mci['S_TRYJPY'][k],
+                ppp_jpy[k], ppp_try[k], mci['d_USDJPY'][k], mci['d_USDTRY'][k],
+                mci['m_USD'][k], mci['m_JPY'][k], mci['m_TRY'][k], d_m_try, pct[k],
+            ]))
+        return lines
+
+
+class WindowNode(Node):
+    """
+    Row-aligned node whose row i depends on rows [i - lookback, i] of one upstream table.
+
+    Output keeps the upstream columns and appends new ones, computed with pandas and
+    written with float_format='%.15g' exactly like create_backtest_dataset.py and
+    add_rolling_averages.py.
+    """
+
+    upstream = ''
+    float_format = '%.15g'
+
+    def lookback(self) -> Optional[int]:
+        """Number of earlier upstream rows each row depends on (None = all of them)."""
+        raise NotImplementedError
+
+    def new_columns(self) -> List[str]:
+        raise NotImplementedError
+
+    def compute(self, df: pd.DataFrame):
+        """Add new_columns() to df in place."""
+        raise NotImplementedError
+
+    def header(self, ctx):
+        return ctx.table(self.upstream)[0] + self.new_columns()
+
+    def fingerprints(self, ctx):
+        _, lines = ctx.table(self.upstream)
+        if self.lookback() is None:
+            # Row i depends on the whole history: chain the fingerprints
+            result = []
+            for line in lines:
+                result.append(row_fingerprint(result[-1] if result else None, line))
+            return result
+        w = self.lookback()
+        return [row_fingerprint(*lines[max(i - w, 0):i + 1]) for i in range(len(lines))]
+
+    def build(self, ctx, start, stop):
+        header, lines = ctx.table(self.upstream)
+        lo = 0 if self.lookback() is None else max(start - self.lookback(), 0)
+        return self.derive(header, lines[lo:stop], start - lo)
+
+    def derive(self, header: Sequence[str], lines: Sequence[str], offset: int) -> List[str]:
+        """Output lines for upstream lines[offset:] (lines before offset are look-back rows)."""
+        df = pd.read_csv(io.StringIO('\n'.join([format_line(header)] + list(lines))))
+        self.compute(df)
+        out = io.StringIO()
+        df.iloc[offset:].to_csv(out, index=False, header=False,
+                                float_format=self.float_format, lineterminator='\n')
+        return out.getvalue().splitlines()
+
+
+class DeltasNode(WindowNode):
+    """delta_m_* = month-on-month change of each m coordinate (create_backtest_dataset.py)."""
+
+    name = 'deltas'
+    output = 'monthly_mci_with_deltas_2022_2025.csv'
+    deps = ('mci_interpolated',)
+    upstream = 'mci_interpolated'
+
+    def lookback(self):
+        return 1
+
+    def new_columns(self):
+        return [f'delta_m_{c}' for c in CURRENCIES]
+
+    def compute(self, df):
+        for c in CURRENCIES:
+            df[f'delta_m_{c}'] = df[f'm_{c}'].diff()
+
+
+class RollingNode(WindowNode):
+    """avg_delta_m_*_<w>m = rolling mean of delta_m_* over `window` months, min_periods=1 (add_rolling_averages.py)."""
+
+    name = 'rolling'
+    output = 'monthly_mci_backtest_ready_2022_2025.csv'
+    deps = ('deltas',)
+    upstream = 'deltas'
+
+    def lookback(self):
+        # pandas keeps a running (compensated) sum across windows, so the last bits of
+        # each mean depend on every earlier row. Recompute from the first changed row
+        # to the end to stay bit-identical with add_rolling_averages.py.
+        return None
+
+    def new_columns(self):
+        return [f'avg_delta_m_{c}_{self.params["window"]}m' for c in CURRENCIES]
+
+    def compute(self, df):
+        window = self.params['window']
+        for c in CURRENCIES:
+            df[f'avg_delta_m_{c}_{window}m'] = df[f'delta_m_{c}'].rolling(window=window, min_periods=1).mean()
+
+
+class BacktestNode(Node):
+    """
+    One-month-ahead predictions from the rolling averages (backtest_with_rolling_avg.py).
+
+    Input row i (base month) produces an output row from rows i and i+1, or none
+    when there is no next month or no rolling average yet.
+    """
+
+    name = 'backtest'
+    output = '../backtest/backtest_rolling_avg_results.csv'
+    deps = ('rolling',)
+    upstream = 'rolling'
+    version = 1
+
+    FIELDS = ['base_month', 'target_month', 'pred_USDJPY', 'actual_USDJPY', 'error_pct_USDJPY',
+              'pred_USDTRY', 'actual_USDTRY', 'error_pct_USDTRY', 'pred_TRYJPY', 'actual_TRYJPY',
+              'error_pct_TRYJPY', 'avg_delta_m_USD', 'avg_delta_m_JPY', 'avg_delta_m_TRY']
+
+    def header(self, ctx):
+        return self.FIELDS
+
+    def fingerprints(self, ctx):
+        _, lines = ctx.table(self.upstream)
+        return [row_fingerprint(*lines[i:i + 2], i + 1 < len(lines)) for i in range(len(lines))]
+
+    def build(self, ctx, start, stop):
+        from backtest_with_rolling_avg import run_single_backtest
+
+        header, lines = ctx.table(self.upstream)
+        data = list(csv.DictReader([','.join(header)] + lines[start:stop + 1]))
+        result = []
+        for k in range(stop - start):
+            if start + k + 1 >= len(lines):
+                result.append(None)
+                continue
+            row = run_single_backtest(data[k:k + 2], data[k]['date'])
+            result.append(None if 'error' in row else format_line([row[f] for f in self.FIELDS]))
+        return result
+
+
+def make_nodes(scheme: str = 'linear', window: int = 3, first_anchor_year: int = 2022) -> Dict[str, Node]:
+    """The dataset graph with its parameters."""
+    nodes = [
+        MCIFixedNode(),
+        MCIInterpolatedNode(scheme=scheme, first_anchor_year=first_anchor_year),
+        DeltasNode(),
+        RollingNode(window=window),
+        BacktestNode(),
+    ]
+    return {node.name: node for node in nodes}
+
+
+def load_state(path: str = STATE_FILE) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    return state.get('nodes', {}) if state.get('version') == STATE_VERSION else {}
+
+
+def save_state(nodes_state: Dict, path: str = STATE_FILE):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': STATE_VERSION, 'nodes': nodes_state}, f, indent=1)
+    os.replace(tmp, path)
+
+
+def node_key(node: Node, nodes: Dict[str, Node]) -> str:
+    """Hash of the node's version, parameters and input contents."""
+    inputs = {src: file_hash(os.path.join(HERE, src)) for src in node.sources}
+    inputs.update({dep: file_hash(nodes[dep].path) for dep in node.deps})
+    payload = {'node': node.name, 'version': node.version, 'params': node.params, 'inputs': inputs}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def build_order(nodes: Dict[str, Node], targets: Sequence[str]) -> List[str]:
+    """Targets and their dependencies in dependency order."""
+    order = []
+
+    def visit(name, stack=()):
+        if name in stack:
+            raise ValueError(f"Dependency cycle: {' -> '.join(stack + (name,))}")
+        if name in order:
+            return
+        for dep in nodes[name].deps:
+            visit(dep, stack + (name,))
+        order.append(name)
+
+    for name in targets:
+        if name not in nodes:
+            raise ValueError(f"Unknown node {name}, expected one of {list(nodes)}")
+        visit(name)
+    return order
+
+
+def build_node(node: Node, ctx: BuildContext, previous: Dict, dry_run: bool = False) -> Dict:
+    """
+    Bring one node up to date.
+
+    Returns the node's new state plus 'dirty' (recomputed input rows) and 'written' (bytes rewritten).
+    """
+    fingerprints = node.fingerprints(ctx)
+    header = format_line(node.header(ctx))
+
+    # Previous output rows are reusable only if the file still starts with what we wrote
+    # last time (rows appended since, e.g. by append_monthly.py, are checked as new rows)
+    old_lines, old_emitted, old_fingerprints = [], [], []
+    size = previous.get('size')
+    if previous and size is not None and file_hash(node.path, size) == previous.get('output'):
+        old_header, old_lines, _ = read_table(node.path)
+        if format_line(old_header) == header:
+            old_fingerprints = previous.get('rows', [])
+            old_emitted = previous.get('emitted', [])
+            old_lines = old_lines[:sum(old_emitted)]
+        else:
+            old_lines = []
+
+    n = len(fingerprints)
+    dirty = [i for i in range(n) if i >= len(old_fingerprints) or fingerprints[i] != old_fingerprints[i]]
+
+    # Old output line of each reusable input row
+    old_line_of = {}
+    cursor = 0
+    for i, emitted in enumerate(old_emitted[:len(old_fingerprints)]):
+        if emitted:
+            old_line_of[i] = old_lines[cursor] if cursor < len(old_lines) else None
+            cursor += 1
+
+    new_rows: Dict[int, Optional[str]] = {}
+    if not dry_run:
+        for start, stop in contiguous_ranges(dirty):
+            for i, line in zip(range(start, stop), node.build(ctx, start, stop)):
+                new_rows[i] = line
+
+    state = {'rows': fingerprints, 'dirty': dirty, 'written': 0}
+    if dry_run:
+        return state
+
+    lines = []
+    emitted = []
+    for i in range(n):
+        line = new_rows[i] if i in new_rows else old_line_of.get(i)
+        emitted.append(line is not None)
+        if line is not None:
+            lines.append(line)
+
+    # Rewrite the file only from the first byte that differs
+    content = ''.join(line + node.newline for line in [header] + lines).encode()
+    old_content = None
+    if os.path.exists(node.path):
+        with open(node.path, 'rb') as f:
+            old_content = f.read()
+    if old_content != content:
+        offset = len(os.path.commonprefix([old_content, content])) if old_content is not None else 0
+        with open(node.path, 'r+b' if old_content is not None else 'wb') as f:
+            f.seek(offset)
+            f.write(content[offset:])
+            f.truncate()
+        state['written'] = len(content) - offset
+        ctx.invalidate(node.name)
+
+    state.update({'emitted': emitted, 'output': file_hash(node.path), 'size': os.path.getsize(node.path)})
+    return state
+
+
+def build(targets: Sequence[str] = None, force: bool = False, dry_run: bool = False,
+          nodes: Dict[str, Node] = None, state_path: str = STATE_FILE) -> Dict[str, Dict]:
+    """
+    Build the targets (default: every node), rebuilding only stale nodes and rows.
+
+    Returns {node: {'status': 'up-to-date' | 'rebuilt', 'dirty': [...], 'rows': n, 'written': bytes}}.
+    """
+    nodes = nodes or make_nodes()
+    state = {} if force else load_state(state_path)
+    ctx = BuildContext(nodes)
+    report = {}
+
+    stale = set()
+    for name in build_order(nodes, targets or list(nodes)):
+        node = nodes[name]
+        key = node_key(node, nodes)
+        previous = state.get(name, {})
+        if dry_run and stale.intersection(node.deps):
+            # Upstream outputs are not rebuilt in a dry run, so the dirty rows are unknown
+            stale.add(name)
+            report[name] = {'status': 'stale', 'dirty': None, 'rows': len(previous.get('rows', [])), 'written': 0}
+            continue
+        if previous.get('key') == key and previous.get('output') == file_hash(node.path):
+            report[name] = {'status': 'up-to-date', 'dirty': [], 'rows': len(previous.get('rows', [])), 'written': 0}
+            continue
+
+        params_changed = previous.get('params') != node.params or previous.get('version') != node.version
+        result = build_node(node, ctx, {} if params_changed else previous, dry_run)
+        report[name] = {'status': 'stale' if dry_run else 'rebuilt', 'dirty': result['dirty'],
+                        'rows': len(result['rows']), 'written': result['written']}
+        if dry_run:
+            stale.add(name)
+            continue
+        state[name] = {'key': node_key(node, nodes), 'params': node.params, 'version': node.version,
+                       'output': result['output'], 'size': result['size'], 'rows': result['rows'], 'emitted': result['emitted']}
+        save_state(state, state_path)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental build of the monthly MCI datasets')
+    parser.add_argument('targets', nargs='*', help='nodes to build (default: all)')
+    parser.add_argument('--force', action='store_true', help='ignore the stored build state')
+    parser.add_argument('--dry-run', action='store_true', help='only report stale nodes and dirty rows')
+    parser.add_argument('--scheme', choices=SCHEMES, default='linear', help='PPP interpolation scheme')
+    parser.add_argument('--window', type=int, default=3, help='rolling average window in months')
+    parser.add_argument('--list', action='store_true', help='list the nodes and exit')
+    args = parser.parse_args()
+
+    nodes = make_nodes(scheme=args.scheme, window=args.window)
+    if args.list:
+        for node in nodes.values():
+            inputs = ', '.join(node.sources + node.deps)
+            print(f"{node.name:18s} {node.output}  <- {inputs}")
+        return
+
+    report = build(args.targets, force=args.force, dry_run=args.dry_run, nodes=nodes)
+    for name, result in report.items():
+        if result['status'] == 'up-to-date':
+            print(f"✓ {name}: up to date")
+            continue
+        if result['dirty'] is None:
+            print(f"… {name}: stale (upstream changes)")
+            continue
+        ranges = ', '.join(f"{start}-{stop - 1}" if stop - start > 1 else str(start)
+                           for start, stop in contiguous_ranges(result['dirty'])) or 'none'
+        print(f"{'…' if args.dry_run else '↻'} {name}: {len(result['dirty'])}/{result['rows']} rows "
+              f"{'stale' if args.dry_run else 'recomputed'} (rows {ranges}), {result['written']} bytes written")
+
+
+if __name__ == '__main__':
+    main()
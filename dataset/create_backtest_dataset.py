@@ -6,27 +6,40 @@
 前月とのm座標変動値（delta_m_USD, delta_m_JPY, delta_m_TRY）を追加
 """
 
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+from profiling import pop_profile_flag, setup_profiler
+
+# --profile または MCI_PROFILE でステージごとの計測を出力
+prof = setup_profiler('create_backtest_dataset', pop_profile_flag())
+
 # 既存データを読み込み
 input_file = 'monthly_mci_interpolated_ppp_2022_2025.csv'
 output_file = 'monthly_mci_with_deltas_2022_2025.csv'
 
 print(f"Reading {input_file}...")
-df = pd.read_csv(input_file)
+with prof.stage('load') as stage:
+    df = pd.read_csv(input_file)
+    stage.rows = len(df)
 
 # 前月とのm座標変動を計算
-df['delta_m_USD'] = df['m_USD'].diff()
-df['delta_m_JPY'] = df['m_JPY'].diff()
-df['delta_m_TRY'] = df['m_TRY'].diff()
+with prof.stage('compute', rows=len(df)):
+    df['delta_m_USD'] = df['m_USD'].diff()
+    df['delta_m_JPY'] = df['m_JPY'].diff()
+    df['delta_m_TRY'] = df['m_TRY'].diff()
 
 # 最初の月はNaNになるので、そのまま残す（またはゼロにする場合は .fillna(0)）
 # ここではNaNのままにして、バックテストで適切に処理する
 
 # 結果を保存
 print(f"Saving to {output_file}...")
-df.to_csv(output_file, index=False, float_format='%.15g')
+with prof.stage('write', rows=len(df)):
+    df.to_csv(output_file, index=False, float_format='%.15g')
 
 print("\n=== Summary ===")
 print(f"Total rows: {len(df)}")
@@ -7,94 +7,92 @@ Updates from:
 """
 
 import csv
-import math
+import os
+import sys
 from typing import List, Dict
 
-# IMF WEO October 2025 PPP values
-PPP_JPY_2025 = 93.52
-PPP_TRY_2025 = 16.51
-
-def calculate_mci(S_USDJPY: float, S_USDTRY: float, PPP_JPY: float, PPP_TRY: float) -> Dict:
-    """Calculate MCI coordinates and related metrics."""
-    # PPP deviation rates
-    d_USDJPY = math.log(S_USDJPY / PPP_JPY)
-    d_USDTRY = math.log(S_USDTRY / PPP_TRY)
-
-    # MCI coordinates (clr transformation)
-    m_USD = (d_USDJPY + d_USDTRY) / 3
-    m_JPY = (-2 * d_USDJPY + d_USDTRY) / 3
-    m_TRY = (d_USDJPY - 2 * d_USDTRY) / 3
-
-    # Cross rates
-    S_TRYJPY = S_USDJPY / S_USDTRY
-    PPP_TRYJPY = PPP_JPY / PPP_TRY
-    d_TRYJPY = math.log(S_TRYJPY / PPP_TRYJPY)
-
-    return {
-        'd_USDJPY': d_USDJPY,
-        'd_USDTRY': d_USDTRY,
-        'm_USD': m_USD,
-        'm_JPY': m_JPY,
-        'm_TRY': m_TRY,
-        'S_TRYJPY': S_TRYJPY,
-        'PPP_TRYJPY': PPP_TRYJPY,
-        'd_TRYJPY': d_TRYJPY
-    }
-
-def update_monthly_mci_analysis():
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+from mci_engine import calculate_mci_batch
+from ppp_store import load_ppp_store
+from profiling import NULL_PROFILER, pop_profile_flag, setup_profiler
+
+# IMF WEO October 2025 PPP values (single source: tools/ppp_store.py)
+PPP_JPY_2025 = load_ppp_store().get('JPY', 2025)
+PPP_TRY_2025 = load_ppp_store().get('TRY', 2025)
+
+def calculate_mci_2025(rows: List[Dict]) -> Dict[int, Dict[str, float]]:
+    """Calculate MCI for all 2025 rows in one batch call, keyed by row index."""
+    indices = [i for i, row in enumerate(rows) if row['date'].startswith('2025')]
+    if not indices:
+        return {}
+
+    S_USDJPY = np.array([float(rows[i]['S_USDJPY']) for i in indices])
+    S_USDTRY = np.array([float(rows[i]['S_USDTRY']) for i in indices])
+    mci = calculate_mci_batch(S_USDJPY, S_USDTRY, PPP_JPY_2025, PPP_TRY_2025)
+
+    names = list(mci)
+    columns = [mci[name].tolist() for name in names]
+    return {i: dict(zip(names, values)) for i, values in zip(indices, zip(*columns))}
+
+def update_monthly_mci_analysis(prof=NULL_PROFILER):
     """Update monthly_mci_fixed_ppp_2022_2025.csv with new 2025 PPP values."""
     print("Updating monthly_mci_fixed_ppp_2022_2025.csv...")
 
     rows = []
-    with open('monthly_mci_fixed_ppp_2022_2025.csv', 'r', encoding='utf-8') as f:
+    with prof.stage('fixed/load') as stage, \
+            open('monthly_mci_fixed_ppp_2022_2025.csv', 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         rows = list(reader)
+        stage.rows = len(rows)
 
-    # Track previous m_TRY for D_mTRY calculation
-    prev_m_TRY = None
+    with prof.stage('fixed/compute', rows=len(rows)):
+        # Calculate all 2025 rows with new PPP values at once
+        results = calculate_mci_2025(rows)
 
-    for i, row in enumerate(rows):
-        date = row['date']
+        # Track previous m_TRY for D_mTRY calculation
+        prev_m_TRY = None
 
-        # Only update 2025 data
-        if not date.startswith('2025'):
-            prev_m_TRY = float(row['m_TRY'])
-            continue
+        for i, row in enumerate(rows):
+            date = row['date']
 
-        S_USDJPY = float(row['S_USDJPY'])
-        S_USDTRY = float(row['S_USDTRY'])
+            # Only update 2025 data
+            if not date.startswith('2025'):
+                prev_m_TRY = float(row['m_TRY'])
+                continue
 
-        # Calculate with new PPP values
-        result = calculate_mci(S_USDJPY, S_USDTRY, PPP_JPY_2025, PPP_TRY_2025)
+            result = results[i]
 
-        # Update row
-        row['PPP_JPY'] = str(PPP_JPY_2025)
-        row['PPP_TRY'] = str(PPP_TRY_2025)
-        row['d_USDJPY'] = str(result['d_USDJPY'])
-        row['d_USDTRY'] = str(result['d_USDTRY'])
-        row['m_USD'] = str(result['m_USD'])
-        row['m_JPY'] = str(result['m_JPY'])
-        row['m_TRY'] = str(result['m_TRY'])
+            # Update row
+            row['PPP_JPY'] = str(PPP_JPY_2025)
+            row['PPP_TRY'] = str(PPP_TRY_2025)
+            row['d_USDJPY'] = str(result['d_USDJPY'])
+            row['d_USDTRY'] = str(result['d_USDTRY'])
+            row['m_USD'] = str(result['m_USD'])
+            row['m_JPY'] = str(result['m_JPY'])
+            row['m_TRY'] = str(result['m_TRY'])
 
-        # Calculate D_mTRY (monthly change)
-        if prev_m_TRY is not None:
-            D_mTRY = result['m_TRY'] - prev_m_TRY
-            row['D_mTRY'] = str(D_mTRY)
+            # Calculate D_mTRY (monthly change)
+            if prev_m_TRY is not None:
+                D_mTRY = result['m_TRY'] - prev_m_TRY
+                row['D_mTRY'] = str(D_mTRY)
 
-            # Calculate percentage change in TRY/JPY
-            if i > 0:
-                prev_S_TRYJPY = float(rows[i-1]['S_TRYJPY'])
-                pct_TRYJPY = ((result['S_TRYJPY'] - prev_S_TRYJPY) / prev_S_TRYJPY) * 100
-                row['pct_TRYJPY'] = str(pct_TRYJPY)
+                # Calculate percentage change in TRY/JPY
+                if i > 0:
+                    prev_S_TRYJPY = float(rows[i-1]['S_TRYJPY'])
+                    pct_TRYJPY = ((result['S_TRYJPY'] - prev_S_TRYJPY) / prev_S_TRYJPY) * 100
+                    row['pct_TRYJPY'] = str(pct_TRYJPY)
 
-        prev_m_TRY = result['m_TRY']
+            prev_m_TRY = result['m_TRY']
 
-        # Update PPP_changed flag for January 2025
-        if date == '2025-01':
-            row['PPP_changed'] = 'YES'
+            # Update PPP_changed flag for January 2025
+            if date == '2025-01':
+                row['PPP_changed'] = 'YES'
 
     # Write updated data
-    with open('monthly_mci_fixed_ppp_2022_2025.csv', 'w', encoding='utf-8', newline='') as f:
+    with prof.stage('fixed/write', rows=len(rows)), \
+            open('monthly_mci_fixed_ppp_2022_2025.csv', 'w', encoding='utf-8', newline='') as f:
         fieldnames = ['date', 'S_USDJPY', 'S_USDTRY', 'S_TRYJPY', 'PPP_JPY', 'PPP_TRY',
                      'PPP_changed', 'd_USDJPY', 'd_USDTRY', 'm_USD', 'm_JPY', 'm_TRY',
                      'D_mTRY', 'pct_TRYJPY']
@@ -104,7 +102,7 @@ def update_monthly_mci_analysis():
 
     print(f"✓ Updated {sum(1 for r in rows if r['date'].startswith('2025'))} rows for 2025")
 
-def update_monthly_mci_interpolated():
+def update_monthly_mci_interpolated(prof=NULL_PROFILER):
     """Update monthly_mci_interpolated_ppp_2022_2025.csv with new 2025 PPP values.
     Note: This uses monthly interpolated PPP, so we need to recalculate interpolation for 2025.
     """
@@ -112,58 +110,61 @@ def update_monthly_mci_interpolated():
 
     # Read existing data
     rows = []
-    with open('monthly_mci_interpolated_ppp_2022_2025.csv', 'r', encoding='utf-8') as f:
+    with prof.stage('interpolated/load') as stage, \
+            open('monthly_mci_interpolated_ppp_2022_2025.csv', 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         rows = list(reader)
+        stage.rows = len(rows)
 
     # For 2025, we only have one year's PPP value (no next year for interpolation)
     # So we'll use the same PPP value throughout 2025
     # In 2026 when we get new values, we can interpolate between 2025 and 2026
 
-    prev_m_TRY = None
+    # For 2025, use constant PPP (no interpolation without 2026 data)
+    PPP_JPY = PPP_JPY_2025
+    PPP_TRY = PPP_TRY_2025
 
-    for i, row in enumerate(rows):
-        date = row['date']
+    with prof.stage('interpolated/compute', rows=len(rows)):
+        # Calculate all 2025 rows with new PPP values at once
+        results = calculate_mci_2025(rows)
 
-        # Only update 2025 data
-        if not date.startswith('2025'):
-            prev_m_TRY = float(row['m_TRY'])
-            continue
+        prev_m_TRY = None
 
-        S_USDJPY = float(row['S_USDJPY'])
-        S_USDTRY = float(row['S_USDTRY'])
+        for i, row in enumerate(rows):
+            date = row['date']
 
-        # For 2025, use constant PPP (no interpolation without 2026 data)
-        PPP_JPY = PPP_JPY_2025
-        PPP_TRY = PPP_TRY_2025
+            # Only update 2025 data
+            if not date.startswith('2025'):
+                prev_m_TRY = float(row['m_TRY'])
+                continue
 
-        # Calculate with new PPP values
-        result = calculate_mci(S_USDJPY, S_USDTRY, PPP_JPY, PPP_TRY)
+            result = results[i]
 
-        # Update row
-        row['PPP_JPY'] = str(PPP_JPY)
-        row['PPP_TRY'] = str(PPP_TRY)
-        row['d_USDJPY'] = str(result['d_USDJPY'])
-        row['d_USDTRY'] = str(result['d_USDTRY'])
-        row['m_USD'] = str(result['m_USD'])
-        row['m_JPY'] = str(result['m_JPY'])
-        row['m_TRY'] = str(result['m_TRY'])
+            # Update row
+            row['PPP_JPY'] = str(PPP_JPY)
+            row['PPP_TRY'] = str(PPP_TRY)
+            row['d_USDJPY'] = str(result['d_USDJPY'])
+            row['d_USDTRY'] = str(result['d_USDTRY'])
+            row['m_USD'] = str(result['m_USD'])
+            row['m_JPY'] = str(result['m_JPY'])
+            row['m_TRY'] = str(result['m_TRY'])
 
-        # Calculate D_mTRY (monthly change)
-        if prev_m_TRY is not None:
-            D_mTRY = result['m_TRY'] - prev_m_TRY
-            row['D_mTRY'] = str(D_mTRY)
+            # Calculate D_mTRY (monthly change)
+            if prev_m_TRY is not None:
+                D_mTRY = result['m_TRY'] - prev_m_TRY
+                row['D_mTRY'] = str(D_mTRY)
 
-            # Calculate percentage change in TRY/JPY
-            if i > 0:
-                prev_S_TRYJPY = float(rows[i-1]['S_TRYJPY'])
-                pct_TRYJPY = ((result['S_TRYJPY'] - prev_S_TRYJPY) / prev_S_TRYJPY) * 100
-                row['pct_TRYJPY'] = str(pct_TRYJPY)
+                # Calculate percentage change in TRY/JPY
+                if i > 0:
+                    prev_S_TRYJPY = float(rows[i-1]['S_TRYJPY'])
+                    pct_TRYJPY = ((result['S_TRYJPY'] - prev_S_TRYJPY) / prev_S_TRYJPY) * 100
+                    row['pct_TRYJPY'] = str(pct_TRYJPY)
 
-        prev_m_TRY = result['m_TRY']
+            prev_m_TRY = result['m_TRY']
 
     # Write updated data
-    with open('monthly_mci_interpolated_ppp_2022_2025.csv', 'w', encoding='utf-8', newline='') as f:
+    with prof.stage('interpolated/write', rows=len(rows)), \
+            open('monthly_mci_interpolated_ppp_2022_2025.csv', 'w', encoding='utf-8', newline='') as f:
         fieldnames = ['date', 'S_USDJPY', 'S_USDTRY', 'S_TRYJPY', 'PPP_JPY', 'PPP_TRY',
                      'd_USDJPY', 'd_USDTRY', 'm_USD', 'm_JPY', 'm_TRY',
                      'D_mTRY', 'pct_TRYJPY']
@@ -175,6 +176,9 @@ def update_monthly_mci_interpolated():
 
 def main():
     """Main execution."""
+    # --profile or MCI_PROFILE: per-stage timing, memory and row counts as JSON lines
+    prof = setup_profiler('recalculate_monthly_fixed_ppp', pop_profile_flag())
+
     print("=" * 60)
     print("Recalculating 2025 Monthly MCI Data")
     print("=" * 60)
@@ -184,8 +188,8 @@ def main():
     print("=" * 60)
     print()
 
-    update_monthly_mci_analysis()
-    update_monthly_mci_interpolated()
+    update_monthly_mci_analysis(prof)
+    update_monthly_mci_interpolated(prof)
 
     print()
     print("=" * 60)
@@ -4,9 +4,12 @@
 Recalculate monthly_mci_interpolated_ppp_2022_2025.csv with proper linear interpolation of PPP values.
 
 Interpolation logic:
-- Each year's January uses that year's annual PPP value
-- From January to December, PPP linearly interpolates to next year's value
-- Example: 2024-01 uses 2024 PPP, 2024-12 approaches 2025 PPP
+- Annual PPP is treated as the December value of that year
+- From January to December, PPP interpolates from the previous year's value
+- Example: 2024-01 starts from 2023 PPP, 2024-12 reaches 2024 PPP
+- Months before the first anchor year hold the first value (2022)
+- The curve is built in one vectorized call by tools/ppp_interpolation.py
+  (--scheme geometric / pchip for log-linear or monotone spline curves)
 
 Annual PPP values:
 - 2022: JPY=92.5, TRY=4.975
@@ -15,19 +18,29 @@ Annual PPP values:
 - 2025: JPY=93.52, TRY=16.51 (IMF WEO October 2025 estimate)
 """
 
+import argparse
 import csv
-import math
+import os
+import sys
 from typing import Dict
 
-# Annual PPP values (December values)
-ANNUAL_PPP = {
-    2022: {"JPY": 92.5, "TRY": 4.975},
-    2023: {"JPY": 92.84, "TRY": 8.074},
-    2024: {"JPY": 93.2, "TRY": 12.55},
-    2025: {"JPY": 93.52, "TRY": 16.51},  # IMF WEO October 2025 estimate (to be published in 2026)
-}
+import numpy as np
 
-def interpolate_ppp(year: int, month: int) -> Dict[str, float]:
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+from mci_engine import calculate_mci_batch
+from ppp_interpolation import SCHEMES, interpolate_positions, ppp_curve
+from ppp_store import load_ppp_store
+from profiling import add_profile_argument, setup_profiler
+
+# Annual PPP values (December values), 2022 onwards from the shared PPP store
+# (2025 is the IMF WEO October 2025 estimate, to be published in 2026)
+ANNUAL_PPP = {year: load_ppp_store().annual(year) for year in load_ppp_store().years if year >= 2022}
+
+def anchors(currency: str):
+    """((year, PPP), ...) anchors for the interpolation engine."""
+    return tuple((year, ppp[currency]) for year, ppp in sorted(ANNUAL_PPP.items()))
+
+def interpolate_ppp(year: int, month: int, scheme: str = "linear") -> Dict[str, float]:
     """
     Calculate interpolated PPP for a given year-month.
 
@@ -37,115 +50,77 @@ def interpolate_ppp(year: int, month: int) -> Dict[str, float]:
 
     Example: 2025-01 starts from 2024 Dec, 2025-12 reaches 2025 Dec
     """
-    # Previous year's December PPP
-    if year == 2022:
-        prev_year_ppp = ANNUAL_PPP[2022]  # For 2022-01, start from 2022 value
-    else:
-        prev_year_ppp = ANNUAL_PPP[year - 1]
-
-    current_year_ppp = ANNUAL_PPP[year]
-
-    # Linear interpolation from previous Dec to current Dec
-    ppp_jpy = prev_year_ppp["JPY"] + (current_year_ppp["JPY"] - prev_year_ppp["JPY"]) * month / 12
-    ppp_try = prev_year_ppp["TRY"] + (current_year_ppp["TRY"] - prev_year_ppp["TRY"]) * month / 12
-
-    return {"JPY": ppp_jpy, "TRY": ppp_try}
-
-def calculate_mci(S_USDJPY: float, S_USDTRY: float, PPP_JPY: float, PPP_TRY: float) -> Dict:
-    """Calculate MCI coordinates and related metrics with interpolated PPP."""
-    # PPP deviation rates
-    d_USDJPY = math.log(S_USDJPY / PPP_JPY)
-    d_USDTRY = math.log(S_USDTRY / PPP_TRY)
-
-    # MCI coordinates (centered log-ratio transformation)
-    m_USD = (d_USDJPY + d_USDTRY) / 3
-    m_JPY = (-2 * d_USDJPY + d_USDTRY) / 3
-    m_TRY = (d_USDJPY - 2 * d_USDTRY) / 3
-
-    # Cross rate
-    S_TRYJPY = S_USDJPY / S_USDTRY
-    PPP_TRYJPY = PPP_JPY / PPP_TRY
-    d_TRYJPY = math.log(S_TRYJPY / PPP_TRYJPY)
-
     return {
-        "d_USDJPY": d_USDJPY,
-        "d_USDTRY": d_USDTRY,
-        "m_USD": m_USD,
-        "m_JPY": m_JPY,
-        "m_TRY": m_TRY,
-        "S_TRYJPY": S_TRYJPY,
-        "PPP_TRYJPY": PPP_TRYJPY,
-        "d_TRYJPY": d_TRYJPY,
+        currency: float(interpolate_positions(anchors(currency), year, month, 12, scheme=scheme)[()])
+        for currency in ("JPY", "TRY")
     }
 
 def main():
+    parser = argparse.ArgumentParser(description="Recalculate monthly MCI with interpolated PPP")
+    parser.add_argument("--scheme", choices=SCHEMES, default="linear",
+                        help="PPP interpolation scheme (default: linear)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    prof = setup_profiler("recalculate_monthly_interpolated_ppp", args.profile)
+
     # Read monthly exchange rate data
-    with open("monthly_exchange_rates_2022_2025.csv", "r") as f:
+    with prof.stage("load") as stage, open("monthly_exchange_rates_2022_2025.csv", "r") as f:
         reader = csv.DictReader(f)
         rates_data = list(reader)
+        stage.rows = len(rates_data)
 
-    # Recalculate with interpolated PPP
-    output_rows = []
-    prev_m_TRY = None
+    with prof.stage("compute", rows=len(rates_data)):
+        # Interpolate PPP for every month (one curve per currency, cached)
+        dates = [row["date"] for row in rates_data]
+        periods, PPP_JPY = ppp_curve(anchors("JPY"), dates[0], dates[-1], "M", args.scheme)
+        _, PPP_TRY = ppp_curve(anchors("TRY"), dates[0], dates[-1], "M", args.scheme)
+        if [str(p) for p in periods] != dates:
+            raise ValueError("monthly_exchange_rates_2022_2025.csv must contain consecutive months")
 
-    for row in rates_data:
-        date = row["date"]
-        year, month = map(int, date.split("-"))
+        S_USDJPY = np.array([float(row["S_USDJPY"]) for row in rates_data])
+        S_USDTRY = np.array([float(row["S_USDTRY"]) for row in rates_data])
 
-        S_USDJPY = float(row["S_USDJPY"])
-        S_USDTRY = float(row["S_USDTRY"])
-
-        # Interpolate PPP
-        ppp = interpolate_ppp(year, month)
-        PPP_JPY = ppp["JPY"]
-        PPP_TRY = ppp["TRY"]
-
-        # Calculate MCI
-        mci = calculate_mci(S_USDJPY, S_USDTRY, PPP_JPY, PPP_TRY)
+        # Recalculate with interpolated PPP (all months in one batch)
+        mci = calculate_mci_batch(S_USDJPY, S_USDTRY, PPP_JPY, PPP_TRY)
 
         # Calculate D_mTRY (monthly change in TRY coordinate)
-        if prev_m_TRY is not None:
-            D_mTRY = mci["m_TRY"] - prev_m_TRY
-        else:
-            D_mTRY = None
-        prev_m_TRY = mci["m_TRY"]
+        D_mTRY = [""] + np.diff(mci["m_TRY"]).tolist()
 
         # Calculate pct_TRYJPY (percentage change from PPP)
         pct_TRYJPY = (mci["S_TRYJPY"] / mci["PPP_TRYJPY"] - 1) * 100
 
-        output_rows.append({
-            "date": date,
-            "S_USDJPY": S_USDJPY,
-            "S_USDTRY": S_USDTRY,
-            "S_TRYJPY": mci["S_TRYJPY"],
-            "PPP_JPY": PPP_JPY,
-            "PPP_TRY": PPP_TRY,
-            "d_USDJPY": mci["d_USDJPY"],
-            "d_USDTRY": mci["d_USDTRY"],
-            "m_USD": mci["m_USD"],
-            "m_JPY": mci["m_JPY"],
-            "m_TRY": mci["m_TRY"],
-            "D_mTRY": D_mTRY if D_mTRY is not None else "",
-            "pct_TRYJPY": pct_TRYJPY,
-        })
+    columns = {
+        "date": dates,
+        "S_USDJPY": S_USDJPY.tolist(),
+        "S_USDTRY": S_USDTRY.tolist(),
+        "S_TRYJPY": mci["S_TRYJPY"].tolist(),
+        "PPP_JPY": PPP_JPY.tolist(),
+        "PPP_TRY": PPP_TRY.tolist(),
+        "d_USDJPY": mci["d_USDJPY"].tolist(),
+        "d_USDTRY": mci["d_USDTRY"].tolist(),
+        "m_USD": mci["m_USD"].tolist(),
+        "m_JPY": mci["m_JPY"].tolist(),
+        "m_TRY": mci["m_TRY"].tolist(),
+        "D_mTRY": D_mTRY,
+        "pct_TRYJPY": pct_TRYJPY.tolist(),
+    }
 
     # Write to CSV
-    with open("monthly_mci_interpolated_ppp_2022_2025.csv", "w", newline="") as f:
+    with prof.stage("write", rows=len(dates)), \
+            open("monthly_mci_interpolated_ppp_2022_2025.csv", "w", newline="") as f:
         fieldnames = ["date", "S_USDJPY", "S_USDTRY", "S_TRYJPY", "PPP_JPY", "PPP_TRY",
                       "d_USDJPY", "d_USDTRY", "m_USD", "m_JPY", "m_TRY", "D_mTRY", "pct_TRYJPY"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(output_rows)
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(zip(*(columns[name] for name in fieldnames)))
 
     print("=" * 60)
     print("✓ monthly_mci_interpolated_ppp_2022_2025.csv has been recalculated!")
     print("=" * 60)
-    print("\nInterpolated PPP values (sample):")
-    print(f"2024-01: JPY={interpolate_ppp(2024, 1)['JPY']:.2f}, TRY={interpolate_ppp(2024, 1)['TRY']:.2f}")
-    print(f"2024-06: JPY={interpolate_ppp(2024, 6)['JPY']:.2f}, TRY={interpolate_ppp(2024, 6)['TRY']:.2f}")
-    print(f"2024-12: JPY={interpolate_ppp(2024, 12)['JPY']:.2f}, TRY={interpolate_ppp(2024, 12)['TRY']:.2f}")
-    print(f"2025-01: JPY={interpolate_ppp(2025, 1)['JPY']:.2f}, TRY={interpolate_ppp(2025, 1)['TRY']:.2f}")
-    print(f"2025-11: JPY={interpolate_ppp(2025, 11)['JPY']:.2f}, TRY={interpolate_ppp(2025, 11)['TRY']:.2f}")
+    print(f"\nInterpolated PPP values (sample, scheme={args.scheme}):")
+    for year, month in ((2024, 1), (2024, 6), (2024, 12), (2025, 1), (2025, 11)):
+        ppp = interpolate_ppp(year, month, args.scheme)
+        print(f"{year}-{month:02d}: JPY={ppp['JPY']:.2f}, TRY={ppp['TRY']:.2f}")
     print("\n✓ All d (PPP deviation) and m (MCI coordinates) recalculated with interpolated PPP!")
 
 if __name__ == "__main__":
@@ -4,7 +4,8 @@
 """
 
 import csv
-import math
+
+from rolling_stats import RunningStats
 
 # データ読み込み
 data = []
@@ -119,16 +120,14 @@ print("=" * 80)
 print("月次変動統計（PPP切り替え除外）:")
 print("-" * 80)
 
-regular_moves = [d['D_mTRY'] for d in data[1:] if 'D_mTRY' in d and not d.get('PPP_changed', False)]
-if regular_moves:
-    mean = sum(regular_moves) / len(regular_moves)
-    variance = sum((x - mean)**2 for x in regular_moves) / len(regular_moves)
-    std = math.sqrt(variance)
+regular_moves = RunningStats(d['D_mTRY'] for d in data[1:] if 'D_mTRY' in d and not d.get('PPP_changed', False))
+if regular_moves.count:
+    std = regular_moves.std
 
-    print(f"  平均: {mean:.6f}")
+    print(f"  平均: {regular_moves.mean:.6f}")
     print(f"  標準偏差: {std:.6f}")
-    print(f"  最小値: {min(regular_moves):.6f}")
-    print(f"  最大値: {max(regular_moves):.6f}")
+    print(f"  最小値: {regular_moves.min:.6f}")
+    print(f"  最大値: {regular_moves.max:.6f}")
     print()
     print(f"  深度1相当（-0.06）: 月次では{-0.06 / std:.2f}σ")
     print(f"  深度3相当（-0.114）: 月次では{-0.114 / std:.2f}σ")
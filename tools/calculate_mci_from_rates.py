@@ -5,63 +5,294 @@
 使い方:
   python3 calculate_mci_from_rates.py --usdjpy 157 --usdtry 42.3 --ppp-year 2024
 
+  # バッチモード: ファイルまたは標準入力（CSV / JSONL）の各行を計算して1行ずつ出力
+  python3 calculate_mci_from_rates.py --batch rates.csv --compare 2024 > mci.csv
+  cat rates.jsonl | python3 calculate_mci_from_rates.py --batch - --output-format jsonl
+  python3 calculate_mci_from_rates.py --batch - --chunk-rows 1   # 1行ごとに応答（別プロセスから対話的に使う）
+
 PPPは固定（直近の確定値）を使い、為替レートのみを更新することで
 月次・週次・日次のMCI座標を算出できる。
+
+バッチモードの入力は usdjpy / usdtry（または S_USDJPY / S_USDTRY）列を持つCSVかJSONL。
+任意で ppp_year 列があればその行だけ基準年を変える。それ以外の列（date など）はそのまま出力に残す。
+PPPストアと --compare の比較年の行は最初に1回だけ読み込み、chunk_rows 行ずつ mci_engine でまとめて計算する。
 """
 
 import argparse
 import csv
-import math
+import itertools
+import json
+import sys
+import time
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
 
-def load_ppp_data(year):
-    """指定年のPPPデータを読み込む"""
-    with open('dataset/annual_mci_2005_2024.csv', 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if int(row['year']) == year:
-                return {
-                    'PPP_JPY': float(row['PPP_JPY']),
-                    'PPP_TRY': float(row['PPP_TRY']),
-                }
-    raise ValueError(f"Year {year} not found in dataset")
+import numpy as np
 
-def calculate_mci(s_usdjpy, s_usdtry, ppp_jpy, ppp_try):
-    """為替レートとPPPからMCI座標を計算"""
+from mci_engine import calculate_mci_batch
+from mci_metrics import REGISTRY, SnapshotWriter, operation_histogram
+from ppp_store import load_ppp_store
 
-    # PPP乖離率
-    d_usdjpy = math.log(s_usdjpy / ppp_jpy)
-    d_usdtry = math.log(s_usdtry / ppp_try)
+# バッチモードで入力行に追加する列
+BATCH_COLUMNS = ('PPP_JPY', 'PPP_TRY', 'S_TRYJPY', 'd_USDJPY', 'd_USDTRY', 'd_TRYJPY', 'm_USD', 'm_JPY', 'm_TRY')
+COMPARE_COLUMNS = ('dm_USD', 'dm_JPY', 'dm_TRY', 'depth')
+RATE_KEYS = {'usdjpy': ('usdjpy', 's_usdjpy'), 'usdtry': ('usdtry', 's_usdtry')}
+FORMATS = ('csv', 'jsonl')
+CHUNK_ROWS = 4096
+# バッチモードで「その行だけ飛ばす」例外（列が足りない・数値でない・JSONが壊れている・オブジェクトでない など）
+ROW_ERRORS = (KeyError, TypeError, ValueError, IndexError, AttributeError)
 
-    # MCI座標
-    m_usd = (d_usdjpy + d_usdtry) / 3
-    m_jpy = (-2 * d_usdjpy + d_usdtry) / 3
-    m_try = (d_usdjpy - 2 * d_usdtry) / 3
+# 深度判定: Δm[TRY] がしきい値を下回るごとに1段深くなる（しきい値ちょうどは浅い側）
+DEPTH_THRESHOLDS = (-0.05, -0.06, -0.08)
+DEPTH_LABELS = ("正常域", "深度1（通常変動）", "深度2", "深度3（危機レベル）")
+_DEPTH_BOUNDS = tuple(sorted(DEPTH_THRESHOLDS))
 
-    # クロスレート
-    s_tryjpy = s_usdjpy / s_usdtry
-    ppp_tryjpy = ppp_jpy / ppp_try
-    d_tryjpy = math.log(s_tryjpy / ppp_tryjpy)
+# mci_columns の各段の処理時間（mci_metrics）
+_LOOKUP_SECONDS = operation_histogram('ppp_lookup')
+_CALCULATE_SECONDS = operation_histogram('calculate_mci')
+_DEPTH_SECONDS = operation_histogram('depth_classification')
 
+def load_ppp_data(year):
+    """指定年のPPPデータを取得（PPPストアはプロセス内で一度だけ読み込む）"""
+    store = load_ppp_store()
     return {
-        'd_usdjpy': d_usdjpy,
-        'd_usdtry': d_usdtry,
-        'm_usd': m_usd,
-        'm_jpy': m_jpy,
-        'm_try': m_try,
-        's_tryjpy': s_tryjpy,
-        'ppp_tryjpy': ppp_tryjpy,
-        'd_tryjpy': d_tryjpy,
+        'PPP_JPY': store.get('JPY', year),
+        'PPP_TRY': store.get('TRY', year),
     }
 
+def calculate_mci(s_usdjpy, s_usdtry, ppp_jpy, ppp_try):
+    """為替レートとPPPからMCI座標を計算（mci_engine のスカラー呼び出し）"""
+    cols = calculate_mci_batch(s_usdjpy, s_usdtry, ppp_jpy, ppp_try)
+
+    return {
+        'd_usdjpy': float(cols['d_USDJPY']),
+        'd_usdtry': float(cols['d_USDTRY']),
+        'm_usd': float(cols['m_USD']),
+        'm_jpy': float(cols['m_JPY']),
+        'm_try': float(cols['m_TRY']),
+        's_tryjpy': float(cols['S_TRYJPY']),
+        'ppp_tryjpy': float(cols['PPP_TRYJPY']),
+        'd_tryjpy': float(cols['d_TRYJPY']),
+    }
+
+def depth_level(D_m_try: float) -> int:
+    """比較年からの m[TRY] の変化の深度（0: 正常域 〜 3: 深度3）"""
+    return len(_DEPTH_BOUNDS) - bisect_right(_DEPTH_BOUNDS, D_m_try)
+
+def depth_levels(D_m_try) -> np.ndarray:
+    """depth_level の配列版（int8）"""
+    bounds = np.array(_DEPTH_BOUNDS)
+    return (len(bounds) - np.searchsorted(bounds, D_m_try, side='right')).astype(np.int8)
+
+def classify_depth(D_m_try: float) -> str:
+    """比較年からの m[TRY] の変化を深度に分類"""
+    return DEPTH_LABELS[depth_level(D_m_try)]
+
+def detect_format(first_line: str, path: str = '-') -> str:
+    """拡張子（.jsonl / .ndjson）か先頭の文字（'{'）で入力形式を判定"""
+    if path.endswith(('.jsonl', '.ndjson')) or first_line.lstrip().startswith('{'):
+        return 'jsonl'
+    return 'csv'
+
+def find_column(names: Iterable[str], name: str) -> str:
+    """usdjpy / usdtry に当たる列名を探す（大文字・小文字、S_ 付きを区別しない）"""
+    for key in names:
+        if key.lower() in RATE_KEYS[name]:
+            return key
+    raise KeyError(name)
+
+def mci_columns(s_usdjpy, s_usdtry, years, store, ref: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """
+    レート・基準年の配列から BATCH_COLUMNS の列を計算（mci_engine を1回だけ呼ぶ）
+
+    ref（比較年の行）があれば dm_USD / dm_JPY / dm_TRY と depth_level（int8）も加える。
+    """
+    started = time.perf_counter()
+    ppp_jpy = store.lookup('JPY', years)
+    ppp_try = store.lookup('TRY', years)
+    looked_up = time.perf_counter()
+    _LOOKUP_SECONDS.observe(looked_up - started)
+    cols = calculate_mci_batch(s_usdjpy, s_usdtry, ppp_jpy, ppp_try)
+    cols['PPP_JPY'] = ppp_jpy
+    cols['PPP_TRY'] = ppp_try
+    if ref is not None:
+        for currency in ('USD', 'JPY', 'TRY'):
+            cols[f'dm_{currency}'] = cols[f'm_{currency}'] - ref[f'm_{currency}']
+    calculated = time.perf_counter()
+    _CALCULATE_SECONDS.observe(calculated - looked_up)
+    if ref is not None:
+        cols['depth_level'] = depth_levels(cols['dm_TRY'])
+        _DEPTH_SECONDS.observe(time.perf_counter() - calculated)
+    return cols
+
+def calculate_columns(s_usdjpy, s_usdtry, years, store,
+                      ref: Optional[Dict] = None) -> Tuple[Tuple[str, ...], List[tuple]]:
+    """
+    レート・基準年の配列から出力列を計算し、(列名, 行ごとの値のタプルのリスト) を返す
+
+    ref（比較年の行）があれば Δm と深度のラベルも加える。
+    """
+    cols = mci_columns(s_usdjpy, s_usdtry, years, store, ref)
+    if ref is None:
+        return BATCH_COLUMNS, list(zip(*(cols[name].tolist() for name in BATCH_COLUMNS)))
+    cols['depth'] = [DEPTH_LABELS[level] for level in cols['depth_level'].tolist()]
+    names = BATCH_COLUMNS + COMPARE_COLUMNS
+    return names, list(zip(*(cols[name] if name == 'depth' else cols[name].tolist() for name in names)))
+
+def calculate_rows(rows: List[Dict], ppp_year: int, store, ref: Optional[Dict] = None) -> List[Dict]:
+    """行の dict のリストをまとめて計算し、BATCH_COLUMNS（ref があれば COMPARE_COLUMNS も）を加えた行を返す"""
+    s_usdjpy = [float(row[find_column(row, 'usdjpy')]) for row in rows]
+    s_usdtry = [float(row[find_column(row, 'usdtry')]) for row in rows]
+    years = [int(row.get('ppp_year') or ppp_year) for row in rows]
+    names, values = calculate_columns(s_usdjpy, s_usdtry, years, store, ref)
+    result = []
+    for row, computed in zip(rows, values):
+        out = dict(row)
+        out.update(zip(names, computed))
+        result.append(out)
+    return result
+
+def read_csv_chunk(chunk: List[List[str]], header: List[str], ppp_year: int):
+    """CSVの行（リスト）のチャンクからレート・基準年の配列を取り出す"""
+    i_jpy = header.index(find_column(header, 'usdjpy'))
+    i_try = header.index(find_column(header, 'usdtry'))
+    s_usdjpy = [float(row[i_jpy]) for row in chunk]
+    s_usdtry = [float(row[i_try]) for row in chunk]
+    if 'ppp_year' in header:
+        i_year = header.index('ppp_year')
+        years = [int(row[i_year] or ppp_year) for row in chunk]
+    else:
+        years = [ppp_year] * len(chunk)
+    return s_usdjpy, s_usdtry, years
+
+def run_batch(stream: TextIO, out: TextIO, ppp_year: int, compare: Optional[int] = None,
+              fmt: Optional[str] = None, output_format: Optional[str] = None,
+              chunk_rows: int = CHUNK_ROWS, path: str = '-') -> Tuple[int, int]:
+    """
+    入力を chunk_rows 行ずつ計算して out に書き出す（チャンクごとに flush）
+
+    CSVは dict を介さず列番号で読み書きする。列が足りない行・数値に変換できない行・
+    JSONとして読めない行・基準年のPPPがない行は行番号付きで標準エラー出力に警告し、飛ばす。
+    比較年がない・CSVヘッダにレート列がない場合は何も出力する前に ValueError。
+
+    Returns:
+        (出力した行数, 飛ばした行数)
+    """
+    store = load_ppp_store()
+    ref = store.reference(compare) if compare else None
+    first = stream.readline()
+    fmt = fmt or detect_format(first, path)
+    output_format = output_format or fmt
+    lines = itertools.chain([first], stream)
+    written = skipped = 0
+    rows_ok = REGISTRY.counter('mci_batch_rows_total', 'Rows processed in batch mode', status='ok')
+    rows_skipped = REGISTRY.counter('mci_batch_rows_total', 'Rows processed in batch mode', status='skipped')
+
+    if fmt == 'csv':
+        reader = csv.reader(lines)
+        header = next(reader, [])
+        missing = [name for name in RATE_KEYS if not any(key.lower() in RATE_KEYS[name] for key in header)]
+        if header and missing:
+            raise ValueError(f"CSV header has no {' / '.join(missing)} column")
+        numbered = enumerate(reader, 2)
+
+        def compute(chunk):
+            names, values = calculate_columns(*read_csv_chunk(chunk, header, ppp_year), store, ref)
+            if output_format == 'csv':
+                return header + list(names), [row + list(v) for row, v in zip(chunk, values)]
+            return None, [dict(zip(header + list(names), row + list(v))) for row, v in zip(chunk, values)]
+    else:
+        numbered = ((n, line) for n, line in enumerate(lines, 1) if line.strip())
+
+        def compute(chunk):
+            # JSONの解析もここで行い、壊れた行は他の不正な行と同じく飛ばす
+            rows = [json.loads(line) for line in chunk]
+            for row in rows:
+                if not isinstance(row, dict):
+                    raise TypeError(f"expected a JSON object, got {type(row).__name__}")
+            rows = calculate_rows(rows, ppp_year, store, ref)
+            return list(rows[0]), rows
+
+    writer = csv.writer(out, lineterminator='\n') if output_format == 'csv' else None
+    header_out = None
+    while True:
+        chunk = list(itertools.islice(numbered, chunk_rows))
+        if not chunk:
+            break
+        try:
+            names, results = compute([row for _, row in chunk])
+        except ROW_ERRORS:
+            # 不正な行を含むチャンクは1行ずつ計算し直して該当行だけを飛ばす
+            names, results = None, []
+            for n, row in chunk:
+                try:
+                    row_names, row_results = compute([row])
+                except ROW_ERRORS as e:
+                    print(f"Warning: line {n}: skipped ({type(e).__name__}: {e})", file=sys.stderr)
+                    skipped += 1
+                    rows_skipped.inc()
+                    continue
+                names = names or row_names
+                results.extend(row_results)
+        if writer is None:
+            out.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in results)
+        elif results:
+            if header_out is None:
+                header_out = names
+                writer.writerow(header_out)
+            if isinstance(results[0], dict):
+                # JSONL → CSV は最初の行の列に揃える（ない列は空、余分な列は捨てる）
+                results = [[row.get(key, '') for key in header_out] for row in results]
+            writer.writerows(results)
+        out.flush()
+        written += len(results)
+        rows_ok.inc(len(results))
+    return written, skipped
+
 def main():
     parser = argparse.ArgumentParser(description='Calculate MCI coordinates from exchange rates')
-    parser.add_argument('--usdjpy', type=float, required=True, help='USD/JPY exchange rate')
-    parser.add_argument('--usdtry', type=float, required=True, help='USD/TRY exchange rate')
+    parser.add_argument('--usdjpy', type=float, help='USD/JPY exchange rate')
+    parser.add_argument('--usdtry', type=float, help='USD/TRY exchange rate')
     parser.add_argument('--ppp-year', type=int, default=2024, help='PPP reference year (default: 2024)')
     parser.add_argument('--compare', type=int, help='Compare with this year from dataset')
+    parser.add_argument('--batch', nargs='?', const='-', metavar='FILE',
+                        help='Read rate rows from FILE or stdin (-) as CSV/JSONL and stream MCI rows to stdout')
+    parser.add_argument('--format', choices=FORMATS, help='Batch input format (default: detect)')
+    parser.add_argument('--output-format', choices=FORMATS, help='Batch output format (default: same as input)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f'Rows computed and flushed together in batch mode (default: {CHUNK_ROWS})')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='Write a JSON metrics snapshot to PATH periodically and at the end (batch mode)')
+    parser.add_argument('--metrics-interval', type=float, default=10.0,
+                        help='Seconds between metrics snapshots (default: 10)')
 
     args = parser.parse_args()
 
+    if args.batch:
+        stream = sys.stdin if args.batch == '-' else open(args.batch, 'r', encoding='utf-8', newline='')
+        snapshots = SnapshotWriter(args.metrics, args.metrics_interval) if args.metrics else None
+        try:
+            written, skipped = run_batch(stream, sys.stdout, args.ppp_year, args.compare, args.format,
+                                         args.output_format, max(args.chunk_rows, 1), args.batch)
+        except ValueError as e:
+            # 比較年がない・CSVにレート列がない（出力の前に判明する）
+            parser.error(str(e))
+        except BrokenPipeError:
+            # head などで出力先が先に閉じられた場合
+            sys.stderr.close()
+            return
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if snapshots is not None:
+                snapshots.stop()
+        if skipped:
+            print(f"{written} rows, {skipped} skipped", file=sys.stderr)
+        return
+
+    if args.usdjpy is None or args.usdtry is None:
+        parser.error('--usdjpy and --usdtry are required (or use --batch)')
+
     # PPPデータ読み込み
     ppp_data = load_ppp_data(args.ppp_year)
 
@@ -95,32 +326,26 @@ def main():
 
     # 比較年が指定されている場合
     if args.compare:
-        with open('dataset/annual_mci_2005_2024.csv', 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if int(row['year']) == args.compare:
-                    m_try_ref = float(row['m_TRY'])
-                    m_usd_ref = float(row['m_USD'])
-                    m_jpy_ref = float(row['m_JPY'])
-
-                    print(f"{args.compare}年との比較:")
-                    print(f"  Δm[USD] = {result['m_usd'] - m_usd_ref:+.6f}")
-                    print(f"  Δm[JPY] = {result['m_jpy'] - m_jpy_ref:+.6f}")
-                    print(f"  Δm[TRY] = {result['m_try'] - m_try_ref:+.6f}")
-
-                    # 深度判定
-                    D_m_try = result['m_try'] - m_try_ref
-                    if D_m_try >= -0.05:
-                        depth = "正常域"
-                    elif D_m_try >= -0.06:
-                        depth = "深度1（通常変動）"
-                    elif D_m_try >= -0.08:
-                        depth = "深度2"
-                    else:
-                        depth = "深度3（危機レベル）"
-
-                    print(f"  深度判定: {depth}")
-                    print()
+        try:
+            ref = load_ppp_store().reference(args.compare)
+        except ValueError:
+            ref = None
+
+        if ref is not None:
+            m_try_ref = ref['m_TRY']
+            m_usd_ref = ref['m_USD']
+            m_jpy_ref = ref['m_JPY']
+
+            print(f"{args.compare}年との比較:")
+            print(f"  Δm[USD] = {result['m_usd'] - m_usd_ref:+.6f}")
+            print(f"  Δm[JPY] = {result['m_jpy'] - m_jpy_ref:+.6f}")
+            print(f"  Δm[TRY] = {result['m_try'] - m_try_ref:+.6f}")
+
+            # 深度判定
+            depth = classify_depth(result['m_try'] - m_try_ref)
+
+            print(f"  深度判定: {depth}")
+            print()
 
     print("=" * 80)
 
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+列指向バイナリ形式のデータセット（.npy 列ファイル + manifest.json）
+
+CSVを毎回 csv.DictReader と float() で読み直す代わりに、列ごとに .npy として保存し、
+np.load(mmap_mode='r') でメモリマップして読み込む。必要な列だけを選んで読める（列射影）。
+人が見るためのCSV出力はそのまま残す（to-csv）。
+
+ディレクトリ構成（例: dataset/monthly_mci_backtest_ready_2022_2025.cols/）:
+  manifest.json   # {"format": "mci-columnar", "version": 1, "rows": N, "columns": [...]}
+  date.npy        # datetime64[M] または datetime64[D]
+  year.npy        # 整数だけの列は int64
+  S_USDJPY.npy    # float64（CSVの空欄は NaN）
+  PPP_changed.npy # 数値でない列は文字列
+
+to-csv で元のCSVと同じ表記に戻せるように、manifest には元の改行コードと、
+repr では元に戻らない数値列の書式（'14.60' なら '%.2f'）も記録する。
+
+使い方:
+  python3 tools/columnar.py to-columnar dataset/monthly_mci_backtest_ready_2022_2025.csv
+  python3 tools/columnar.py to-csv dataset/monthly_mci_backtest_ready_2022_2025.cols out.csv
+
+  from columnar import load_columns
+  cols = load_columns('dataset/monthly_mci_backtest_ready_2022_2025.cols', ['date', 'm_TRY'])
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+MANIFEST = 'manifest.json'
+FORMAT_NAME = 'mci-columnar'
+FORMAT_VERSION = 1
+SUFFIX = '.cols'
+INTEGER = re.compile(r'-?\d+')
+
+
+def columnar_path(csv_path: str) -> str:
+    """CSVパスに対応する列指向ディレクトリのパス（foo.csv -> foo.cols）"""
+    return os.path.splitext(csv_path)[0] + SUFFIX
+
+
+def is_columnar(path: str) -> bool:
+    """列指向ディレクトリかどうか"""
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def _parse_column(name: str, values: List[str]) -> Tuple[np.ndarray, Optional[str]]:
+    """
+    CSVの1列を型付き配列に変換（date は datetime64、整数は int64、数値は float64、それ以外は文字列）
+
+    Returns:
+        (配列, 書式)。書式は float の repr では元の表記に戻らない列だけ（'%.2f' など）、それ以外は None
+    """
+    if name == 'date':
+        unit = 'D' if values and len(values[0]) > 7 else 'M'
+        return np.array(values, dtype=f'datetime64[{unit}]'), None
+    present = [v for v in values if v != '']
+    if present and len(present) == len(values) and all(INTEGER.fullmatch(v) for v in values):
+        return np.array([int(v) for v in values], dtype=np.int64), None
+    try:
+        column = np.array([float(v) if v != '' else np.nan for v in values], dtype=np.float64)
+    except ValueError:
+        return np.array(values, dtype=str), None
+    return column, _float_format(present)
+
+
+def _float_format(values: List[str]) -> Optional[str]:
+    """数値の表記を再現する書式（repr で戻るなら None、小数点以下の桁数が揃っていれば '%.Nf'）"""
+    if all(repr(float(v)) == v for v in values):
+        return None
+    decimals = {len(v.split('.')[1]) if '.' in v else 0 for v in values}
+    if len(decimals) == 1:
+        fmt = f'%.{decimals.pop()}f'
+        if all(fmt % float(v) == v for v in values):
+            return fmt
+    return None
+
+
+def read_csv_table(csv_path: str, columns: Iterable[str] = None) -> Tuple[Dict[str, np.ndarray], Dict[str, str], str]:
+    """
+    CSVを読み込んで型付きの列配列に変換
+
+    Returns:
+        (列配列, 列ごとの書式（_parse_column 参照）, 改行コード)
+    """
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+    newline = '\r\n' if '\r\n' in text else '\n'
+    reader = csv.reader(io.StringIO(text, newline=''))
+    header = next(reader)
+    rows = list(reader)
+
+    names = header if columns is None else list(columns)
+    result = {}
+    formats = {}
+    for name in names:
+        i = header.index(name)
+        result[name], fmt = _parse_column(name, [row[i] for row in rows])
+        if fmt:
+            formats[name] = fmt
+    return result, formats, newline
+
+
+def read_csv_columns(csv_path: str, columns: Iterable[str] = None) -> Dict[str, np.ndarray]:
+    """CSVを読み込んで型付きの列配列に変換"""
+    return read_csv_table(csv_path, columns)[0]
+
+
+def write_columnar(directory: str, columns: Dict[str, np.ndarray], meta: Dict = None,
+                   formats: Dict[str, str] = None, newline: str = '\n'):
+    """列配列を列指向ディレクトリに保存（formats・newline は to-csv で元の表記に戻すため）"""
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+
+    os.makedirs(directory, exist_ok=True)
+    entries = []
+    for name, values in columns.items():
+        values = np.asarray(values)
+        filename = f'{name}.npy'
+        np.save(os.path.join(directory, filename), values, allow_pickle=False)
+        entry = {'name': name, 'dtype': values.dtype.str, 'file': filename}
+        if formats and name in formats:
+            entry['format'] = formats[name]
+        entries.append(entry)
+
+    manifest = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'rows': lengths.pop() if lengths else 0,
+        'columns': entries,
+        'newline': newline,
+        'meta': meta or {},
+    }
+    # manifest は最後に書く（途中で失敗したディレクトリを読まないように）
+    tmp = os.path.join(directory, MANIFEST + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+
+
+def read_manifest(directory: str) -> Dict:
+    """manifest.json を読み込む"""
+    with open(os.path.join(directory, MANIFEST), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_NAME or manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format in {directory}")
+    return manifest
+
+
+def read_columnar(directory: str, columns: Iterable[str] = None, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    列指向ディレクトリから列を読み込む
+
+    Args:
+        columns: 読み込む列（None なら全列）。指定外の列ファイルは開かない
+        mmap: True ならメモリマップ（読み取り専用、コピーなし）
+    """
+    manifest = read_manifest(directory)
+    files = {entry['name']: entry['file'] for entry in manifest['columns']}
+    names = list(files) if columns is None else list(columns)
+
+    result = {}
+    for name in names:
+        if name not in files:
+            raise KeyError(f"Column {name} not found in {directory}")
+        result[name] = np.load(os.path.join(directory, files[name]),
+                               mmap_mode='r' if mmap else None, allow_pickle=False)
+    return result
+
+
+def load_columns(path: str, columns: Iterable[str] = None) -> Dict[str, np.ndarray]:
+    """
+    列指向ディレクトリまたはCSVから列を読み込む
+
+    CSVパスが渡されても、対応する .cols ディレクトリがCSVより新しければそちらを使う。
+    """
+    if is_columnar(path):
+        return read_columnar(path, columns)
+    cols_dir = columnar_path(path)
+    if is_columnar(cols_dir) and os.path.getmtime(os.path.join(cols_dir, MANIFEST)) >= os.path.getmtime(path):
+        return read_columnar(cols_dir, columns)
+    return read_csv_columns(path, columns)
+
+
+def _format_value(value, fmt: str = None) -> str:
+    """CSV出力用の文字列化（float は書式か repr で往復可能、NaN は空欄）"""
+    if isinstance(value, float):
+        if value != value:
+            return ''
+        return fmt % value if fmt else repr(value)
+    return str(value)
+
+
+def write_csv(csv_path: str, columns: Dict[str, np.ndarray], formats: Dict[str, str] = None,
+              newline: str = '\n'):
+    """
+    列配列を人が読むためのCSVとして出力
+
+    Args:
+        formats: 列ごとの float の書式（manifest の format、指定がなければ repr）
+        newline: 改行コード（manifest の newline、リポジトリのCSVは '\n' か '\r\n'）
+    """
+    names = list(columns)
+    formats = formats or {}
+    values = []
+    for name in names:
+        column = np.asarray(columns[name])
+        values.append(column.astype(str).tolist() if column.dtype.kind == 'M' else column.tolist())
+    column_formats = [formats.get(name) for name in names]
+
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator=newline)
+        writer.writerow(names)
+        for row in zip(*values):
+            writer.writerow([_format_value(v, fmt) for v, fmt in zip(row, column_formats)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CSV <-> 列指向バイナリ形式の変換')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    to_cols = sub.add_parser('to-columnar', help='CSVを列指向ディレクトリに変換')
+    to_cols.add_argument('csv', nargs='+', help='入力CSV')
+    to_cols.add_argument('--output', help='出力ディレクトリ（CSVが1つのときのみ、既定: <name>.cols）')
+
+    to_csv = sub.add_parser('to-csv', help='列指向ディレクトリをCSVに出力')
+    to_csv.add_argument('directory', help='入力ディレクトリ')
+    to_csv.add_argument('csv', help='出力CSV')
+    to_csv.add_argument('--columns', help='出力する列（カンマ区切り）')
+
+    args = parser.parse_args()
+
+    if args.command == 'to-columnar':
+        if args.output and len(args.csv) > 1:
+            parser.error('--output can only be used with a single CSV')
+        for csv_path in args.csv:
+            out_dir = args.output or columnar_path(csv_path)
+            columns, formats, newline = read_csv_table(csv_path)
+            write_columnar(out_dir, columns, {'source': os.path.basename(csv_path)}, formats, newline)
+            rows = len(next(iter(columns.values()))) if columns else 0
+            print(f"✓ {csv_path} -> {out_dir} ({rows}行, {len(columns)}列)")
+    else:
+        columns = args.columns.split(',') if args.columns else None
+        manifest = read_manifest(args.directory)
+        formats = {entry['name']: entry['format'] for entry in manifest['columns'] if 'format' in entry}
+        write_csv(args.csv, read_columnar(args.directory, columns, mmap=False),
+                  formats, manifest.get('newline', '\n'))
+        print(f"✓ {args.directory} -> {args.csv}")
+
+
+if __name__ == '__main__':
+    main()
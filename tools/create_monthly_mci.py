@@ -3,52 +3,20 @@
 直近3年の月次MCIデータ作成ツール
 
 年次PPPを使って、月次の為替レートからMCI座標を計算する。
-2022-2024は確定PPP、2025は推定PPPを使用。
+PPPは ppp_store から取得（2022-2024は確定PPP、2025は推定PPP）。
 """
 
+import argparse
 import csv
-import math
+import os
 from datetime import datetime
 
-# 各年のPPP設定
-PPP_CONFIG = {
-    2022: {'PPP_JPY': 92.50, 'PPP_TRY': 4.975},    # 確定値（World Bank WDI）
-    2023: {'PPP_JPY': 92.84, 'PPP_TRY': 8.074},    # 確定値（World Bank WDI）
-    2024: {'PPP_JPY': 93.20, 'PPP_TRY': 12.55},    # 確定値（World Bank WDI）
-    2025: {'PPP_JPY': 93.20, 'PPP_TRY': 16.63},    # 推定値（32.5%インフレ想定、OECD/IMF予測ベース）
-}
+import numpy as np
 
-def calculate_mci(s_usdjpy, s_usdtry, ppp_jpy, ppp_try):
-    """為替レートとPPPからMCI座標を計算"""
-
-    # PPP乖離率
-    d_usdjpy = math.log(s_usdjpy / ppp_jpy)
-    d_usdtry = math.log(s_usdtry / ppp_try)
-
-    # MCI座標
-    m_usd = (d_usdjpy + d_usdtry) / 3
-    m_jpy = (-2 * d_usdjpy + d_usdtry) / 3
-    m_try = (d_usdjpy - 2 * d_usdtry) / 3
-
-    # クロスレート
-    s_tryjpy = s_usdjpy / s_usdtry
-    ppp_tryjpy = ppp_jpy / ppp_try
-    d_tryjpy = math.log(s_tryjpy / ppp_tryjpy)
-
-    return {
-        'S_USDJPY': s_usdjpy,
-        'S_USDTRY': s_usdtry,
-        'PPP_JPY': ppp_jpy,
-        'PPP_TRY': ppp_try,
-        'd_USDJPY': d_usdjpy,
-        'd_USDTRY': d_usdtry,
-        'm_USD': m_usd,
-        'm_JPY': m_jpy,
-        'm_TRY': m_try,
-        'S_TRYJPY': s_tryjpy,
-        'PPP_TRYJPY': ppp_tryjpy,
-        'd_TRYJPY': d_tryjpy,
-    }
+from csv_append import read_tail
+from mci_engine import calculate_mci_batch
+from ppp_store import load_ppp_store
+from rolling_stats import RunningStats
 
 def read_monthly_rates(filename):
     """
@@ -72,30 +40,42 @@ def read_monthly_rates(filename):
     return data
 
 def process_monthly_data(rate_data):
-    """月次レートデータを処理してMCI座標を計算"""
-    results = []
+    """月次レートデータを処理してMCI座標を計算（mci_engine で一括計算）"""
+    store = load_ppp_store()
 
+    entries = []
     for entry in rate_data:
-        # 日付から年を抽出
-        year = int(entry['date'].split('-')[0])
-
-        if year not in PPP_CONFIG:
-            print(f"Warning: No PPP config for year {year}, skipping")
+        if entry['date'] not in store:
+            print(f"Warning: No PPP config for year {entry['date'][:4]}, skipping")
             continue
+        entries.append(entry)
 
-        ppp = PPP_CONFIG[year]
+    if not entries:
+        return []
 
-        # MCI計算
-        mci = calculate_mci(
-            entry['S_USDJPY'],
-            entry['S_USDTRY'],
-            ppp['PPP_JPY'],
-            ppp['PPP_TRY']
-        )
+    # 列ベクトルにまとめて一度に計算（PPPは年インデックスから一括取得）
+    years = [int(e['date'][:4]) for e in entries]
+    s_usdjpy = np.array([e['S_USDJPY'] for e in entries])
+    s_usdtry = np.array([e['S_USDTRY'] for e in entries])
+    ppp_jpy = store.lookup('JPY', years)
+    ppp_try = store.lookup('TRY', years)
+    mci = calculate_mci_batch(s_usdjpy, s_usdtry, ppp_jpy, ppp_try)
+
+    # 出力用の行に展開
+    columns = {
+        'S_USDJPY': s_usdjpy,
+        'S_USDTRY': s_usdtry,
+        'PPP_JPY': ppp_jpy,
+        'PPP_TRY': ppp_try,
+    }
+    columns.update(mci)
+    names = list(columns)
+    values = zip(*(columns[name].tolist() for name in names))
 
-        # 結果をマージ
+    results = []
+    for entry, row in zip(entries, values):
         result = {'date': entry['date']}
-        result.update(mci)
+        result.update(zip(names, row))
         results.append(result)
 
     return results
@@ -127,8 +107,12 @@ def create_sample_template(output_file='monthly_rates_template.csv'):
     print("  1. このCSVファイルに実際の月次平均レートを入力")
     print("  2. python3 tools/create_monthly_mci.py monthly_rates_template.csv を実行")
 
-def save_monthly_mci(data, output_file='dataset/mci_monthly_recent.csv'):
-    """月次MCIデータを保存"""
+def save_monthly_mci(data, output_file='dataset/mci_monthly_recent.csv', append=False):
+    """
+    月次MCIデータを保存
+
+    append=True のときは既存ファイルの最終月より後の行だけを追記する（既存行は書き直さない）
+    """
     if not data:
         print("Error: No data to save")
         return
@@ -137,6 +121,18 @@ def save_monthly_mci(data, output_file='dataset/mci_monthly_recent.csv'):
                   'd_USDJPY', 'd_USDTRY', 'm_USD', 'm_JPY', 'm_TRY',
                   'S_TRYJPY', 'PPP_TRYJPY', 'd_TRYJPY']
 
+    if append and os.path.exists(output_file):
+        header, tail, _ = read_tail(output_file, 1)
+        if header != fieldnames:
+            raise ValueError(f"{output_file} の列が一致しません")
+        last = tail[-1].split(',', 1)[0] if tail else ''
+        new_rows = [row for row in data if row['date'] > last]
+        with open(output_file, 'a', newline='') as f:
+            csv.DictWriter(f, fieldnames=fieldnames).writerows(new_rows)
+        print(f"✓ 月次MCIデータを追記しました: {output_file}")
+        print(f"  {len(new_rows)}ヶ月分を追加（{last} まで既存）")
+        return
+
     with open(output_file, 'w', newline='') as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
@@ -162,16 +158,14 @@ def calculate_monthly_variations(data):
         })
 
     if variations:
-        D_values = [v['D_mTRY'] for v in variations]
-        mean = sum(D_values) / len(D_values)
-        variance = sum((x - mean)**2 for x in D_values) / len(D_values)
-        std = math.sqrt(variance)
+        stats = RunningStats(v['D_mTRY'] for v in variations)
+        std = stats.std
 
         print(f"m[TRY]月次変動:")
-        print(f"  平均: {mean:.6f}")
+        print(f"  平均: {stats.mean:.6f}")
         print(f"  標準偏差: {std:.6f}")
-        print(f"  最小値: {min(D_values):.6f}")
-        print(f"  最大値: {max(D_values):.6f}")
+        print(f"  最小値: {stats.min:.6f}")
+        print(f"  最大値: {stats.max:.6f}")
         print()
 
         # 大きな変動を抽出
@@ -184,12 +178,22 @@ def calculate_monthly_variations(data):
         print()
 
 def main():
-    import sys
+    parser = argparse.ArgumentParser(description='月次為替レートCSVから月次MCIデータを作成')
+    parser.add_argument('input', nargs='?', help='月次レートCSV（date,S_USDJPY,S_USDTRY）')
+    parser.add_argument('--template', action='store_true', help='入力用のテンプレートCSVを作成')
+    parser.add_argument('--append', action='store_true',
+                        help='出力済みの最終月より後の月だけを dataset/mci_monthly_recent.csv に追記')
+    args = parser.parse_args()
+
+    if args.template:
+        create_sample_template()
+        return
 
-    if len(sys.argv) < 2:
+    if args.input is None:
         print("使い方:")
         print("  1. テンプレート作成: python3 tools/create_monthly_mci.py --template")
         print("  2. データ処理: python3 tools/create_monthly_mci.py <monthly_rates.csv>")
+        print("  3. 新しい月だけ追記: python3 tools/create_monthly_mci.py <monthly_rates.csv> --append")
         print()
         print("テンプレートを作成しますか？ (y/n)")
         response = input().strip().lower()
@@ -197,12 +201,8 @@ def main():
             create_sample_template()
         return
 
-    if sys.argv[1] == '--template':
-        create_sample_template()
-        return
-
     # 月次レートデータを読み込んで処理
-    input_file = sys.argv[1]
+    input_file = args.input
 
     print(f"月次レートデータを読み込んでいます: {input_file}")
     rate_data = read_monthly_rates(input_file)
@@ -215,7 +215,7 @@ def main():
     mci_data = process_monthly_data(rate_data)
 
     # 保存
-    save_monthly_mci(mci_data)
+    save_monthly_mci(mci_data, append=args.append)
 
     # 統計表示
     calculate_monthly_variations(mci_data)
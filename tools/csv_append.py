@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+CSVの末尾読み込み・追記（既存の行を読み直さない・書き直さない）
+
+日次・月次の更新では、履歴が長くても新しい行はわずか。
+ヘッダーと末尾の数行だけをファイル末尾からシークして読み、新しい行を追記する。
+
+使い方:
+  from csv_append import read_tail, append_lines
+  header, tail, newline = read_tail('dataset/monthly_mci_with_deltas_2022_2025.csv', 3)
+  append_lines('dataset/monthly_mci_with_deltas_2022_2025.csv', new_lines, newline)
+"""
+
+import csv
+import os
+from typing import List, Sequence, Tuple
+
+BLOCK_SIZE = 1 << 12
+
+
+def read_tail(path: str, n: int) -> Tuple[List[str], List[str], str]:
+    """
+    CSVのヘッダーと最後の n 行（データ行のみ、改行なし）を読む
+
+    Returns:
+        (ヘッダーの列名, 末尾の行, 改行コード '\\r\\n' または '\\n')
+    """
+    with open(path, 'rb') as f:
+        first = f.readline()
+        newline = b'\r\n' if first.endswith(b'\r\n') else b'\n'
+        header_end = f.tell()
+
+        # 末尾から n+1 個の改行が見つかるまでブロック単位で遡る
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        buffer = b''
+        while pos > header_end and buffer.count(b'\n') <= n:
+            size = min(BLOCK_SIZE, pos - header_end)
+            pos -= size
+            f.seek(pos)
+            buffer = f.read(size) + buffer
+
+    lines = [line for line in buffer.split(newline) if line]
+    if pos > header_end:
+        lines = lines[1:]  # 途中から読んだ最初の行は不完全
+    header = next(csv.reader([first.decode('utf-8').rstrip('\r\n')]))
+    return header, [line.decode('utf-8') for line in lines[-n:]] if n else [], newline.decode()
+
+
+def append_lines(path: str, lines: Sequence[str], newline: str = '\n'):
+    """行をファイル末尾に追記（既存の内容には触れない）"""
+    if not lines:
+        return
+    with open(path, 'a+b') as f:
+        # 最終行に改行がなければ補う
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(newline.encode())
+        f.write(''.join(line + newline for line in lines).encode('utf-8'))
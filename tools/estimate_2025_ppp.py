@@ -5,11 +5,14 @@
 トルコのインフレ予測に基づいて2025年のPPP_TRYを推定する。
 """
 
-import math
+from mci_engine import calculate_mci_batch
+from ppp_store import load_ppp_store
+
+store = load_ppp_store()
 
 # 2024年確定値
-PPP_JPY_2024 = 93.20
-PPP_TRY_2024 = 12.55
+PPP_JPY_2024 = store.get('JPY', 2024)
+PPP_TRY_2024 = store.get('TRY', 2024)
 
 print("=" * 80)
 print("2025年PPP推定")
@@ -23,23 +26,23 @@ print()
 
 # 円のPPP推定
 print("【JPY】2025年推定:")
-print("  過去3年の推移: 92.50 → 92.84 → 93.20")
+print("  過去3年の推移: " + " → ".join(f"{store.get('JPY', y):.2f}" for y in (2022, 2023, 2024)))
 print("  年次変化率: 約0.4%増")
 print()
 
 # シナリオ
 jpy_scenarios = [
-    ("据え置き", 93.20),
-    ("微増（+0.4%）", 93.20 * 1.004),
+    ("据え置き", PPP_JPY_2024),
+    ("微増（+0.4%）", PPP_JPY_2024 * 1.004),
 ]
 
 for name, value in jpy_scenarios:
     print(f"  {name}: {value:.2f}")
 print()
-print("  → 推奨: 93.20（据え置き、保守的）")
+print(f"  → 推奨: {PPP_JPY_2024:.2f}（据え置き、保守的）")
 print()
 
-PPP_JPY_2025 = 93.20
+PPP_JPY_2025 = PPP_JPY_2024
 
 # リラのPPP推定
 print("【TRY】2025年推定:")
@@ -51,10 +54,10 @@ print()
 
 # インフレシナリオ
 try_scenarios = [
-    ("保守的（30%）", 12.55 * 1.30),
-    ("中間（32.5%）", 12.55 * 1.325),
-    ("楽観的（35%）", 12.55 * 1.35),
-    ("IMF予測（34.9%）", 12.55 * 1.349),
+    ("保守的（30%）", PPP_TRY_2024 * 1.30),
+    ("中間（32.5%）", PPP_TRY_2024 * 1.325),
+    ("楽観的（35%）", PPP_TRY_2024 * 1.35),
+    ("IMF予測（34.9%）", PPP_TRY_2024 * 1.349),
 ]
 
 for name, value in try_scenarios:
@@ -63,9 +66,9 @@ print()
 print("  → 推奨: 16.63（中間32.5%、バランス型）")
 print()
 
-PPP_TRY_2025_conservative = 12.55 * 1.30
-PPP_TRY_2025_balanced = 12.55 * 1.325
-PPP_TRY_2025_optimistic = 12.55 * 1.35
+PPP_TRY_2025_conservative = PPP_TRY_2024 * 1.30
+PPP_TRY_2025_balanced = PPP_TRY_2024 * 1.325
+PPP_TRY_2025_optimistic = PPP_TRY_2024 * 1.35
 
 print("=" * 80)
 print("3シナリオでのMCI計算")
@@ -84,14 +87,13 @@ forecast_rates = {
 }
 
 def calculate_mci(s_usdjpy, s_usdtry, ppp_jpy, ppp_try, label):
-    d_usdjpy = math.log(s_usdjpy / ppp_jpy)
-    d_usdtry = math.log(s_usdtry / ppp_try)
+    mci = calculate_mci_batch(s_usdjpy, s_usdtry, ppp_jpy, ppp_try)
 
-    m_usd = (d_usdjpy + d_usdtry) / 3
-    m_jpy = (-2 * d_usdjpy + d_usdtry) / 3
-    m_try = (d_usdjpy - 2 * d_usdtry) / 3
+    m_usd = float(mci['m_USD'])
+    m_jpy = float(mci['m_JPY'])
+    m_try = float(mci['m_TRY'])
 
-    s_tryjpy = s_usdjpy / s_usdtry
+    s_tryjpy = float(mci['S_TRYJPY'])
 
     print(f"{label}:")
     print(f"  PPP: JPY={ppp_jpy:.2f}, TRY={ppp_try:.2f}")
@@ -137,7 +139,7 @@ print("2024年確定値との比較")
 print("=" * 80)
 print()
 
-m_try_2024 = -0.4802599978128906
+m_try_2024 = store.reference(2024)['m_TRY']
 
 print(f"2024年末: m[TRY] = {m_try_2024:.6f}")
 print()
@@ -172,13 +174,12 @@ print("=" * 80)
 print("推奨設定")
 print("=" * 80)
 print()
-print("tools/create_monthly_mci.py のPPP_CONFIG更新:")
+print("dataset/ppp_vintages.csv への追記（vintage は公表月）:")
 print()
-print("2025: {")
-print(f"    'PPP_JPY': {PPP_JPY_2025:.2f},")
-print(f"    'PPP_TRY': {PPP_TRY_2025_balanced:.2f},  # 32.5%インフレ想定（バランス型）")
-print("}")
+print("year,currency,PPP,vintage,source")
+print(f"2025,JPY,{PPP_JPY_2025:.2f},<YYYY-MM>,In-house estimate (JPY flat vs 2024)")
+print(f"2025,TRY,{PPP_TRY_2025_balanced:.2f},<YYYY-MM>,In-house estimate (32.5% inflation)")
 print()
 print("代替案（保守的）:")
-print(f"    'PPP_TRY': {PPP_TRY_2025_conservative:.2f},  # 30%インフレ想定（保守的）")
+print(f"2025,TRY,{PPP_TRY_2025_conservative:.2f},<YYYY-MM>,In-house estimate (30% inflation)")
 print()
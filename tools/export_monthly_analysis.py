@@ -1,9 +1,24 @@
 #!/usr/bin/env python3
 """
 月次MCIデータを分析付きCSVとして出力
+
+  python3 tools/export_monthly_analysis.py            # 全行を書き出す
+  python3 tools/export_monthly_analysis.py --append   # 出力済みの最終月より後の行だけ追記
 """
 
+import argparse
 import csv
+import os
+
+from csv_append import read_tail
+
+output_file = 'monthly_mci_fixed_ppp_2022_2025.csv'
+
+parser = argparse.ArgumentParser(description='月次MCIデータを分析付きCSVとして出力')
+parser.add_argument('--append', action='store_true',
+                    help=f'{output_file} に出力済みの最終月より後の行だけを追記（ファイルがなければ全行を書き出す）')
+args = parser.parse_args()
+append = args.append and os.path.exists(output_file)
 
 # データ読み込み
 data = []
@@ -12,6 +27,13 @@ with open('dataset/mci_monthly_recent.csv', 'r') as f:
     for row in reader:
         data.append(row)
 
+# 追記モード: 出力済みの最終行を前月として引き継ぎ、それより後の月だけを処理
+if append:
+    header, tail, _ = read_tail(output_file, 1)
+    last_row = dict(zip(header, next(csv.reader(tail)))) if tail else None
+    if last_row is not None:
+        data = [last_row] + [row for row in data if row['date'] > last_row['date']]
+
 # 月次変動を追加
 for i in range(1, len(data)):
     prev = data[i-1]
@@ -27,12 +49,12 @@ for i in range(1, len(data)):
     curr['PPP_changed'] = 'YES' if curr['PPP_TRY'] != prev['PPP_TRY'] else 'NO'
 
 # 最初の行は変動なし
-data[0]['D_mTRY'] = ''
-data[0]['pct_TRYJPY'] = ''
-data[0]['PPP_changed'] = ''
+if not append:
+    data[0]['D_mTRY'] = ''
+    data[0]['pct_TRYJPY'] = ''
+    data[0]['PPP_changed'] = ''
 
 # 出力
-output_file = 'monthly_mci_fixed_ppp_2022_2025.csv'
 fieldnames = [
     'date',
     'S_USDJPY',
@@ -50,13 +72,22 @@ fieldnames = [
     'pct_TRYJPY',
 ]
 
-with open(output_file, 'w', newline='') as f:
-    writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
-    writer.writeheader()
-    writer.writerows(data)
+if append:
+    # 前月として引き継いだ既存の最終行は書き直さない
+    data = data[1:]
+    with open(output_file, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writerows(data)
+    print(f"✓ 月次MCI分析CSVに追記しました: {output_file}")
+    print(f"  {len(data)}行を追加")
+else:
+    with open(output_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(data)
 
-print(f"✓ 月次MCI分析CSVを出力しました: {output_file}")
-print(f"  {len(data)}行のデータ")
+    print(f"✓ 月次MCI分析CSVを出力しました: {output_file}")
+    print(f"  {len(data)}行のデータ")
 print()
 print("列の説明:")
 print("  date: 年月")
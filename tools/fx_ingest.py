@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+ティック・分足の為替ファイルを一定メモリで取り込み、日次・週次・月次に集約してMCIを計算
+
+create_monthly_mci.py の read_monthly_rates は手入力の月次平均レート（1か月1行）を前提にしている。
+このツールはギガバイト単位の生データ（ティック、分足）をレッグごとに固定サイズのチャンクで読み、
+チャンクごとに配列演算で集約してから次のチャンクに進む。保持するのは期間ごとの集計値だけなので、
+メモリはチャンクサイズと期間数で決まり、ファイルサイズには依存しない。
+
+  入力    レッグごとのCSV（.gz などの圧縮も可）。時刻列・価格列（または bid/ask の仲値）・任意で出来高列
+  頻度    D（日次）、W（週次、日曜始まり、ラベルは日曜日の日付。ppp_interpolation と同じ）、M（月次）
+  集約    mean（単純平均）、close（期間内で最後の時刻の値）、vwap（出来高加重平均、出来高列が必要）
+  出力    USDJPY・USDTRY が両方ある期間について、mci_engine で計算したMCI座標
+          （列は create_monthly_mci.py の出力と同じ）。--rates-only なら date,S_USDJPY,S_USDTRY のみ
+          （create_monthly_mci.py・append_monthly.py にそのまま渡せる形式）
+  TRYJPY  任意。指定するとクロスレートの実測値 S_TRYJPY_market と、
+          USDJPY/USDTRY から求めたクロスレートとの対数差 triangle_gap を列に追加する
+
+時刻列は数値なら UNIX 時刻（--epoch の単位）、文字列なら pd.to_datetime（--time-format、既定は ISO8601）で
+チャンクごとに一括変換する。タイムゾーン付きの時刻は UTC に揃える。価格が欠損・0以下の行は捨てる。
+
+使い方:
+  python3 tools/fx_ingest.py --usdjpy usdjpy_ticks.csv.gz --usdtry usdtry_ticks.csv.gz --freq M --how mean
+  python3 tools/fx_ingest.py --usdjpy usdjpy_m1.csv --usdtry usdtry_m1.csv --freq D --how vwap --volume-col volume
+  python3 tools/fx_ingest.py --usdjpy a.csv --usdtry b.csv --freq M --rates-only --output monthly_rates.csv
+  python3 tools/fx_ingest.py --usdjpy a.csv --usdtry b.csv --freq W --ppp interpolated --scheme geometric
+
+  from fx_ingest import resample_file
+  labels, values = resample_file('usdjpy_ticks.csv', freq='D', how='close')
+"""
+
+import argparse
+import csv
+import math
+import sys
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mci_engine import MCI_COLUMNS, calculate_mci_batch
+from ppp_interpolation import SCHEMES, interpolate_periods, store_anchors
+from ppp_store import load_ppp_store
+from profiling import add_profile_argument, setup_profiler
+
+FREQUENCIES = ('D', 'W', 'M')
+METHODS = ('mean', 'close', 'vwap')
+EPOCH_UNITS = ('s', 'ms', 'us', 'ns')
+
+# 1回に読む行数（1チャンクあたり数十MB）
+CHUNK_ROWS = 1_000_000
+
+# 価格列の自動検出の順序（なければ bid/ask の仲値）
+PRICE_COLUMNS = ('price', 'close', 'rate', 'mid', 'last')
+TIME_COLUMNS = ('timestamp', 'time', 'datetime', 'date')
+
+# create_monthly_mci.py の save_monthly_mci と同じ列
+OUTPUT_COLUMNS = ['date', 'S_USDJPY', 'S_USDTRY', 'PPP_JPY', 'PPP_TRY'] + list(MCI_COLUMNS)
+
+
+def bucket_keys(timestamps: np.ndarray, freq: str) -> np.ndarray:
+    """
+    datetime64 の時刻を期間番号（int64）に変換
+
+    D: 1970-01-01 からの日数、W: その週の日曜日の日数（1970-01-04 が日曜日）、M: 1970-01 からの月数
+    """
+    if freq == 'M':
+        return timestamps.astype('M8[M]').astype(np.int64)
+    days = timestamps.astype('M8[D]').astype(np.int64)
+    if freq == 'D':
+        return days
+    if freq == 'W':
+        return days - (days - 3) % 7
+    raise ValueError(f"Unknown frequency {freq}, expected one of {FREQUENCIES}")
+
+
+def bucket_periods(keys: np.ndarray, freq: str) -> np.ndarray:
+    """期間番号を期間ラベル（M: datetime64[M]、D/W: datetime64[D]）に戻す"""
+    return np.asarray(keys, dtype=np.int64).astype('M8[M]' if freq == 'M' else 'M8[D]')
+
+
+class BucketAccumulator:
+    """
+    1レッグの期間ごとの集計（合計・件数・出来高加重の合計・最後の時刻と値）
+
+    add() はチャンクを np.unique と np.bincount で期間ごとにまとめてから保持中の集計に足し込むので、
+    Python のループは期間数の分だけ。保持するのは期間数分の値だけで、生の行は残さない。
+    """
+
+    def __init__(self, freq: str = 'M'):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency {freq}, expected one of {FREQUENCIES}")
+        self.freq = freq
+        self.rows = 0
+        # 期間番号 -> [価格の合計, 件数, 価格×出来高の合計, 出来高の合計, 最後の時刻(ns), 最後の価格]
+        self._buckets: Dict[int, list] = {}
+
+    def add(self, timestamps: np.ndarray, prices: np.ndarray, volumes: Optional[np.ndarray] = None):
+        """1チャンク分の (時刻, 価格, 出来高) を足し込む（時刻順でなくてもよい）"""
+        timestamps = np.asarray(timestamps, dtype='M8[ns]')
+        prices = np.asarray(prices, dtype=np.float64)
+        if not len(prices):
+            return
+        self.rows += len(prices)
+
+        keys, inverse = np.unique(bucket_keys(timestamps, self.freq), return_inverse=True)
+        sums = np.bincount(inverse, prices, minlength=len(keys))
+        counts = np.bincount(inverse, minlength=len(keys))
+        if volumes is not None:
+            volumes = np.asarray(volumes, dtype=np.float64)
+            pv = np.bincount(inverse, prices * volumes, minlength=len(keys))
+            vol = np.bincount(inverse, volumes, minlength=len(keys))
+        else:
+            pv = vol = np.zeros(len(keys))
+
+        # 期間ごとに最後の時刻の行（同時刻ならファイル上で後の行）
+        ticks = timestamps.astype(np.int64)
+        order = np.lexsort((ticks, inverse))
+        last = order[np.append(np.flatnonzero(np.diff(inverse[order])), len(order) - 1)]
+
+        for key, s, c, p, v, t, x in zip(keys.tolist(), sums.tolist(), counts.tolist(), pv.tolist(),
+                                         vol.tolist(), ticks[last].tolist(), prices[last].tolist()):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = [s, c, p, v, t, x]
+                continue
+            bucket[0] += s
+            bucket[1] += c
+            bucket[2] += p
+            bucket[3] += v
+            if t >= bucket[4]:
+                bucket[4] = t
+                bucket[5] = x
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def result(self, how: str = 'mean') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        期間ラベルと集約値を期間順に返す
+
+        vwap で出来高の合計が0の期間は単純平均で代用する。
+        """
+        if how not in METHODS:
+            raise ValueError(f"Unknown method {how}, expected one of {METHODS}")
+        keys = np.array(sorted(self._buckets), dtype=np.int64)
+        table = np.array([self._buckets[k] for k in keys.tolist()], dtype=np.float64).reshape(len(keys), 6)
+        if how == 'close':
+            values = table[:, 5]
+        else:
+            values = table[:, 0] / table[:, 1]
+            if how == 'vwap':
+                traded = table[:, 3] > 0
+                values[traded] = table[traded, 2] / table[traded, 3]
+        return bucket_periods(keys, self.freq), values
+
+
+def detect_columns(path: str, time_col: Optional[str] = None, price_col: Optional[str] = None,
+                   volume_col: Optional[str] = None) -> Tuple[str, Tuple[str, ...], Optional[str]]:
+    """
+    ヘッダーから (時刻列, 価格列, 出来高列) を決める
+
+    価格列は PRICE_COLUMNS の順に探し、なければ ('bid', 'ask') の仲値を使う。
+    """
+    header = list(pd.read_csv(path, nrows=0, skipinitialspace=True).columns)
+    lower = {c.lower(): c for c in header}
+
+    def pick(name, candidates, role):
+        if name:
+            if name not in header:
+                raise ValueError(f"{path}: column '{name}' not found (columns: {', '.join(header)})")
+            return name
+        for candidate in candidates:
+            if candidate in lower:
+                return lower[candidate]
+        raise ValueError(f"{path}: cannot detect the {role} column (use --{role}-col)")
+
+    time_col = pick(time_col, TIME_COLUMNS, 'time')
+    if price_col:
+        prices = (pick(price_col, (), 'price'),)
+    elif any(c in lower for c in PRICE_COLUMNS):
+        prices = (pick(None, PRICE_COLUMNS, 'price'),)
+    elif 'bid' in lower and 'ask' in lower:
+        prices = (lower['bid'], lower['ask'])
+    else:
+        raise ValueError(f"{path}: cannot detect the price column (use --price-col)")
+    if volume_col:
+        volume_col = pick(volume_col, (), 'volume')
+    return time_col, prices, volume_col
+
+
+def parse_times(column: pd.Series, time_format: Optional[str] = None, epoch: str = 's') -> np.ndarray:
+    """時刻列をチャンク単位で datetime64[ns]（UTC、タイムゾーンなし）に変換"""
+    if pd.api.types.is_numeric_dtype(column):
+        parsed = pd.to_datetime(column, unit=epoch, errors='coerce')
+    else:
+        parsed = pd.to_datetime(column, format=time_format or 'ISO8601', errors='coerce', utc=True)
+        parsed = parsed.dt.tz_localize(None)
+    return parsed.to_numpy(dtype='M8[ns]')
+
+
+def read_chunks(path: str, time_col: Optional[str] = None, price_col: Optional[str] = None,
+                volume_col: Optional[str] = None, chunksize: int = CHUNK_ROWS,
+                time_format: Optional[str] = None, epoch: str = 's') -> Iterator[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]:
+    """
+    ファイルを chunksize 行ずつ読み、(時刻, 価格, 出来高) の配列を返すジェネレータ
+
+    必要な列だけを読み（usecols）、価格・出来高は float64 で直接変換する。
+    時刻が読めない行、価格が欠損・0以下の行は除く。
+    """
+    time_col, price_cols, volume_col = detect_columns(path, time_col, price_col, volume_col)
+    usecols = [time_col, *price_cols] + ([volume_col] if volume_col else [])
+    dtype = {c: np.float64 for c in usecols if c != time_col}
+    reader = pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize, skipinitialspace=True)
+    for chunk in reader:
+        timestamps = parse_times(chunk[time_col], time_format, epoch)
+        prices = chunk[price_cols[0]].to_numpy(dtype=np.float64)
+        if len(price_cols) == 2:
+            prices = (prices + chunk[price_cols[1]].to_numpy(dtype=np.float64)) / 2
+        volumes = chunk[volume_col].to_numpy(dtype=np.float64) if volume_col else None
+
+        valid = ~np.isnat(timestamps) & (prices > 0)
+        if volumes is not None:
+            valid &= ~np.isnan(volumes)
+        if not valid.all():
+            timestamps, prices = timestamps[valid], prices[valid]
+            volumes = volumes[valid] if volumes is not None else None
+        yield timestamps, prices, volumes
+
+
+def ingest_file(path: str, freq: str = 'M', **options) -> BucketAccumulator:
+    """1ファイルをチャンクごとに集約した BucketAccumulator を返す（options は read_chunks の引数）"""
+    accumulator = BucketAccumulator(freq)
+    for timestamps, prices, volumes in read_chunks(path, **options):
+        accumulator.add(timestamps, prices, volumes)
+    return accumulator
+
+
+def resample_file(path: str, freq: str = 'M', how: str = 'mean', **options) -> Tuple[np.ndarray, np.ndarray]:
+    """1ファイルをチャンクごとに集約し、(期間ラベル, 値) を返す（options は read_chunks の引数）"""
+    if how == 'vwap' and not options.get('volume_col'):
+        raise ValueError("vwap needs a volume column (volume_col)")
+    return ingest_file(path, freq, **options).result(how)
+
+
+def period_labels(periods: np.ndarray) -> list:
+    """期間ラベルを文字列に（M: YYYY-MM、D/W: YYYY-MM-DD）"""
+    return [str(p) for p in periods]
+
+
+def align_legs(rates: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """USDJPY と USDTRY が両方ある期間の (期間ラベル, S_USDJPY, S_USDTRY)"""
+    periods, idx_jpy, idx_try = np.intersect1d(rates['USDJPY'][0], rates['USDTRY'][0],
+                                               assume_unique=True, return_indices=True)
+    return periods, rates['USDJPY'][1][idx_jpy], rates['USDTRY'][1][idx_try]
+
+
+def build_mci(rates: Dict[str, Tuple[np.ndarray, np.ndarray]], ppp: str = 'annual',
+              scheme: str = 'linear', store=None) -> Dict[str, np.ndarray]:
+    """
+    集約済みのレッグからMCI座標を計算
+
+    USDJPY と USDTRY が両方ある期間だけを使う。ppp='annual' はその年のPPP（create_monthly_mci.py と同じ）、
+    ppp='interpolated' は ppp_interpolation で期間ごとに補間したPPP。
+    annual でPPPがない年の期間は除く。
+
+    Returns:
+        OUTPUT_COLUMNS（TRYJPY があれば S_TRYJPY_market・triangle_gap も）をキーとする列の dict
+        （'date' は期間ラベルの配列）
+    """
+    store = store or load_ppp_store()
+    periods, s_usdjpy, s_usdtry = align_legs(rates)
+
+    if ppp == 'interpolated':
+        ppp_jpy = interpolate_periods(store_anchors(store, 'JPY'), periods, scheme)
+        ppp_try = interpolate_periods(store_anchors(store, 'TRY'), periods, scheme)
+    else:
+        years = periods.astype('M8[Y]').astype(np.int64) + 1970
+        known = np.isin(years, store.years)
+        if not known.all():
+            missing = sorted(set(years[~known].tolist()))
+            print(f"Warning: No PPP config for year {', '.join(map(str, missing))}, skipping", file=sys.stderr)
+            periods, s_usdjpy, s_usdtry, years = periods[known], s_usdjpy[known], s_usdtry[known], years[known]
+        ppp_jpy = store.lookup('JPY', years)
+        ppp_try = store.lookup('TRY', years)
+
+    columns = {
+        'date': periods,
+        'S_USDJPY': s_usdjpy,
+        'S_USDTRY': s_usdtry,
+        'PPP_JPY': ppp_jpy,
+        'PPP_TRY': ppp_try,
+    }
+    columns.update(calculate_mci_batch(s_usdjpy, s_usdtry, ppp_jpy, ppp_try))
+
+    if 'TRYJPY' in rates:
+        cross_periods, cross_values = rates['TRYJPY']
+        market = np.full(len(periods), np.nan)
+        _, i, j = np.intersect1d(periods, cross_periods, assume_unique=True, return_indices=True)
+        market[i] = cross_values[j]
+        columns['S_TRYJPY_market'] = market
+        columns['triangle_gap'] = np.log(market / columns['S_TRYJPY'])
+    return columns
+
+
+def write_columns(columns: Dict[str, np.ndarray], names, output_file: str):
+    """列の dict をCSVに保存（NaN は空欄）"""
+    values = [period_labels(columns['date'])]
+    for name in names[1:]:
+        values.append(['' if math.isnan(x) else x for x in columns[name].tolist()])
+    with open(output_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        writer.writerows(zip(*values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ティック・分足の為替ファイルをチャンク単位で集約してMCIを計算')
+    parser.add_argument('--usdjpy', required=True, help='USDJPY のファイル')
+    parser.add_argument('--usdtry', required=True, help='USDTRY のファイル')
+    parser.add_argument('--tryjpy', help='TRYJPY のファイル（任意、三角裁定の乖離を出力）')
+    parser.add_argument('--freq', choices=FREQUENCIES, default='M', help='集約頻度（既定: M）')
+    parser.add_argument('--how', choices=METHODS, default='mean', help='集約方法（既定: mean）')
+    parser.add_argument('--time-col', help='時刻列（既定: timestamp / time / datetime / date を自動検出）')
+    parser.add_argument('--price-col', help='価格列（既定: price / close / rate / mid / last、なければ bid・ask の仲値）')
+    parser.add_argument('--volume-col', help='出来高列（vwap で必須）')
+    parser.add_argument('--time-format', help='時刻の書式（例: %%Y%%m%%d %%H%%M%%S、既定は ISO8601）')
+    parser.add_argument('--epoch', choices=EPOCH_UNITS, default='s', help='数値の時刻の単位（既定: s）')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help=f'1チャンクの行数（既定: {CHUNK_ROWS}）')
+    parser.add_argument('--ppp', choices=('annual', 'interpolated'), default='annual',
+                        help='PPP: その年の値（annual）か期間ごとの補間値（interpolated）')
+    parser.add_argument('--scheme', choices=SCHEMES, default='linear', help='--ppp interpolated の補間方式')
+    parser.add_argument('--rates-only', action='store_true',
+                        help='MCIを計算せず date,S_USDJPY,S_USDTRY だけを出力（create_monthly_mci.py の入力形式）')
+    parser.add_argument('--output', default='mci_resampled.csv', help='出力CSV（既定: mci_resampled.csv）')
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    if args.how == 'vwap' and not args.volume_col:
+        parser.error('--how vwap には --volume-col が必要です')
+    prof = setup_profiler('fx_ingest', args.profile)
+
+    options = dict(time_col=args.time_col, price_col=args.price_col, volume_col=args.volume_col,
+                   chunksize=args.chunk_rows, time_format=args.time_format, epoch=args.epoch)
+    files = {'USDJPY': args.usdjpy, 'USDTRY': args.usdtry}
+    if args.tryjpy:
+        files['TRYJPY'] = args.tryjpy
+
+    rates = {}
+    for leg, path in files.items():
+        print(f"{leg}: {path} を読み込んでいます...")
+        with prof.stage(f'load/{leg}') as stage:
+            accumulator = ingest_file(path, args.freq, **options)
+            rates[leg] = accumulator.result(args.how)
+            stage.rows = accumulator.rows
+        print(f"  {accumulator.rows}行 → {len(accumulator)}期間")
+
+    with prof.stage('compute') as stage:
+        if args.rates_only:
+            columns = dict(zip(('date', 'S_USDJPY', 'S_USDTRY'), align_legs(rates)))
+            names = ['date', 'S_USDJPY', 'S_USDTRY']
+        else:
+            columns = build_mci(rates, args.ppp, args.scheme)
+            names = OUTPUT_COLUMNS + [c for c in ('S_TRYJPY_market', 'triangle_gap') if c in columns]
+        stage.rows = len(columns['date'])
+
+    with prof.stage('write', rows=len(columns['date'])):
+        write_columns(columns, names, args.output)
+
+    if len(columns['date']):
+        print(f"✓ {args.output} に保存しました（{len(columns['date'])}期間、"
+              f"{period_labels(columns['date'][:1])[0]} 〜 {period_labels(columns['date'][-1:])[0]}）")
+    else:
+        print(f"Warning: USDJPY と USDTRY の両方がある期間がありません（{args.output} はヘッダーのみ）")
+
+
+if __name__ == '__main__':
+    main()
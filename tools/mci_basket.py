@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+K通貨バスケットのclr座標エンジン
+
+3通貨（USD/JPY/TRY）に限らず、任意のK通貨・任意の基軸通貨でMCI座標を計算する。
+
+  d_j = ln(S_base/j / PPP_j)           （基軸通貨 base に対する各通貨のPPP乖離率）
+  m_base = (Σ_j d_j) / K
+  m_j    = m_base - d_j
+
+K=3, base=USD のとき mci_engine.calculate_mci_batch と同じ式になる。
+座標 m は (T, K) 配列として O(T·K) で計算し、通貨ペア間の乖離
+d_ij = m_i - m_j は CrossDeviations から必要な分だけ遅延計算する
+（K² 列を事前に展開しない）。
+
+使い方:
+  from mci_basket import BasketMCI
+  basket = BasketMCI(['USD', 'JPY', 'TRY', 'EUR'], base='USD')
+  result = basket.compute(rates, ppp)   # rates, ppp: shape (T, K-1)
+  result.m_of('TRY')                    # -> (T,)
+  result.cross['TRY', 'JPY']            # -> (T,) d_TRYJPY
+  result.cross.at(-1)                   # -> (K, K) 最新時点の乖離行列
+
+全3通貨組のスキャン（N通貨のユニバースから C(N,3) 個のバスケット）:
+  各通貨の共通基軸通貨に対する乖離率 d_j を1回だけ計算し、全ての3通貨組の m 座標を
+  ブロードキャストで一度に求める。3通貨組 (a, b, c) の m_x = (d_a + d_b + d_c) / 3 - d_x は
+  基軸通貨の選び方によらない（基軸通貨を変えると d が全通貨で同じ量だけずれ、打ち消し合う）。
+
+  python3 tools/mci_basket.py scan universe.csv --base USD --top 20   # CSV: currency,rate,ppp
+
+  from mci_basket import scan_triples
+  scan = scan_triples(currencies, rates, ppp, base='USD')   # rates, ppp: (N-1,) または (T, N-1)
+  scan.m                  # -> (B, 3) または (T, B, 3)、scan.triples[b] の各通貨の m
+  scan.top(10)            # |m| の大きい順に (バスケット, 通貨, m)
+"""
+
+import argparse
+import csv
+from itertools import combinations
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+
+class CrossDeviations:
+    """
+    通貨ペア間の乖離 d_ij = m_i - m_j の遅延ビュー
+
+    保持するのは m 座標 (T, K) のみで、列・行列は参照された時点で計算する。
+    """
+
+    def __init__(self, m: np.ndarray, index: Dict[str, int]):
+        self._m = m
+        self._index = index
+
+    def __getitem__(self, pair: Tuple[str, str]) -> np.ndarray:
+        """d_ij の時系列 (T,) を返す"""
+        i, j = pair
+        return self._m[:, self._index[i]] - self._m[:, self._index[j]]
+
+    def at(self, t: int) -> np.ndarray:
+        """時点 t の乖離行列 (K, K) を返す（[i, j] = m_i - m_j）"""
+        row = self._m[t]
+        return row[:, None] - row[None, :]
+
+    def pairs(self) -> Iterator[Tuple[str, str, np.ndarray]]:
+        """全ペア (i, j, d_ij) を i < j の順に1組ずつ生成"""
+        names = list(self._index)
+        for a in range(len(names)):
+            for b in range(a + 1, len(names)):
+                yield names[a], names[b], self[names[a], names[b]]
+
+
+class BasketResult:
+    """BasketMCI.compute の結果（d: (T, K-1)、m: (T, K)）"""
+
+    def __init__(self, currencies: Sequence[str], base: str, d: np.ndarray, m: np.ndarray):
+        self.currencies = tuple(currencies)
+        self.base = base
+        self.d = d
+        self.m = m
+        self._index = {c: k for k, c in enumerate(self.currencies)}
+        self.cross = CrossDeviations(m, self._index)
+
+    def m_of(self, currency: str) -> np.ndarray:
+        """指定通貨の m 座標 (T,) を返す（コピーしないビュー）"""
+        return self.m[:, self._index[currency]]
+
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        """m_<通貨> 列の dict に変換（CSV出力用）"""
+        return {f'm_{c}': self.m_of(c) for c in self.currencies}
+
+
+class BasketMCI:
+    """
+    任意のK通貨バスケット・任意の基軸通貨によるMCI座標計算
+
+    Args:
+        currencies: バスケットの通貨コード（基軸通貨を含む、K >= 3）
+        base: 基軸通貨（rates/ppp の列は base 以外の通貨を currencies の順に並べる）
+    """
+
+    def __init__(self, currencies: Sequence[str], base: str = 'USD'):
+        currencies = tuple(currencies)
+        if len(currencies) < 3:
+            raise ValueError("Basket needs at least 3 currencies")
+        if len(set(currencies)) != len(currencies):
+            raise ValueError(f"Duplicate currency in basket: {currencies}")
+        if base not in currencies:
+            raise ValueError(f"Base currency {base} not in basket")
+
+        self.currencies = currencies
+        self.base = base
+        self.base_index = currencies.index(base)
+        self.quoted = tuple(c for c in currencies if c != base)
+
+    def compute(self, rates, ppp) -> BasketResult:
+        """
+        為替レートとPPPからclr座標を計算
+
+        Args:
+            rates: base建てレート S_base/j, shape (T, K-1) または (K-1,)
+            ppp: 各通貨のPPP（base基準）, rates と同じ形またはブロードキャスト可能な形
+
+        Returns:
+            BasketResult
+        """
+        rates = np.atleast_2d(np.asarray(rates, dtype=np.float64))
+        ppp = np.asarray(ppp, dtype=np.float64)
+        k = len(self.currencies)
+        if rates.shape[1] != k - 1:
+            raise ValueError(f"Expected {k - 1} rate columns, got {rates.shape[1]}")
+
+        # PPP乖離率（基軸通貨は 0）
+        d = np.log(rates / ppp)
+
+        # clr座標: 基軸通貨の m は d の平均、その他は m_base - d_j
+        m_base = d.sum(axis=1) / k
+        m = np.empty((d.shape[0], k))
+        m[:, self.base_index] = m_base
+        b = self.base_index
+        np.subtract(m_base[:, None], d[:, :b], out=m[:, :b])
+        np.subtract(m_base[:, None], d[:, b:], out=m[:, b + 1:])
+
+        return BasketResult(self.currencies, self.base, d, m)
+
+
+def basket_indices(n: int, k: int = 3) -> np.ndarray:
+    """n通貨から k通貨を選ぶ全ての組の通貨番号 (C(n, k), k)（辞書順）"""
+    return np.array(list(combinations(range(n), k)), dtype=np.intp).reshape(-1, k)
+
+
+class TripleScan:
+    """
+    scan_triples の結果
+
+    triples: (B, 3) 各バスケットの通貨番号（currencies の添字、辞書順）
+    d:       (N,) または (T, N) 共通基軸通貨に対する乖離率（基軸通貨は 0）
+    m:       (B, 3) または (T, B, 3) triples と同じ並びの m 座標
+    """
+
+    def __init__(self, currencies: Sequence[str], base: str, triples: np.ndarray, d: np.ndarray, m: np.ndarray):
+        self.currencies = tuple(currencies)
+        self.base = base
+        self.triples = triples
+        self.d = d
+        self.m = m
+        self._index = {c: k for k, c in enumerate(self.currencies)}
+
+    def __len__(self) -> int:
+        return len(self.triples)
+
+    def basket(self, b: int) -> Tuple[str, ...]:
+        """バスケット b の通貨コード"""
+        return tuple(self.currencies[i] for i in self.triples[b])
+
+    def find(self, *currencies: str) -> int:
+        """通貨コードの組からバスケット番号を求める（順不同）"""
+        idx = sorted(self._index[c] for c in currencies)
+        n = len(self.currencies)
+        # 辞書順の組の番号: 先頭が i の組は C(n-1-i, 2) 個ずつ並ぶ
+        a, b, c = idx
+        before_a = sum((n - 1 - i) * (n - 2 - i) // 2 for i in range(a))
+        before_b = sum(n - 1 - j for j in range(a + 1, b))
+        return before_a + before_b + (c - b - 1)
+
+    def cross(self, i: str, j: str) -> np.ndarray:
+        """
+        通貨 i, j 間の乖離 m_i - m_j（= d_j - d_i）
+
+        i と j を含むどのバスケットでも同じ値になるため、バスケットごとには持たない。
+        """
+        return self.d[..., self._index[j]] - self.d[..., self._index[i]]
+
+    def top(self, k: int = 10, side: str = 'both', t: int = -1) -> List[Dict]:
+        """
+        m が極端な (バスケット, 通貨) を k 件返す
+
+        side: both（|m| の大きい順）、low（m の小さい順）、high（m の大きい順）。
+        m が (T, B, 3) のときは時点 t（既定は最新）で比べる。同じ値ならバスケット番号の小さい順。
+        """
+        m = self.m if self.m.ndim == 2 else self.m[t]
+        flat = m.ravel()
+        score = {'both': np.abs(flat), 'low': -flat, 'high': flat}[side]
+        k = min(k, len(flat))
+        if k <= 0:
+            return []
+        candidates = np.argpartition(-score, k - 1)[:k]
+        order = candidates[np.lexsort((candidates, -score[candidates]))]
+        result = []
+        for position in order.tolist():
+            b, slot = divmod(position, 3)
+            result.append({
+                'basket': self.basket(b),
+                'currency': self.currencies[self.triples[b, slot]],
+                'm': float(flat[position]),
+            })
+        return result
+
+
+def scan_triples(currencies: Sequence[str], rates, ppp, base: str = 'USD', dtype=np.float64) -> TripleScan:
+    """
+    ユニバースの全3通貨組の m 座標を一括計算
+
+    Args:
+        currencies: ユニバースの通貨コード（基軸通貨を含む、N >= 3）
+        rates: base建てレート S_base/j、base 以外の通貨を currencies の順に並べた (N-1,) または (T, N-1)
+        ppp: 各通貨のPPP（base基準）、rates と同じ形またはブロードキャスト可能な形
+        dtype: m の型（float32 にすると T×C(N,3)×3 の配列が半分になる）
+
+    Returns:
+        TripleScan
+    """
+    basket = BasketMCI(currencies, base)
+    rates = np.asarray(rates, dtype=np.float64)
+    if rates.shape[-1] != len(basket.quoted):
+        raise ValueError(f"Expected {len(basket.quoted)} rate columns, got {rates.shape[-1]}")
+
+    # 共通の基軸通貨に対する乖離率（各通貨1回だけ計算、基軸通貨は 0）
+    d_quoted = np.log(rates / np.asarray(ppp, dtype=np.float64))
+    d = np.insert(d_quoted, basket.base_index, 0.0, axis=-1)
+
+    # 全バスケットの (d_a, d_b, d_c) を並べて clr 変換
+    triples = basket_indices(len(basket.currencies))
+    grouped = d[..., triples]
+    m = (grouped.sum(axis=-1, keepdims=True) / 3 - grouped).astype(dtype, copy=False)
+    return TripleScan(basket.currencies, base, triples, d, m)
+
+
+def read_universe(csv_path: str, base: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    ユニバースのCSV（currency,rate,ppp）を読み込む
+
+    rate は base建てレート S_base/j、ppp は base基準のPPP。base の行はあってもなくてもよい（無視する）。
+    """
+    currencies, rates, ppp = [base], [], []
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row['currency'] == base:
+                continue
+            currencies.append(row['currency'])
+            rates.append(float(row['rate']))
+            ppp.append(float(row['ppp']))
+    return currencies, np.array(rates), np.array(ppp)
+
+
+def write_scan(scan: TripleScan, output_file: str):
+    """全バスケットの m をCSVに保存（1行1バスケット）"""
+    m = scan.m if scan.m.ndim == 2 else scan.m[-1]
+    names = np.array(scan.currencies)[scan.triples]
+    with open(output_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['currency_1', 'currency_2', 'currency_3', 'm_1', 'm_2', 'm_3'])
+        writer.writerows(zip(*names.T.tolist(), *m.T.tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='K通貨バスケットのclr座標')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    scan = sub.add_parser('scan', help='ユニバースの全3通貨組のMCIを計算し、m が極端な組を表示')
+    scan.add_argument('csv', help='ユニバースのCSV（currency,rate,ppp、rate は base建て）')
+    scan.add_argument('--base', default='USD', help='レート・PPPの基軸通貨（既定: USD、結果は基軸通貨によらない）')
+    scan.add_argument('--top', type=int, default=20, help='表示件数（既定: 20）')
+    scan.add_argument('--side', choices=('both', 'low', 'high'), default='both',
+                      help='both: |m| の大きい順、low: m の小さい順、high: m の大きい順')
+    scan.add_argument('--output', help='全バスケットの m を保存するCSV')
+
+    args = parser.parse_args()
+
+    currencies, rates, ppp = read_universe(args.csv, args.base)
+    result = scan_triples(currencies, rates, ppp, args.base)
+    print(f"{len(currencies)}通貨、{len(result)}バスケット")
+    print(f"{'順位':>4}  {'バスケット':<16} {'通貨':<5} {'m':>10}")
+    for rank, item in enumerate(result.top(args.top, args.side), 1):
+        print(f"{rank:>4}  {'/'.join(item['basket']):<16} {item['currency']:<5} {item['m']:>+10.6f}")
+    if args.output:
+        write_scan(result, args.output)
+        print(f"\n✓ {args.output} に保存しました")
+
+
+if __name__ == '__main__':
+    main()
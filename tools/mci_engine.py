@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+MCI座標の一括計算エンジン
+
+S_USDJPY, S_USDTRY, PPP_JPY, PPP_TRY を NumPy 配列（またはスカラー）で受け取り、
+PPP乖離率 d、MCI座標 m、クロスレートを列ごとの配列として一度に返す。
+行ごとの dict は生成しないため、日次・日中の大量データにもそのまま使える。
+
+使い方:
+  from mci_engine import calculate_mci_batch
+  cols = calculate_mci_batch(s_usdjpy, s_usdtry, ppp_jpy, ppp_try)
+  cols['m_TRY']  # -> np.ndarray
+"""
+
+from typing import Dict
+
+import numpy as np
+
+# calculate_mci_batch が返す列（CSVの列名と同じ）
+MCI_COLUMNS = (
+    'd_USDJPY',
+    'd_USDTRY',
+    'm_USD',
+    'm_JPY',
+    'm_TRY',
+    'S_TRYJPY',
+    'PPP_TRYJPY',
+    'd_TRYJPY',
+)
+
+
+def calculate_mci_batch(s_usdjpy, s_usdtry, ppp_jpy, ppp_try) -> Dict[str, np.ndarray]:
+    """
+    為替レートとPPPの配列からMCI座標を列単位で計算
+
+    各引数は同じ長さの配列、またはスカラー（ブロードキャストされる）。
+    計算式は従来のスカラー版 calculate_mci と同一で、演算順序も揃えている。
+
+    Returns:
+        MCI_COLUMNS をキーとする float64 配列の dict
+    """
+    s_usdjpy, s_usdtry, ppp_jpy, ppp_try = np.broadcast_arrays(
+        np.asarray(s_usdjpy, dtype=np.float64),
+        np.asarray(s_usdtry, dtype=np.float64),
+        np.asarray(ppp_jpy, dtype=np.float64),
+        np.asarray(ppp_try, dtype=np.float64),
+    )
+
+    # PPP乖離率
+    d_usdjpy = np.log(s_usdjpy / ppp_jpy)
+    d_usdtry = np.log(s_usdtry / ppp_try)
+
+    # MCI座標（clr変換）
+    m_usd = (d_usdjpy + d_usdtry) / 3
+    m_jpy = (-2 * d_usdjpy + d_usdtry) / 3
+    m_try = (d_usdjpy - 2 * d_usdtry) / 3
+
+    # クロスレート
+    s_tryjpy = s_usdjpy / s_usdtry
+    ppp_tryjpy = ppp_jpy / ppp_try
+    d_tryjpy = np.log(s_tryjpy / ppp_tryjpy)
+
+    return {
+        'd_USDJPY': d_usdjpy,
+        'd_USDTRY': d_usdtry,
+        'm_USD': m_usd,
+        'm_JPY': m_jpy,
+        'm_TRY': m_try,
+        'S_TRYJPY': s_tryjpy,
+        'PPP_TRYJPY': ppp_tryjpy,
+        'd_TRYJPY': d_tryjpy,
+    }
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+常駐プロセス（バッチ・ストリーム・照会サービス）用のプロセス内メトリクス
+
+  Counter     単調増加のカウンタ（ティック数・リクエスト数など）
+  Gauge       任意の値
+  Histogram   対数バケットの分布（処理時間など）。1オクターブ（2倍）を per_octave 個に分ける
+  QuoteAge    レッグごとの最後のクオートからの経過秒数（鮮度）
+
+更新はスレッドごとの領域（threading.local）に書き、読み出し時に合算する。
+更新側はロックを取らないので、ホットパスへの影響はカウンタ1回あたり 0.1〜0.2µs 程度。
+ロックを取るのは、スレッドが初めてそのメトリクスを更新するときと、メトリクスを作るときだけ。
+
+出力:
+  registry.render_prometheus()      Prometheus のテキスト形式（mci_service.py の GET /metrics）
+  registry.snapshot()               JSON にできる dict（分位点の推定値つき）
+  SnapshotWriter(path, interval)    interval 秒ごとに JSON を書き出すスレッド（一時ファイル → os.replace）
+  serve_metrics(port)               GET /metrics を返す HTTP サーバをデーモンスレッドで起動
+
+記録しているメトリクス:
+  mci_operation_seconds{operation="calculate_mci"|"ppp_lookup"|"depth_classification"}
+                                    calculate_mci_from_rates.mci_columns の各段（1回の呼び出し単位）
+  mci_requests_total{path, status}  mci_service.py のリクエスト数
+  mci_request_seconds{path}         mci_service.py のリクエスト処理時間
+  mci_batch_rows_total{status}      calculate_mci_from_rates.py --batch の出力行数・飛ばした行数
+  mci_ticks_total{leg}              StreamingMCI.run（metrics を渡したとき）のティック数
+  mci_quote_age_seconds{leg}        同、レッグごとの最後のクオートからの経過秒数
+
+使い方:
+  from mci_metrics import REGISTRY, operation_histogram
+
+  lookup_seconds = operation_histogram('ppp_lookup')
+  started = time.perf_counter()
+  ...
+  lookup_seconds.observe(time.perf_counter() - started)
+
+  REGISTRY.counter('mci_ticks_total', 'Quotes processed', leg='USDJPY').inc()
+  print(REGISTRY.render_prometheus())
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+OPERATION_SECONDS = 'mci_operation_seconds'
+QUANTILES = (0.5, 0.9, 0.99)
+PROMETHEUS_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _label_text(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+def _number(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """スレッドごとの領域を持つメトリクスの共通部分"""
+
+    def __init__(self, name: str, help: str, labels: Tuple[Tuple[str, str], ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._local = threading.local()
+        self._shards: List[list] = []
+        self._lock = threading.Lock()
+
+    def _new_shard(self) -> list:
+        raise NotImplementedError
+
+    def _shard(self) -> list:
+        shard = self._new_shard()
+        with self._lock:
+            self._shards.append(shard)
+        self._local.shard = shard
+        return shard
+
+
+class Counter(_Sharded):
+    """単調増加のカウンタ"""
+
+    kind = 'counter'
+
+    def _new_shard(self) -> list:
+        return [0]
+
+    def inc(self, amount: int = 1):
+        try:
+            self._local.shard[0] += amount
+        except AttributeError:
+            self._shard()[0] += amount
+
+    @property
+    def value(self):
+        with self._lock:
+            return sum(shard[0] for shard in self._shards)
+
+
+class Histogram(_Sharded):
+    """
+    対数バケットのヒストグラム
+
+    バケット i の上限は min_value * 2 ** (i / per_octave)。既定は 1µs から約67秒まで、
+    2倍ごとに2分割（各バケットの幅は約41%）。最後のバケットは上限なし（+Inf）。
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Tuple[Tuple[str, str], ...] = (),
+                 min_value: float = 1e-6, max_value: float = 64.0, per_octave: int = 2):
+        super().__init__(name, help, labels)
+        self.min_value = min_value
+        self.per_octave = per_octave
+        n = math.ceil(math.log2(max_value / min_value) * per_octave) + 1
+        self.bounds = [min_value * 2 ** (i / per_octave) for i in range(n)] + [math.inf]
+
+    def _new_shard(self) -> list:
+        # [各バケットの件数, 合計]
+        return [[0] * len(self.bounds), 0.0]
+
+    def observe(self, value: float):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        shard[0][bisect_left(self.bounds, value)] += 1
+        shard[1] += value
+
+    def time(self) -> 'Timer':
+        """with ブロックの経過時間（秒）を記録する"""
+        return Timer(self)
+
+    def merged(self) -> Tuple[List[int], int, float]:
+        """(バケットごとの件数, 件数, 合計)"""
+        counts = [0] * len(self.bounds)
+        total = 0.0
+        with self._lock:
+            for shard_counts, shard_sum in self._shards:
+                for i, c in enumerate(shard_counts):
+                    counts[i] += c
+                total += shard_sum
+        return counts, sum(counts), total
+
+    def quantile(self, q: float, counts: Optional[List[int]] = None) -> float:
+        """分位点の推定（そのバケットの上限）。記録がなければ NaN"""
+        counts = counts if counts is not None else self.merged()[0]
+        n = sum(counts)
+        if not n:
+            return math.nan
+        rank = q * n
+        seen = 0
+        for bound, c in zip(self.bounds, counts):
+            seen += c
+            if seen >= rank and c:
+                return bound
+        return self.bounds[-1]
+
+
+class Timer:
+    """Histogram.time() の with ブロック"""
+
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Gauge:
+    """任意の値（代入は1命令なのでスレッドごとの領域は持たない）"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, labels: Tuple[Tuple[str, str], ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.value = math.nan
+
+    def set(self, value: float):
+        self.value = value
+
+
+class QuoteAge:
+    """
+    レッグごとの最後のクオートからの経過秒数（gauge として出力）
+
+    touch(leg) は time.monotonic() を dict に代入するだけ。経過秒数は読み出し時に計算する。
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, label: str = 'leg'):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._last: Dict[str, float] = {}
+
+    def touch(self, leg: str, at: Optional[float] = None):
+        self._last[leg] = time.monotonic() if at is None else at
+
+    def ages(self) -> Dict[str, float]:
+        now = time.monotonic()
+        return {leg: now - last for leg, last in list(self._last.items())}
+
+
+class MetricsRegistry:
+    """
+    名前とラベルでメトリクスを引く（なければ作る）レジストリ
+
+    種類（Counter / Histogram / Gauge / QuoteAge）は名前ごとに1つ。同じ名前をラベル違いで
+    別の種類として登録すると ValueError（Prometheus の # TYPE は名前単位のため）。
+    """
+
+    def __init__(self):
+        self._metrics: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], object] = {}
+        self._kinds: Dict[str, type] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labels: Dict[str, object], **kwargs):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    self._check_kind(cls, name)
+                    metric = cls(name, help, key[1], **kwargs)
+                    self._metrics[key] = metric
+        if not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as {type(metric).__name__}")
+        return metric
+
+    def _check_kind(self, cls, name: str):
+        """名前の種類を登録（別の種類で登録済みなら ValueError）。ロックを持って呼ぶ"""
+        kind = self._kinds.setdefault(name, cls)
+        if kind is not cls:
+            raise ValueError(f"Metric {name} already registered as {kind.__name__}")
+
+    def counter(self, name: str, help: str = '', **labels) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name: str, help: str = '', **labels) -> Histogram:
+        return self._get(Histogram, name, help, labels)
+
+    def gauge(self, name: str, help: str = '', **labels) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def quote_age(self, name: str, help: str = '', label: str = 'leg') -> QuoteAge:
+        key = (name, ())
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                self._check_kind(QuoteAge, name)
+                metric = self._metrics[key] = QuoteAge(name, help, label)
+        if not isinstance(metric, QuoteAge):
+            raise ValueError(f"Metric {name} already registered as {type(metric).__name__}")
+        return metric
+
+    def metrics(self) -> list:
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda m: (m.name, getattr(m, 'labels', ())))
+
+    def render_prometheus(self) -> str:
+        """Prometheus のテキスト形式"""
+        lines = []
+        described = set()
+        for metric in self.metrics():
+            if metric.name not in described:
+                described.add(metric.name)
+                if metric.help:
+                    lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if isinstance(metric, QuoteAge):
+                for leg, age in sorted(metric.ages().items()):
+                    lines.append(f"{metric.name}{_label_text(((metric.label, leg),))} {_number(age)}")
+            elif isinstance(metric, Histogram):
+                counts, n, total = metric.merged()
+                cumulative = 0
+                for bound, c in zip(metric.bounds, counts):
+                    cumulative += c
+                    labels = metric.labels + (('le', '+Inf' if math.isinf(bound) else f'{bound:.6g}'),)
+                    lines.append(f"{metric.name}_bucket{_label_text(labels)} {cumulative}")
+                lines.append(f"{metric.name}_sum{_label_text(metric.labels)} {_number(total)}")
+                lines.append(f"{metric.name}_count{_label_text(metric.labels)} {n}")
+            else:
+                lines.append(f"{metric.name}{_label_text(metric.labels)} {_number(metric.value)}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict:
+        """JSON にできる dict（ヒストグラムは件数・合計・分位点と、件数のあるバケットだけ）"""
+        entries = []
+        for metric in self.metrics():
+            if isinstance(metric, QuoteAge):
+                for leg, age in sorted(metric.ages().items()):
+                    entries.append({'name': metric.name, 'type': 'gauge', 'labels': {metric.label: leg},
+                                    'value': age})
+                continue
+            entry = {'name': metric.name, 'type': metric.kind, 'labels': dict(metric.labels)}
+            if isinstance(metric, Histogram):
+                counts, n, total = metric.merged()
+                entry.update(count=n, sum=total,
+                             quantiles={str(q): metric.quantile(q, counts) if n else None for q in QUANTILES},
+                             buckets={('+Inf' if math.isinf(b) else f'{b:.6g}'): c
+                                      for b, c in zip(metric.bounds, counts) if c})
+            else:
+                value = metric.value
+                entry['value'] = None if isinstance(value, float) and math.isnan(value) else value
+            entries.append(entry)
+        return {'timestamp': datetime.now().isoformat(timespec='seconds'), 'pid': os.getpid(), 'metrics': entries}
+
+    def write_snapshot(self, path: str):
+        """snapshot() を一時ファイルに書いてから差し替える（読み手が書きかけを見ない）"""
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=1)
+            f.write('\n')
+        os.replace(tmp, path)
+
+
+REGISTRY = MetricsRegistry()
+
+
+def operation_histogram(operation: str, registry: MetricsRegistry = REGISTRY) -> Histogram:
+    """mci_operation_seconds{operation=...}"""
+    return registry.histogram(OPERATION_SECONDS, 'Latency of MCI operations in seconds', operation=operation)
+
+
+class SnapshotWriter:
+    """
+    interval 秒ごとに registry の JSON スナップショットを path に書くデーモンスレッド
+
+    stop() で止めて最後のスナップショットを書く（with ブロックでも使える）。
+    """
+
+    def __init__(self, path: str, interval: float = 10.0, registry: MetricsRegistry = REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='mci-metrics-snapshot', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.registry.write_snapshot(self.path)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.registry.write_snapshot(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def serve_metrics(port: int, host: str = '127.0.0.1', registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """
+    GET /metrics（Prometheus テキスト）と GET /metrics.json を返す HTTP サーバをデーモンスレッドで起動
+
+    asyncio のサーバを持たないプロセス（バッチ・ストリーム）用。server.shutdown() で止まる。
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = registry.render_prometheus().encode('utf-8'), PROMETHEUS_TYPE
+            elif self.path == '/metrics.json':
+                body = json.dumps(registry.snapshot(), ensure_ascii=False).encode('utf-8')
+                content_type = 'application/json; charset=utf-8'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='mci-metrics-http', daemon=True).start()
+    return server
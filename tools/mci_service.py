@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+MCI照会サービス（asyncio の HTTP/1.1 サーバ、TCP または Unix ソケット）
+
+他のプロセスから「USDJPY=x, USDTRY=y, PPP基準年 z のとき m[TRY] はいくつか」を
+calculate_mci_from_rates.py を起動せずに問い合わせるための常駐サーバ。
+PPPストアと年次データの比較年の行は起動時に1回だけ読み込み、メモリに保持する。
+
+エンドポイント:
+  GET  /mci?usdjpy=157&usdtry=42.3[&ppp_year=2024][&compare=2024]
+  POST /mci      {"usdjpy": 157, "usdtry": 42.3, "ppp_year": 2024, "compare": 2024}
+      → {"ppp_year":2024,"compare":2024,"PPP_JPY":93.2,...,"m_TRY":-0.636,"dm_TRY":-0.156,
+         "depth":"深度3（危機レベル）","depth_level":3}
+
+  POST /batch    {"usdjpy": [...], "usdtry": [...], "ppp_year": 2024 または [...], "compare": 2024,
+                  "fields": ["m_TRY", "depth_level"]}
+      → 列ごとの配列 {"n":2,"m_TRY":[...],"depth_level":[...]}
+  POST /batch?ppp_year=2024&compare=2024&fields=m_TRY,depth_level
+       Content-Type: application/octet-stream
+       本文: float64（リトルエンディアン）の (usdjpy, usdtry) を行ごとに並べたもの
+      → 本文: float64 の (行数, 列数) 行優先、列名はヘッダ X-MCI-Columns（カンマ区切り）
+         np.frombuffer(body, '<f8').reshape(-1, len(columns)) で読める
+
+  GET  /health   → {"status":"ok","ppp_years":[...],"compare":2024}
+  GET  /metrics  → mci_metrics のメトリクス（Prometheus テキスト、?format=json で JSON）
+
+  ppp_year を省略するとサーバの --ppp-year、compare を省略するとサーバの --compare を使う。
+  compare=0 で比較（dm_* と深度）を省略する。
+  JSON は区切りの空白なし（separators=(',', ':')）。エラーは 4xx と {"error": "..."}。
+
+計算は calculate_mci_from_rates.mci_columns（mci_engine）と同じで、バッチモードと同じ値を返す。
+HTTP は Keep-Alive とパイプライン化に対応（chunked 転送は非対応）。
+
+使い方:
+  python3 tools/mci_service.py serve --port 8765
+  python3 tools/mci_service.py serve --unix /tmp/mci.sock
+  python3 tools/mci_service.py query --port 8765 --usdjpy 157 --usdtry 42.3
+  python3 tools/mci_service.py bench --unix /tmp/mci.sock --requests 20000 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from calculate_mci_from_rates import BATCH_COLUMNS, DEPTH_LABELS, mci_columns
+from mci_metrics import PROMETHEUS_TYPE, REGISTRY
+from ppp_store import load_ppp_store
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_YEAR = 2024
+COMPARE_FIELDS = ('dm_USD', 'dm_JPY', 'dm_TRY', 'depth_level')
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024 * 1024
+JSON_TYPE = 'application/json; charset=utf-8'
+BINARY_TYPE = 'application/octet-stream'
+ENDPOINTS = ('/mci', '/batch', '/health', '/metrics')
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           411: 'Length Required', 413: 'Payload Too Large', 431: 'Request Header Fields Too Large'}
+
+
+class RequestError(Exception):
+    """クライアントに 4xx で返すエラー"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class MCIService:
+    """
+    リクエストを計算結果に変換する（HTTPとは独立。サーバ・テストから直接呼べる）
+
+    Args:
+        store: PPPストア（省略時は load_ppp_store()）
+        ppp_year: ppp_year を省略したリクエストの基準年
+        compare: compare を省略したリクエストの比較年（0 / None で比較なし）
+    """
+
+    def __init__(self, store=None, ppp_year: int = DEFAULT_YEAR, compare: Optional[int] = DEFAULT_YEAR):
+        self.store = store or load_ppp_store()
+        self.ppp_year = ppp_year
+        self.compare = compare or None
+        # 起動時に既定の基準年・比較年を確認しておく（なければここで ValueError）
+        self.store.lookup('JPY', [ppp_year])
+        self.store.lookup('TRY', [ppp_year])
+        if self.compare:
+            self.store.reference(self.compare)
+        self._requests = {}
+        self._request_seconds = {path: REGISTRY.histogram('mci_request_seconds', 'Request handling time in seconds',
+                                                          path=path) for path in ENDPOINTS + ('other',)}
+
+    def _reference(self, compare) -> Tuple[Optional[int], Optional[Dict]]:
+        compare = self.compare if compare is None else int(compare)
+        if not compare:
+            return None, None
+        try:
+            return compare, self.store.reference(compare)
+        except ValueError as e:
+            raise RequestError(str(e))
+
+    def columns(self, usdjpy, usdtry, ppp_year=None, compare=None) -> Tuple[int, Optional[int], Dict[str, np.ndarray]]:
+        """レート・基準年（スカラーか配列）から列を計算し、(基準年, 比較年, 列) を返す"""
+        s_usdjpy = np.atleast_1d(np.asarray(usdjpy, dtype=np.float64))
+        s_usdtry = np.atleast_1d(np.asarray(usdtry, dtype=np.float64))
+        if s_usdjpy.shape != s_usdtry.shape or s_usdjpy.ndim != 1:
+            raise RequestError('usdjpy and usdtry must have the same length')
+        if not (np.isfinite(s_usdjpy) & (s_usdjpy > 0) & np.isfinite(s_usdtry) & (s_usdtry > 0)).all():
+            raise RequestError('rates must be positive finite numbers')
+        ppp_year = self.ppp_year if ppp_year is None else ppp_year
+        years = np.broadcast_to(np.asarray(ppp_year, dtype=np.int64), s_usdjpy.shape)
+        compare, ref = self._reference(compare)
+        try:
+            cols = mci_columns(s_usdjpy, s_usdtry, years, self.store, ref)
+        except ValueError as e:
+            raise RequestError(str(e))
+        return ppp_year, compare, cols
+
+    def point(self, usdjpy, usdtry, ppp_year=None, compare=None) -> Dict:
+        """1点のMCI（BATCH_COLUMNS、比較年があれば dm_* と深度も）"""
+        ppp_year, compare, cols = self.columns(float(usdjpy), float(usdtry),
+                                               None if ppp_year is None else int(ppp_year), compare)
+        result = {'ppp_year': ppp_year, 'compare': compare}
+        for name in BATCH_COLUMNS + (COMPARE_FIELDS if compare else ()):
+            result[name] = cols[name][0].item()
+        if compare:
+            result['depth'] = DEPTH_LABELS[result['depth_level']]
+        return result
+
+    def batch(self, usdjpy, usdtry, ppp_year=None, compare=None, fields=None) -> Dict[str, np.ndarray]:
+        """配列のMCI（fields で列を絞れる。既定は BATCH_COLUMNS と比較列）"""
+        _, compare, cols = self.columns(usdjpy, usdtry, ppp_year, compare)
+        available = BATCH_COLUMNS + (COMPARE_FIELDS if compare else ())
+        fields = fields or available
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            raise RequestError(f"unknown fields: {', '.join(unknown)}")
+        return {name: cols[name] for name in fields}
+
+    # --- HTTP ---
+
+    def handle(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, str, bytes, Dict]:
+        """HTTPリクエスト1件を (ステータス, Content-Type, 本文, 追加ヘッダ) に変換（件数と処理時間を記録）"""
+        started = time.perf_counter()
+        url = urlsplit(target)
+        response = self._dispatch(method, url, headers, body)
+        path = url.path if url.path in ENDPOINTS else 'other'
+        self._request_seconds[path].observe(time.perf_counter() - started)
+        key = (path, response[0])
+        counter = self._requests.get(key)
+        if counter is None:
+            counter = self._requests[key] = REGISTRY.counter('mci_requests_total', 'Requests by path and status',
+                                                             path=path, status=response[0])
+        counter.inc()
+        return response
+
+    def _dispatch(self, method: str, url, headers: Dict[str, str], body: bytes) -> Tuple[int, str, bytes, Dict]:
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/mci':
+                if method == 'GET':
+                    params = query
+                elif method == 'POST':
+                    params = self._json_body(body)
+                else:
+                    raise RequestError('use GET or POST', 405)
+                try:
+                    return 200, JSON_TYPE, dumps(self.point(params['usdjpy'], params['usdtry'],
+                                                            params.get('ppp_year'), params.get('compare'))), {}
+                except KeyError as e:
+                    raise RequestError(f"missing parameter: {e.args[0]}")
+                except (TypeError, ValueError) as e:
+                    raise RequestError(str(e))
+            if url.path == '/batch':
+                if method != 'POST':
+                    raise RequestError('use POST', 405)
+                if headers.get('content-type', '').startswith(BINARY_TYPE):
+                    return self._binary_batch(query, body)
+                return self._json_batch(self._json_body(body))
+            if url.path == '/health':
+                return 200, JSON_TYPE, dumps({'status': 'ok', 'ppp_years': self.store.years,
+                                              'ppp_year': self.ppp_year, 'compare': self.compare}), {}
+            if url.path == '/metrics':
+                if query.get('format') == 'json':
+                    return 200, JSON_TYPE, dumps(REGISTRY.snapshot()), {}
+                return 200, PROMETHEUS_TYPE, REGISTRY.render_prometheus().encode('utf-8'), {}
+            raise RequestError(f"not found: {url.path}", 404)
+        except RequestError as e:
+            return e.status, JSON_TYPE, dumps({'error': str(e)}), {}
+
+    @staticmethod
+    def _json_body(body: bytes) -> Dict:
+        try:
+            params = json.loads(body)
+        except ValueError as e:
+            raise RequestError(f"invalid JSON: {e}")
+        if not isinstance(params, dict):
+            raise RequestError('JSON body must be an object')
+        return params
+
+    def _json_batch(self, params: Dict):
+        try:
+            cols = self.batch(params['usdjpy'], params['usdtry'], params.get('ppp_year'),
+                              params.get('compare'), params.get('fields'))
+        except KeyError as e:
+            raise RequestError(f"missing parameter: {e.args[0]}")
+        except (TypeError, ValueError) as e:
+            raise RequestError(str(e))
+        result = {'n': len(next(iter(cols.values()))) if cols else 0}
+        result.update((name, values.tolist()) for name, values in cols.items())
+        return 200, JSON_TYPE, dumps(result), {}
+
+    def _binary_batch(self, query: Dict[str, str], body: bytes):
+        if len(body) % 16:
+            raise RequestError('binary body must be float64 (usdjpy, usdtry) pairs')
+        rates = np.frombuffer(body, dtype='<f8').reshape(-1, 2)
+        fields = query['fields'].split(',') if query.get('fields') else None
+        try:
+            ppp_year = int(query['ppp_year']) if 'ppp_year' in query else None
+            cols = self.batch(rates[:, 0], rates[:, 1], ppp_year, query.get('compare'), fields)
+        except ValueError as e:
+            raise RequestError(str(e))
+        out = np.empty((len(rates), len(cols)), dtype='<f8')
+        for i, values in enumerate(cols.values()):
+            out[:, i] = values
+        return 200, BINARY_TYPE, out.tobytes(), {'X-MCI-Columns': ','.join(cols)}
+
+
+class HTTPProtocol(asyncio.Protocol):
+    """MCIService を載せる最小限の HTTP/1.1 実装（Keep-Alive・パイプライン化対応）"""
+
+    def __init__(self, service: MCIService):
+        self.service = service
+        self.buffer = bytearray()
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data: bytes):
+        self.buffer += data
+        while self.transport is not None and not self.transport.is_closing():
+            end = self.buffer.find(b'\r\n\r\n')
+            if end < 0:
+                if len(self.buffer) > MAX_HEADER_BYTES:
+                    self._reply(431, JSON_TYPE, dumps({'error': 'header too large'}), {}, False)
+                return
+            try:
+                method, target, version, headers = self._parse_head(bytes(self.buffer[:end]))
+                length = headers.get('content-length', '0').strip()
+                if not length.isdigit():
+                    raise ValueError(f"invalid Content-Length: {length!r}")
+                length = int(length)
+            except ValueError:
+                self._reply(400, JSON_TYPE, dumps({'error': 'malformed request'}), {}, False)
+                return
+            if 'chunked' in headers.get('transfer-encoding', ''):
+                self._reply(411, JSON_TYPE, dumps({'error': 'chunked body not supported'}), {}, False)
+                return
+            if length > MAX_BODY_BYTES:
+                self._reply(413, JSON_TYPE, dumps({'error': 'body too large'}), {}, False)
+                return
+            start = end + 4
+            if len(self.buffer) < start + length:
+                return
+            body = bytes(self.buffer[start:start + length])
+            del self.buffer[:start + length]
+
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+            status, content_type, payload, extra = self.service.handle(method, target, headers, body)
+            self._reply(status, content_type, payload, extra, keep_alive)
+
+    @staticmethod
+    def _parse_head(head: bytes):
+        lines = head.decode('latin-1').split('\r\n')
+        method, target, version = lines[0].split(' ')
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if not sep:
+                raise ValueError(line)
+            headers[name.strip().lower()] = value.strip()
+        return method, target, version, headers
+
+    def _reply(self, status: int, content_type: str, payload: bytes, extra: Dict, keep_alive: bool):
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(payload)}"]
+        head.extend(f"{name}: {value}" for name, value in extra.items())
+        if not keep_alive:
+            head.append('Connection: close')
+        self.transport.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+        if not keep_alive:
+            self.transport.close()
+
+    def connection_lost(self, exc):
+        self.transport = None
+
+
+async def serve(service: MCIService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                unix: Optional[str] = None, ready=None):
+    """サーバを起動して止まるまで待つ（ready に関数を渡すと待ち受け開始後に呼ぶ）"""
+    loop = asyncio.get_running_loop()
+    if unix:
+        if os.path.exists(unix):
+            os.unlink(unix)
+        server = await loop.create_unix_server(lambda: HTTPProtocol(service), unix)
+        address = unix
+    else:
+        server = await loop.create_server(lambda: HTTPProtocol(service), host, port)
+        address = '{}:{}'.format(*server.sockets[0].getsockname()[:2])
+    print(f"MCI service listening on {address}", file=sys.stderr)
+    if ready is not None:
+        ready(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if unix and os.path.exists(unix):
+            os.unlink(unix)
+
+
+# --- クライアント（ローカルでの確認・ベンチマーク用） ---
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """Unix ソケット上の http.client.HTTPConnection"""
+
+    def __init__(self, path: str, timeout: float = 10.0):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class MCIClient:
+    """
+    MCI照会サービスのクライアント（1本の Keep-Alive 接続を使い回す）
+
+    使い方:
+        client = MCIClient(unix='/tmp/mci.sock')
+        client.point(157, 42.3)['m_TRY']
+        client.batch([157, 150], [42.3, 40.0], fields=['m_TRY', 'depth_level'])
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix: Optional[str] = None,
+                 timeout: float = 10.0):
+        if unix:
+            self.conn = UnixHTTPConnection(unix, timeout)
+        else:
+            self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method: str, path: str, body: bytes = None, content_type: str = 'application/json'):
+        headers = {'Content-Type': content_type} if body is not None else {}
+        self.conn.request(method, path, body, headers)
+        response = self.conn.getresponse()
+        payload = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{response.status}: {json.loads(payload).get('error')}")
+        return response, payload
+
+    def point(self, usdjpy: float, usdtry: float, ppp_year: int = None, compare: int = None) -> Dict:
+        params = {'usdjpy': usdjpy, 'usdtry': usdtry, 'ppp_year': ppp_year, 'compare': compare}
+        body = dumps({k: v for k, v in params.items() if v is not None})
+        return json.loads(self.request('POST', '/mci', body)[1])
+
+    def batch(self, usdjpy, usdtry, ppp_year=None, compare=None, fields=None) -> Dict[str, list]:
+        params = {'usdjpy': list(usdjpy), 'usdtry': list(usdtry), 'ppp_year': ppp_year,
+                  'compare': compare, 'fields': fields}
+        body = dumps({k: v for k, v in params.items() if v is not None})
+        return json.loads(self.request('POST', '/batch', body)[1])
+
+    def batch_binary(self, usdjpy, usdtry, ppp_year: int = None, compare: int = None,
+                     fields=None) -> Dict[str, np.ndarray]:
+        rates = np.column_stack([np.asarray(usdjpy, dtype='<f8'), np.asarray(usdtry, dtype='<f8')])
+        query = {'ppp_year': ppp_year, 'compare': compare, 'fields': ','.join(fields) if fields else None}
+        query = '&'.join(f"{k}={v}" for k, v in query.items() if v is not None)
+        response, payload = self.request('POST', '/batch' + ('?' + query if query else ''),
+                                         rates.tobytes(), BINARY_TYPE)
+        columns = response.getheader('X-MCI-Columns').split(',')
+        values = np.frombuffer(payload, dtype='<f8').reshape(-1, len(columns))
+        return {name: values[:, i] for i, name in enumerate(columns)}
+
+    def close(self):
+        self.conn.close()
+
+
+async def _bench_worker(host, port, unix, requests: int, latencies: list):
+    if unix:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    request = b'GET /mci?usdjpy=157&usdtry=42.3 HTTP/1.1\r\nHost: localhost\r\n\r\n'
+    for _ in range(requests):
+        started = time.perf_counter()
+        writer.write(request)
+        head = await reader.readuntil(b'\r\n\r\n')
+        length = int(head.split(b'Content-Length: ', 1)[1].split(b'\r\n', 1)[0])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - started)
+    writer.close()
+
+
+async def bench(host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None, requests: int = 10000,
+                concurrency: int = 8) -> Dict[str, float]:
+    """Keep-Alive 接続 concurrency 本から GET /mci を合計 requests 回送り、スループットと遅延を返す"""
+    latencies = []
+    per_worker = max(requests // concurrency, 1)
+    started = time.perf_counter()
+    await asyncio.gather(*(_bench_worker(host, port, unix, per_worker, latencies) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'requests_per_s': len(latencies) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1e3,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MCI query service (asyncio HTTP over TCP or Unix socket)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_address(p):
+        p.add_argument('--host', default=DEFAULT_HOST, help=f'TCP host (default: {DEFAULT_HOST})')
+        p.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'TCP port (default: {DEFAULT_PORT})')
+        p.add_argument('--unix', help='Unix socket path (instead of TCP)')
+
+    p = sub.add_parser('serve', help='Run the service')
+    add_address(p)
+    p.add_argument('--ppp-year', type=int, default=DEFAULT_YEAR, help=f'Default PPP year (default: {DEFAULT_YEAR})')
+    p.add_argument('--compare', type=int, default=DEFAULT_YEAR,
+                   help=f'Default comparison year for Δm and depth, 0 to disable (default: {DEFAULT_YEAR})')
+
+    p = sub.add_parser('query', help='Query a running service')
+    add_address(p)
+    p.add_argument('--usdjpy', type=float, required=True, help='USD/JPY exchange rate')
+    p.add_argument('--usdtry', type=float, required=True, help='USD/TRY exchange rate')
+    p.add_argument('--ppp-year', type=int, help='PPP reference year (default: server setting)')
+    p.add_argument('--compare', type=int, help='Comparison year (default: server setting)')
+
+    p = sub.add_parser('bench', help='Measure throughput and latency of a running service')
+    add_address(p)
+    p.add_argument('--requests', type=int, default=10000, help='Total requests (default: 10000)')
+    p.add_argument('--concurrency', type=int, default=8, help='Keep-alive connections (default: 8)')
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        try:
+            service = MCIService(ppp_year=args.ppp_year, compare=args.compare)
+        except ValueError as e:
+            parser.error(str(e))
+        # SIGTERM でも finally（Unix ソケットの削除）を通して終わる
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            asyncio.run(serve(service, args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'query':
+        client = MCIClient(args.host, args.port, args.unix)
+        print(json.dumps(client.point(args.usdjpy, args.usdtry, args.ppp_year, args.compare),
+                         ensure_ascii=False, indent=2))
+        client.close()
+    elif args.command == 'bench':
+        result = asyncio.run(bench(args.host, args.port, args.unix, args.requests, args.concurrency))
+        print(f"{result['requests']} requests in {result['seconds']:.2f}s: "
+              f"{result['requests_per_s']:,.0f} req/s, p50 {result['p50_ms']:.3f} ms, p99 {result['p99_ms']:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
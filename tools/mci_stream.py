@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+ティック単位のストリーミングMCI計算
+
+USDJPY・USDTRY など各レッグのクオートが非同期に届くたびに、
+そのレッグの乖離率だけを更新して最新のMCI座標を保持する。
+
+  d_j    = ln(S_j) - ln(PPP_j)        （ln(PPP_j) は事前計算してキャッシュ）
+  m_base = (Σ_j d_j) / K
+  m_j    = m_base - d_j
+
+Σ_j d_j を差分更新するため、1ティックあたりの計算量は O(1)。
+
+使い方:
+  from mci_stream import StreamingMCI
+  stream = StreamingMCI({'JPY': 93.52, 'TRY': 16.51})
+  stream.update('USDJPY', 157.0)
+  stream.update('USDTRY', 42.3)
+  stream.m('TRY'), stream.cross_rate('TRY', 'JPY')
+
+  # クオートフィードをそのまま流す
+  for timestamp, m in stream.run(feed):   # feed: (timestamp, 'USDJPY', rate) の列
+      ...
+
+  # run() のティック数・レッグごとの鮮度を mci_metrics に記録する
+  from mci_metrics import REGISTRY
+  stream = StreamingMCI({'JPY': 93.52, 'TRY': 16.51}, metrics=REGISTRY)
+"""
+
+import math
+from typing import Dict, Iterable, Iterator, Tuple
+
+# 差分更新の丸め誤差を打ち消すため、この回数ごとに Σd を再計算する
+RESYNC_INTERVAL = 1 << 16
+
+
+class StreamingMCI:
+    """
+    クオート更新ごとにMCI座標を O(1) で更新する計算器
+
+    Args:
+        ppp: 基軸通貨以外の各通貨のPPP（例: {'JPY': 93.52, 'TRY': 16.51}）
+        base: 基軸通貨（レッグ名は base + 通貨コード、例: 'USDJPY'）
+        metrics: mci_metrics.MetricsRegistry を渡すと run() が mci_ticks_total{leg} と
+                 mci_quote_age_seconds{leg} を更新する（update() 単体では記録しない）
+    """
+
+    def __init__(self, ppp: Dict[str, float], base: str = 'USD', metrics=None):
+        if len(ppp) < 2:
+            raise ValueError("Basket needs at least 3 currencies")
+
+        self.base = base
+        self.currencies = (base,) + tuple(ppp)
+        self.k = len(self.currencies)
+
+        # レッグ名 -> スロット番号
+        self.legs = {f'{base}{c}': i for i, c in enumerate(ppp)}
+        self._slot = {c: i for i, c in enumerate(ppp)}
+
+        self._log_ppp = [math.log(v) for v in ppp.values()]
+        self._rate = [math.nan] * len(ppp)
+        self._d = [0.0] * len(ppp)
+        self._sum_d = 0.0
+        self._missing = len(ppp)
+        self._updates = 0
+        self.metrics = metrics
+
+    @property
+    def ready(self) -> bool:
+        """全レッグのクオートが揃っているか"""
+        return self._missing == 0
+
+    def set_ppp(self, currency: str, value: float):
+        """PPPを差し替え（改定時）。既存クオートの d も更新する"""
+        i = self._slot[currency]
+        self._log_ppp[i] = math.log(value)
+        if not math.isnan(self._rate[i]):
+            self._set_d(i, math.log(self._rate[i]) - self._log_ppp[i])
+
+    def update(self, leg: str, rate: float):
+        """レッグ（例: 'USDJPY'）のクオートを更新"""
+        i = self.legs[leg]
+        if math.isnan(self._rate[i]):
+            self._missing -= 1
+        self._rate[i] = rate
+        self._set_d(i, math.log(rate) - self._log_ppp[i])
+
+    def _set_d(self, i: int, d: float):
+        self._sum_d += d - self._d[i]
+        self._d[i] = d
+
+        self._updates += 1
+        if self._updates >= RESYNC_INTERVAL:
+            self._sum_d = math.fsum(self._d)
+            self._updates = 0
+
+    def d(self, currency: str) -> float:
+        """基軸通貨に対するPPP乖離率 d_{base,currency}"""
+        return self._d[self._slot[currency]]
+
+    def m(self, currency: str) -> float:
+        """MCI座標 m[currency]"""
+        m_base = self._sum_d / self.k
+        if currency == self.base:
+            return m_base
+        return m_base - self._d[self._slot[currency]]
+
+    def coordinates(self) -> Tuple[float, ...]:
+        """全通貨の m 座標（currencies の順）"""
+        m_base = self._sum_d / self.k
+        return (m_base,) + tuple(m_base - d for d in self._d)
+
+    def cross_rate(self, i: str, j: str) -> float:
+        """クロスレート S_ij（1単位の i あたりの j、例: cross_rate('TRY', 'JPY') = TRY/JPY）"""
+        s_i = 1.0 if i == self.base else self._rate[self._slot[i]]
+        s_j = 1.0 if j == self.base else self._rate[self._slot[j]]
+        return s_j / s_i
+
+    def cross_deviation(self, i: str, j: str) -> float:
+        """通貨ペアのPPP乖離率 d_ij = m_i - m_j"""
+        return self.m(i) - self.m(j)
+
+    def snapshot(self) -> Dict[str, float]:
+        """現在の d・m・基軸通貨建てレートを dict で返す（表示・記録用）"""
+        result = {}
+        for c, i in self._slot.items():
+            result[f'S_{self.base}{c}'] = self._rate[i]
+            result[f'd_{self.base}{c}'] = self._d[i]
+        for c, m in zip(self.currencies, self.coordinates()):
+            result[f'm_{c}'] = m
+        return result
+
+    def run(self, quotes: Iterable[Tuple[object, str, float]]) -> Iterator[Tuple[object, Tuple[float, ...]]]:
+        """
+        クオート列 (timestamp, leg, rate) を流し、更新後の (timestamp, m座標) を順に返す
+
+        全レッグが揃うまでのクオートは状態の更新のみ行い、何も返さない。
+        """
+        update = self.update
+        coordinates = self.coordinates
+        if self.metrics is None:
+            for timestamp, leg, rate in quotes:
+                update(leg, rate)
+                if self._missing == 0:
+                    yield timestamp, coordinates()
+            return
+
+        ticks = {leg: self.metrics.counter('mci_ticks_total', 'Quotes processed by StreamingMCI', leg=leg)
+                 for leg in self.legs}
+        touch = self.metrics.quote_age('mci_quote_age_seconds', 'Seconds since the last quote of each leg').touch
+        for timestamp, leg, rate in quotes:
+            update(leg, rate)
+            ticks[leg].inc()
+            touch(leg)
+            if self._missing == 0:
+                yield timestamp, coordinates()
@@ -13,6 +13,8 @@ MCIを使った年間変動率推測の客観的評価
 import csv
 import math
 
+from rolling_stats import MultiWindow, RunningStats
+
 # データ読み込み
 data = []
 with open('dataset/annual_mci_2005_2024.csv', 'r') as f:
@@ -44,44 +46,42 @@ print()
 print("【検証1】予測力: 過去N年の統計で次の1年を予測できるか？")
 print("-" * 80)
 
-# ローリングウィンドウで予測精度を検証
+# ローリングウィンドウで予測精度を検証（全ての窓を1回の走査で逐次更新）
 window_sizes = [3, 5, 10]
-predictions = {}
+predictions = {window: [] for window in window_sizes}
+rolling_D = MultiWindow(window_sizes, quantiles=False)
 
-for window in window_sizes:
-    predictions[window] = []
-    for i in range(window + 1, len(data)):
-        # 過去window年のm[TRY]変動から統計を取る
-        recent_D = [data[j]['D_mTRY'] for j in range(i-window, i) if 'D_mTRY' in data[j]]
+for i in range(1, len(data)):
+    # 実際の値
+    actual_D = data[i]['D_mTRY']
 
-        if not recent_D:
+    for window in window_sizes:
+        # 過去window年のm[TRY]変動の統計（窓が埋まってから評価）
+        stats = rolling_D[window]
+        if not stats.full:
             continue
 
-        mean_D = sum(recent_D) / len(recent_D)
-        # 標準偏差
-        variance = sum((x - mean_D)**2 for x in recent_D) / len(recent_D)
-        std_D = math.sqrt(variance)
+        mean_D = stats.mean
+        std_D = stats.std
 
-        # 実際の値
-        actual_D = data[i]['D_mTRY'] if 'D_mTRY' in data[i] else None
+        # 予測区間: mean ± 2*std
+        lower_bound = mean_D - 2 * std_D
+        upper_bound = mean_D + 2 * std_D
 
-        if actual_D is not None:
-            # 予測区間: mean ± 2*std
-            lower_bound = mean_D - 2 * std_D
-            upper_bound = mean_D + 2 * std_D
+        # 的中判定
+        hit = lower_bound <= actual_D <= upper_bound
 
-            # 的中判定
-            hit = lower_bound <= actual_D <= upper_bound
+        predictions[window].append({
+            'year': data[i]['year'],
+            'predicted_mean': mean_D,
+            'predicted_std': std_D,
+            'actual': actual_D,
+            'hit': hit,
+            'lower': lower_bound,
+            'upper': upper_bound,
+        })
 
-            predictions[window].append({
-                'year': data[i]['year'],
-                'predicted_mean': mean_D,
-                'predicted_std': std_D,
-                'actual': actual_D,
-                'hit': hit,
-                'lower': lower_bound,
-                'upper': upper_bound,
-            })
+    rolling_D.push(actual_D)
 
 for window in window_sizes:
     preds = predictions[window]
@@ -107,10 +107,9 @@ print("【検証2】代替手法との比較")
 print("-" * 80)
 
 # 手法A: 単純な価格変動率の標準偏差
-price_changes = [d['pct_TRYJPY'] for d in data[1:] if 'pct_TRYJPY' in d]
-price_mean = sum(price_changes) / len(price_changes)
-price_variance = sum((x - price_mean)**2 for x in price_changes) / len(price_changes)
-price_std = math.sqrt(price_variance)
+price_stats = RunningStats(d['pct_TRYJPY'] for d in data[1:] if 'pct_TRYJPY' in d)
+price_mean = price_stats.mean
+price_std = price_stats.std
 
 print("手法A: 単純な価格変動率の統計")
 print(f"  TRY/JPY年間変動率: 平均={price_mean:.2f}%, 標準偏差={price_std:.2f}%")
@@ -118,10 +117,9 @@ print(f"  予測区間（±2σ）: {price_mean - 2*price_std:.2f}% ~ {price_mean
 print()
 
 # 手法B: MCIのm[TRY]変動統計
-D_TRY_values = [d['D_mTRY'] for d in data[1:] if 'D_mTRY' in d]
-D_TRY_mean = sum(D_TRY_values) / len(D_TRY_values)
-D_TRY_variance = sum((x - D_TRY_mean)**2 for x in D_TRY_values) / len(D_TRY_values)
-D_TRY_std = math.sqrt(D_TRY_variance)
+D_TRY_stats = RunningStats(d['D_mTRY'] for d in data[1:] if 'D_mTRY' in d)
+D_TRY_mean = D_TRY_stats.mean
+D_TRY_std = D_TRY_stats.std
 
 print("手法B: MCI m[TRY]変動の統計")
 print(f"  m[TRY]年間変動: 平均={D_TRY_mean:.6f}, 標準偏差={D_TRY_std:.6f}")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+PPP補間エンジン（年次アンカー → 日次・週次・月次のPPP曲線）
+
+年次PPPを「その年の12月末の値」とみなし、前年12月末から当年12月末までを補間する。
+  PPP(Y, m) = PPP(Y-1) + (PPP(Y) - PPP(Y-1)) * m / 12        （月次・線形）
+日次・週次は m / 12 の代わりに「年初からの日数 / その年の日数」を使う。
+
+補間方式（scheme）:
+  linear    : 線形補間（従来の dataset/recalculate_monthly_interpolated_ppp.py と同じ）
+  geometric : 対数線形補間（一定率で増える。TRYのような高インフレ通貨向け）
+  pchip     : 単調3次エルミート補間（Fritsch-Carlson、アンカー間でオーバーシュートしない）
+
+アンカー範囲外の扱い（extrapolation）:
+  hold   : 端のアンカー値で固定（最初の年は最初のアンカー値、最後の年以降は最後の値）
+  linear : 端の区間の傾きで延長（geometric では対数空間で延長＝同じ伸び率）
+  error  : ValueError
+
+曲線は (アンカー, 方式, 頻度, 期間, 範囲外の扱い) ごとにキャッシュされる。
+
+使い方:
+  from ppp_interpolation import ppp_curve, store_anchors
+  periods, values = ppp_curve(store_anchors(store, 'TRY'), '2022-01', '2025-12', freq='M', scheme='geometric')
+"""
+
+from functools import lru_cache
+from typing import Sequence, Tuple
+
+import numpy as np
+
+SCHEMES = ('linear', 'geometric', 'pchip')
+FREQUENCIES = ('D', 'W', 'M')
+EXTRAPOLATIONS = ('hold', 'linear', 'error')
+
+Anchors = Tuple[Tuple[int, float], ...]
+
+
+def store_anchors(store, currency: str, first_year: int = None) -> Anchors:
+    """PPPストアから補間用のアンカー ((年, PPP), ...) を作る"""
+    return tuple((year, store.get(currency, year)) for year in store.years
+                 if first_year is None or year >= first_year)
+
+
+def make_periods(start: str, end: str, freq: str = 'M') -> np.ndarray:
+    """
+    start〜end（両端含む）の期間ラベルを生成
+
+    M: datetime64[M]（各月）、D: datetime64[D]（各日）、W: datetime64[D]（各週の日曜日）
+    """
+    if freq == 'M':
+        return np.arange(np.datetime64(start[:7], 'M'), np.datetime64(end[:7], 'M') + 1)
+    if freq in ('D', 'W'):
+        first = np.datetime64(start, 'D') if len(start) > 7 else np.datetime64(start, 'M').astype('M8[D]')
+        last = np.datetime64(end, 'D') if len(end) > 7 else (np.datetime64(end, 'M') + 1).astype('M8[D]') - 1
+        if freq == 'D':
+            return np.arange(first, last + 1)
+        # 1970-01-04 が日曜日
+        first = first + (3 - first.astype(np.int64)) % 7
+        return np.arange(first, last + 1, 7)
+    raise ValueError(f"Unknown frequency {freq}, expected one of {FREQUENCIES}")
+
+
+def period_positions(periods: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    期間ラベルを補間区間上の位置 (year, num, den) に変換
+
+    位置 t = (year - 1) + num / den。year 年のアンカーは t = year（12月末）にある。
+    月次: num = 月, den = 12。日次: num = 年初からの通算日, den = その年の日数。
+    """
+    periods = np.asarray(periods)
+    if periods.dtype == np.dtype('M8[M]'):
+        months = periods.astype(np.int64)
+        return months // 12 + 1970, months % 12 + 1, np.full(months.shape, 12)
+
+    days = periods.astype('M8[D]')
+    year_start = days.astype('M8[Y]')
+    next_start = (year_start + 1).astype('M8[D]')
+    year_start = year_start.astype('M8[D]')
+    num = (days - year_start).astype(np.int64) + 1
+    den = (next_start - year_start).astype(np.int64)
+    return year_start.astype('M8[Y]').astype(np.int64) + 1970, num, den
+
+
+def _pchip_slopes(values: np.ndarray) -> np.ndarray:
+    """等間隔アンカー上の単調3次エルミート補間の傾き（Fritsch-Carlson）"""
+    delta = np.diff(values)
+    slopes = np.zeros_like(values)
+    if len(values) < 2:
+        return slopes
+    if len(values) == 2:
+        slopes[:] = delta[0]
+        return slopes
+
+    # 内部点: 隣接区間の傾きの調和平均（符号が異なれば 0）
+    left, right = delta[:-1], delta[1:]
+    same_sign = left * right > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        harmonic = 2 * left * right / (left + right)
+    slopes[1:-1] = np.where(same_sign, harmonic, 0.0)
+
+    # 端点: 片側3点公式を単調性が保たれるように制限
+    for end, d0, d1 in ((0, delta[0], delta[1]), (-1, delta[-1], delta[-2])):
+        s = (3 * d0 - d1) / 2
+        if s * d0 <= 0:
+            s = 0.0
+        elif d0 * d1 <= 0 and abs(s) > abs(3 * d0):
+            s = 3 * d0
+        slopes[end] = s
+    return slopes
+
+
+def interpolate_positions(anchors: Anchors, year: np.ndarray, num: np.ndarray, den: np.ndarray,
+                          scheme: str = 'linear', extrapolation: str = 'hold') -> np.ndarray:
+    """
+    位置 (year, num, den) におけるPPPをまとめて補間
+
+    Args:
+        anchors: ((年, PPP), ...)（年は連続していること）
+        scheme: SCHEMES のいずれか
+        extrapolation: EXTRAPOLATIONS のいずれか
+    """
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown scheme {scheme}, expected one of {SCHEMES}")
+    if extrapolation not in EXTRAPOLATIONS:
+        raise ValueError(f"Unknown extrapolation {extrapolation}, expected one of {EXTRAPOLATIONS}")
+
+    anchors = sorted(anchors)
+    years = [y for y, _ in anchors]
+    if not years:
+        raise ValueError("No PPP anchors")
+    if years != list(range(years[0], years[0] + len(years))):
+        raise ValueError(f"PPP anchors must cover consecutive years, got {years}")
+
+    first, last = years[0], years[-1]
+    values = np.array([v for _, v in anchors], dtype=np.float64)
+    space = np.log(values) if scheme == 'geometric' else values
+
+    year = np.asarray(year, dtype=np.int64)
+    num = np.asarray(num, dtype=np.int64)
+    den = np.asarray(den, dtype=np.int64)
+
+    before = year <= first
+    after = year > last
+    inside = ~(before | after)
+    if extrapolation == 'error' and (before | after).any():
+        raise ValueError(f"Period outside PPP anchors {first}-{last}")
+
+    result = np.empty(year.shape)
+
+    # アンカー区間内: year-1 年末 → year 年末
+    i = year[inside] - first
+    p0 = space[i - 1]
+    p1 = space[i]
+    if scheme == 'pchip':
+        slopes = _pchip_slopes(space)
+        s = num[inside] / den[inside]
+        h00 = (1 + 2 * s) * (1 - s) ** 2
+        h10 = s * (1 - s) ** 2
+        h01 = s ** 2 * (3 - 2 * s)
+        h11 = s ** 2 * (s - 1)
+        result[inside] = h00 * p0 + h10 * slopes[i - 1] + h01 * p1 + h11 * slopes[i]
+    else:
+        result[inside] = p0 + (p1 - p0) * num[inside] / den[inside]
+
+    # アンカー範囲外
+    if extrapolation == 'hold' or len(years) == 1:
+        result[before] = space[0]
+        result[after] = space[-1]
+    else:
+        dt = (year[before] - 1 - first) + num[before] / den[before]
+        result[before] = space[0] + (space[1] - space[0]) * dt
+        dt = (year[after] - 1 - last) + num[after] / den[after]
+        result[after] = space[-1] + (space[-1] - space[-2]) * dt
+
+    if scheme == 'geometric':
+        result = np.exp(result)
+    return result
+
+
+def interpolate_periods(anchors: Anchors, periods: np.ndarray,
+                        scheme: str = 'linear', extrapolation: str = 'hold') -> np.ndarray:
+    """任意の期間ラベル（datetime64[M] または datetime64[D]）でPPPを補間"""
+    return interpolate_positions(anchors, *period_positions(periods), scheme=scheme, extrapolation=extrapolation)
+
+
+@lru_cache(maxsize=256)
+def ppp_curve(anchors: Anchors, start: str, end: str, freq: str = 'M',
+              scheme: str = 'linear', extrapolation: str = 'hold') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    start〜end のPPP曲線を一括生成（キャッシュ付き）
+
+    Returns:
+        (periods, values)。キャッシュを共有するため、どちらも読み取り専用配列
+    """
+    periods = make_periods(start, end, freq)
+    values = interpolate_periods(tuple(anchors), periods, scheme, extrapolation)
+    periods.flags.writeable = False
+    values.flags.writeable = False
+    return periods, values
+
+
+def ppp_curves(store, currencies: Sequence[str], start: str, end: str, freq: str = 'M',
+               scheme: str = 'linear', extrapolation: str = 'hold', first_year: int = None):
+    """複数通貨のPPP曲線を PPPストアのアンカーから生成（{通貨: values} と periods を返す）"""
+    curves = {}
+    periods = None
+    for currency in currencies:
+        periods, curves[currency] = ppp_curve(store_anchors(store, currency, first_year),
+                                              start, end, freq, scheme, extrapolation)
+    return periods, curves
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+PPPストア（通貨・期間でインデックスされたPPP値）
+
+annual_mci_2005_2024.csv と ppp_vintages.csv を一度だけ読み込み、通貨ごとに年インデックスの配列として保持する。
+ln(PPP) も事前計算しておくため、年・月・日のどの粒度の問い合わせも O(1) で答えられる。
+
+各PPP値は公表時点（ヴィンテージ）付きで保持し、as_of(日付) でその時点に公表済みだった
+値だけのストアを二分探索で取り出せる（バックテストの先読み防止用）。
+  - 年次CSVの確定値: 翌年10月のIMF WEOで公表されたものとみなす
+  - ppp_vintages.csv: 推定値・改定値を公表月付きで記録（同じ年は新しいヴィンテージが優先）
+
+使い方:
+  from ppp_store import load_ppp_store
+  store = load_ppp_store()
+  store.get('TRY', 2024)            # -> 12.55
+  store.get('TRY', '2025-03')       # 月次・日次も年の値を返す（年内固定）
+  store.log('JPY', '2025-03-14')    # ln(PPP)
+  store.lookup('TRY', years)        # 配列で一括取得
+  store.reference(2024)['m_TRY']    # 年次MCIの参照値
+  store.as_of('2025-03').get('TRY', 2025)     # 2025年3月時点で公表済みの値 -> 16.63
+  store.as_of('2023-06').known('TRY', 2023)   # 未公表なら直近の公表済み年の値
+"""
+
+import csv
+import math
+import os
+from bisect import bisect_right
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dataset')
+ANNUAL_CSV = os.path.join(DATASET_DIR, 'annual_mci_2005_2024.csv')
+VINTAGES_CSV = os.path.join(DATASET_DIR, 'ppp_vintages.csv')
+
+# 年次CSVの確定値が公表される月（翌年のIMF WEO 10月号）
+ANNUAL_VINTAGE_MONTH = 10
+
+Period = Union[int, str, date]
+
+
+def period_year(period: Period) -> int:
+    """年（int）・'YYYY'・'YYYY-MM'・'YYYY-MM-DD'・date から年を取り出す"""
+    if isinstance(period, int):
+        return period
+    if isinstance(period, date):
+        return period.year
+    return int(period[:4])
+
+
+def period_ordinal(period: Period) -> int:
+    """年・'YYYY-MM'・'YYYY-MM-DD'・date を日付の序数に変換（省略された月日は1とみなす）"""
+    if isinstance(period, date):
+        return period.toordinal()
+    if isinstance(period, int):
+        return date(period, 1, 1).toordinal()
+    parts = [int(p) for p in period.split('-')]
+    parts += [1] * (3 - len(parts))
+    return date(*parts).toordinal()
+
+
+class PPPStore:
+    """
+    通貨・年でインデックスされたPPP値と ln(PPP) の保持
+
+    Args:
+        annual: {年: {通貨: PPP}}（最新ヴィンテージの値）
+        reference: {年: 年次CSVの1行（float化済み）}。年次CSVと同じく翌年 ANNUAL_VINTAGE_MONTH 月の公表として扱う
+        vintages: [(公表日, {年: {通貨: PPP}}), ...]（as_of 用、公表日順でなくてよい）
+    """
+
+    def __init__(self, annual: Dict[int, Dict[str, float]], reference: Dict[int, Dict[str, float]] = None,
+                 vintages: List[Tuple[Period, Dict[int, Dict[str, float]]]] = None):
+        if not annual:
+            raise ValueError("No PPP data")
+
+        self.first_year = min(annual)
+        self.last_year = max(annual)
+        self.currencies = tuple(sorted({c for values in annual.values() for c in values}))
+        self._reference = reference or {}
+
+        # 年 - first_year を添字とする配列（欠損は NaN）
+        n = self.last_year - self.first_year + 1
+        self._values = {}
+        self._logs = {}
+        for currency in self.currencies:
+            values = np.full(n, np.nan)
+            for year, ppp in annual.items():
+                if currency in ppp:
+                    values[year - self.first_year] = ppp[currency]
+            self._values[currency] = values
+            self._logs[currency] = np.log(values)
+
+        # スカラー問い合わせ用（numpy スカラーを介さない）
+        self._value_list = {c: v.tolist() for c, v in self._values.items()}
+        self._log_list = {c: v.tolist() for c, v in self._logs.items()}
+
+        # known() 用: 各年について値のある直近の年の添字（前方補完）
+        self._known_index = {}
+        for currency, values in self._value_list.items():
+            last = -1
+            index = []
+            for i, v in enumerate(values):
+                if not math.isnan(v):
+                    last = i
+                index.append(last)
+            self._known_index[currency] = index
+
+        # as_of 用: 公表日でソートしたヴィンテージと、その時点までの累積スナップショット
+        vintages = sorted(((period_ordinal(when), values) for when, values in (vintages or [])),
+                          key=lambda v: v[0])
+        self._vintage_keys = [key for key, _ in vintages]
+        self._vintage_values = [values for _, values in vintages]
+        self._snapshots = [None] * len(vintages)
+
+    @classmethod
+    def from_csv(cls, path: str = ANNUAL_CSV, vintages_path: str = VINTAGES_CSV):
+        """年次CSV（PPP_<通貨> 列）とヴィンテージCSVからストアを作る"""
+        reference = {}
+        vintages = {}
+        with open(path, 'r') as f:
+            reader = csv.DictReader(f)
+            ppp_columns = [c for c in reader.fieldnames if c.startswith('PPP_') and len(c) == 7]
+            for row in reader:
+                year = int(row['year'])
+                reference[year] = {k: float(v) for k, v in row.items() if k != 'year'}
+                published = period_ordinal(f"{year + 1}-{ANNUAL_VINTAGE_MONTH:02d}")
+                vintages.setdefault(published, {})[year] = {c[4:]: float(row[c]) for c in ppp_columns}
+
+        if vintages_path and os.path.exists(vintages_path):
+            with open(vintages_path, 'r') as f:
+                for row in csv.DictReader(f):
+                    published = period_ordinal(row['vintage'])
+                    year_values = vintages.setdefault(published, {}).setdefault(int(row['year']), {})
+                    year_values[row['currency']] = float(row['PPP'])
+
+        # 現行値は全ヴィンテージを公表順に重ねたもの
+        annual = {}
+        for published in sorted(vintages):
+            for year, values in vintages[published].items():
+                annual.setdefault(year, {}).update(values)
+
+        return cls(annual, reference, [(date.fromordinal(key), values) for key, values in vintages.items()])
+
+    def __contains__(self, period: Period) -> bool:
+        year = period_year(period)
+        if not self.first_year <= year <= self.last_year:
+            return False
+        return all(not math.isnan(self._value_list[c][year - self.first_year]) for c in self.currencies)
+
+    @property
+    def years(self) -> list:
+        """PPPが揃っている年の一覧"""
+        return [y for y in range(self.first_year, self.last_year + 1) if y in self]
+
+    def _index(self, currency: str, period: Period) -> int:
+        year = period_year(period)
+        i = year - self.first_year
+        if currency not in self._value_list:
+            raise ValueError(f"Currency {currency} not found in PPP store")
+        if not 0 <= i < len(self._value_list[currency]) or math.isnan(self._value_list[currency][i]):
+            raise ValueError(f"Year {year} not found in dataset")
+        return i
+
+    def get(self, currency: str, period: Period) -> float:
+        """指定通貨・期間のPPP"""
+        return self._value_list[currency][self._index(currency, period)]
+
+    def log(self, currency: str, period: Period) -> float:
+        """指定通貨・期間の ln(PPP)"""
+        return self._log_list[currency][self._index(currency, period)]
+
+    def known(self, currency: str, period: Period) -> float:
+        """指定期間のPPP。その年の値がなければ、それ以前で値のある直近の年の値を返す"""
+        if currency not in self._known_index:
+            raise ValueError(f"Currency {currency} not found in PPP store")
+        year = period_year(period)
+        index = self._known_index[currency]
+        i = index[min(year - self.first_year, len(index) - 1)] if year >= self.first_year else -1
+        if i < 0:
+            raise ValueError(f"No PPP for {currency} known at or before {year}")
+        return self._value_list[currency][i]
+
+    def annual(self, period: Period) -> Dict[str, float]:
+        """指定期間の全通貨のPPP（例: {'JPY': 93.2, 'TRY': 12.55}）"""
+        return {c: self.get(c, period) for c in self.currencies}
+
+    def _indices(self, currency: str, years: Iterable[int]) -> np.ndarray:
+        idx = np.asarray(years, dtype=np.int64) - self.first_year
+        values = self._values[currency]
+        if idx.size and (idx.min() < 0 or idx.max() >= len(values) or np.isnan(values[idx]).any()):
+            raise ValueError(f"PPP for {currency} not available for all requested years")
+        return idx
+
+    def lookup(self, currency: str, years: Iterable[int]) -> np.ndarray:
+        """年の配列に対するPPPを一括取得（範囲外・欠損は ValueError）"""
+        return self._values[currency][self._indices(currency, years)]
+
+    def log_lookup(self, currency: str, years: Iterable[int]) -> np.ndarray:
+        """年の配列に対する ln(PPP) を一括取得"""
+        return self._logs[currency][self._indices(currency, years)]
+
+    def reference(self, year: int) -> Dict[str, float]:
+        """年次CSVの指定年の行（S_*, PPP_*, d_*, m_* など）"""
+        if year not in self._reference:
+            raise ValueError(f"Year {year} not found in dataset")
+        return self._reference[year]
+
+    @property
+    def vintages(self) -> List[date]:
+        """ヴィンテージの公表日（昇順）"""
+        return [date.fromordinal(key) for key in self._vintage_keys]
+
+    def as_of(self, when: Period) -> 'PPPStore':
+        """
+        指定日時点で公表済みだったPPPだけからなるストアを返す
+
+        公表日の二分探索で O(log V)。スナップショットは初回参照時に作ってキャッシュする。
+        reference() も指定日時点で公表済みだった年の行だけを返す（先読みしない）。
+        """
+        i = bisect_right(self._vintage_keys, period_ordinal(when)) - 1
+        if i < 0:
+            raise ValueError(f"No PPP vintage published by {when}")
+        if self._snapshots[i] is None:
+            annual = {}
+            for values in self._vintage_values[:i + 1]:
+                for year, ppp in values.items():
+                    annual.setdefault(year, {}).update(ppp)
+            published = self._vintage_keys[i]
+            reference = {year: row for year, row in self._reference.items()
+                         if period_ordinal(f"{year + 1}-{ANNUAL_VINTAGE_MONTH:02d}") <= published}
+            self._snapshots[i] = PPPStore(annual, reference)
+        return self._snapshots[i]
+
+
+@lru_cache(maxsize=None)
+def load_ppp_store(path: str = ANNUAL_CSV) -> PPPStore:
+    """PPPストアを読み込む（同一パスはプロセス内で一度だけ読む）"""
+    return PPPStore.from_csv(path)
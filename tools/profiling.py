@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+CLIツール共通の計測（ステージごとの時間・メモリ・行数）
+
+各スクリプトの処理を名前付きステージ（load / compute / write / analyze など）に分け、
+ステージごとに以下を JSON lines で1行ずつ出力する。
+
+  {"tool": "create_backtest_dataset", "stage": "load", "wall_s": 0.0123, "cpu_s": 0.0119,
+   "peak_bytes": 1048576, "rows": 47, "pid": 1234, "started": "2025-11-01T09:00:00"}
+
+  wall_s      経過時間（time.perf_counter）
+  cpu_s       プロセスCPU時間（time.process_time）
+  peak_bytes  ステージ中の tracemalloc のピーク（Pythonが確保したメモリ、絶対値）
+  rows        ステージが扱った行数（ツールが設定したときのみ）
+
+最後に stage="total" の行（計測開始から終了まで）を出す。
+
+有効化:
+  --profile フラグ、または環境変数 MCI_PROFILE
+    MCI_PROFILE=1            標準エラー出力に書く
+    MCI_PROFILE=prof.jsonl   ファイルに追記（夜間ジョブの複数ツールを1ファイルに集められる）
+  MCI_PROFILE_CPROFILE=dir   最上位ステージごとに cProfile の統計を dir/<tool>.<stage>.prof に保存
+                             （ステージ名の '/' はファイル名では '.'）
+                             （python3 -m pstats dir/<tool>.<stage>.prof で確認）
+
+無効時は何もしない共有オブジェクトを返すので、計測コードを残したままでもオーバーヘッドは
+メソッド呼び出し1回分。有効時は tracemalloc がメモリ確保ごとに記録するため処理自体が遅くなる。
+時間の比較は benchmarks/ で行い、ここではステージ間の配分とメモリを見る。
+
+使い方:
+  from profiling import add_profile_argument, pop_profile_flag, setup_profiler
+
+  prof = setup_profiler('create_backtest_dataset', pop_profile_flag())  # argparse を使わないスクリプト
+  with prof.stage('load') as stage:
+      df = pd.read_csv(path)
+      stage.rows = len(df)
+  with prof.stage('write', rows=len(df)):
+      df.to_csv(out)
+
+  add_profile_argument(parser)                                          # argparse を使うスクリプト
+  args = parser.parse_args()
+  prof = setup_profiler('backtest_with_rolling_avg', args.profile)
+"""
+
+import atexit
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import List, Optional
+
+ENV_VAR = 'MCI_PROFILE'
+CPROFILE_ENV_VAR = 'MCI_PROFILE_CPROFILE'
+FLAG = '--profile'
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+FALSE_VALUES = ('', '0', 'false', 'no', 'off')
+
+
+class NullStage:
+    """無効時のステージ（rows を設定しても何も起きない）"""
+
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullProfiler:
+    """無効時のプロファイラ（全ステージで同じ NullStage を返す）"""
+
+    enabled = False
+
+    def stage(self, name: str, rows: Optional[int] = None) -> NullStage:
+        return NULL_STAGE
+
+    def close(self):
+        pass
+
+
+NULL_STAGE = NullStage()
+NULL_PROFILER = NullProfiler()
+
+
+class Stage:
+    """計測中のステージ（with ブロック内で rows を設定できる）"""
+
+    def __init__(self, profiler: 'Profiler', name: str, rows: Optional[int]):
+        self.profiler = profiler
+        self.name = name
+        self.rows = rows
+        self.peak = 0
+        self._cprofile = None
+
+    def __enter__(self):
+        profiler = self.profiler
+        if profiler._stack:
+            # 親ステージのここまでのピークを退避してから測り直す
+            parent = profiler._stack[-1]
+            parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+        elif profiler.cprofile_dir:
+            self._cprofile = cProfile.Profile()
+        profiler._stack.append(self)
+        tracemalloc.reset_peak()
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.profiler.dump_path(self.name))
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        profiler = self.profiler
+        profiler._stack.pop()
+        if profiler._stack:
+            parent = profiler._stack[-1]
+            parent.peak = max(parent.peak, self.peak)
+        profiler._peak = max(profiler._peak, self.peak)
+        profiler.emit(self.name, wall, cpu, self.peak, self.rows, self.started)
+        return False
+
+
+class Profiler:
+    """
+    ステージ計測を JSON lines で書き出すプロファイラ
+
+    output が None なら標準エラー出力、パスならそのファイルに追記する。
+    cprofile_dir を指定すると最上位ステージごとに cProfile の統計を保存する。
+    """
+
+    enabled = True
+
+    def __init__(self, tool: str, output: Optional[str] = None, cprofile_dir: Optional[str] = None):
+        self.tool = tool
+        self.output = output
+        self.cprofile_dir = cprofile_dir
+        self._stack: List[Stage] = []
+        self._peak = 0
+        self._closed = False
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        if cprofile_dir:
+            os.makedirs(cprofile_dir, exist_ok=True)
+        self._file = open(output, 'a', encoding='utf-8') if output else None
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+
+    def stage(self, name: str, rows: Optional[int] = None) -> Stage:
+        return Stage(self, name, rows)
+
+    def dump_path(self, stage: str) -> str:
+        # 'fixed/load' のような階層付きの名前はファイル名では '.' 区切りにする
+        return os.path.join(self.cprofile_dir, f"{self.tool}.{stage.replace('/', '.')}.prof")
+
+    def emit(self, stage: str, wall: float, cpu: float, peak: int, rows: Optional[int], started: str):
+        record = {
+            'tool': self.tool,
+            'stage': stage,
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'peak_bytes': int(peak),
+            'rows': None if rows is None else int(rows),
+            'pid': os.getpid(),
+            'started': started,
+        }
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        stream = self._file or sys.stderr
+        stream.write(line)
+        stream.flush()
+
+    def close(self):
+        """stage="total" の行を書き、tracemalloc とファイルを閉じる（2回目以降は何もしない）"""
+        if self._closed:
+            return
+        self._closed = True
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+        self.emit('total', wall, cpu, peak, None, self.started)
+        if self._started_tracing:
+            tracemalloc.stop()
+        if self._file is not None:
+            self._file.close()
+
+
+def env_setting() -> str:
+    return os.environ.get(ENV_VAR, '').strip()
+
+
+def setup_profiler(tool: str, enabled: bool = False):
+    """
+    ツール用のプロファイラを返す
+
+    enabled（--profile）か環境変数 MCI_PROFILE で有効になる。無効なら NULL_PROFILER。
+    有効時は終了時に atexit で total 行を書く（close() を明示的に呼んでもよい）。
+    """
+    setting = env_setting()
+    if not enabled and setting.lower() in FALSE_VALUES:
+        return NULL_PROFILER
+    output = None if setting.lower() in TRUE_VALUES + FALSE_VALUES else setting
+    profiler = Profiler(tool, output, os.environ.get(CPROFILE_ENV_VAR) or None)
+    atexit.register(profiler.close)
+    return profiler
+
+
+def pop_profile_flag(argv: Optional[List[str]] = None) -> bool:
+    """argparse を使わないスクリプト用: argv から --profile を取り除き、指定されていたかを返す"""
+    argv = sys.argv if argv is None else argv
+    found = FLAG in argv
+    while FLAG in argv:
+        argv.remove(FLAG)
+    return found
+
+
+def add_profile_argument(parser):
+    """argparse のパーサに --profile を追加する"""
+    parser.add_argument(FLAG, action='store_true',
+                        help=f'ステージごとの時間・メモリ・行数をJSON linesで出力'
+                             f'（環境変数 {ENV_VAR}=1 または出力ファイル名でも有効）')
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+逐次更新の移動統計（平均・分散・最小・最大・分位点）
+
+値を1つ追加するたびに統計を更新するので、窓ごと・年ごとに過去の値を集計し直す必要がない。
+日次データ数十年分でも1回の走査で済む。
+
+  RunningStats  全期間の統計（Welford法の平均・分散、最小・最大）           1ステップ O(1)
+  RollingWindow 直近 window 個の統計（追加と削除の Welford 法、単調デックで最小・最大、
+                ブロック分割したソート済みリストで分位点）                  1ステップ O(1)、分位点を
+                                                                            保つ場合は O(log w + B)
+  MultiWindow   複数の窓を同じ値の列で同時に更新
+
+分散・標準偏差は母分散（n で割る）。既存の分析ツールと同じ定義。
+
+使い方:
+  from rolling_stats import RunningStats, MultiWindow
+  stats = RunningStats()
+  for x in values:
+      stats.push(x)
+  print(stats.mean, stats.std, stats.min, stats.max)
+
+  windows = MultiWindow([3, 5, 10])
+  for x in values:
+      if windows[10].full:
+          print(windows[10].mean, windows[10].std, windows[10].quantile(0.5))
+      windows.push(x)
+"""
+
+import math
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Dict, Iterable, Iterator, Sequence
+
+
+class RunningStats:
+    """全期間の平均・分散（Welford法）と最小・最大"""
+
+    def __init__(self, values: Iterable[float] = ()):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        for x in values:
+            self.push(x)
+
+    def push(self, x: float):
+        """値を1つ追加"""
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    @property
+    def variance(self) -> float:
+        """母分散（値がなければ NaN）"""
+        return self._m2 / self.count if self.count else math.nan
+
+    @property
+    def std(self) -> float:
+        """母標準偏差"""
+        return math.sqrt(self.variance)
+
+
+class SortedBlocks:
+    """
+    ブロック分割したソート済みリスト（分位点用）
+
+    値を長さ BLOCK〜2 × BLOCK のソート済みブロック（B = BLOCK、1つだけのときは任意の長さ）に分けて持つ。
+    追加・削除は各ブロックの最大値を二分探索して1ブロックだけを書き換えるので
+    O(log n + BLOCK)（1本のソート済みリストへの insort / del は O(n) の移動）。
+    k 番目の値はブロック長を先頭から数えるので O(n / BLOCK)。
+    """
+
+    BLOCK = 256
+
+    def __init__(self):
+        self._blocks = []
+        self._maxes = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, x: float):
+        """値を1つ追加"""
+        self._len += 1
+        if not self._blocks:
+            self._blocks.append([x])
+            self._maxes.append(x)
+            return
+        i = bisect_left(self._maxes, x)
+        if i == len(self._maxes):
+            i -= 1
+            self._blocks[i].append(x)
+            self._maxes[i] = x
+        else:
+            insort(self._blocks[i], x)
+        if len(self._blocks[i]) > 2 * self.BLOCK:
+            self._split(i)
+
+    def remove(self, x: float):
+        """値を1つ削除（存在する値であること）"""
+        i = bisect_left(self._maxes, x)
+        block = self._blocks[i]
+        del block[bisect_left(block, x)]
+        self._len -= 1
+        if len(block) >= self.BLOCK or len(self._blocks) == 1:
+            if block:
+                self._maxes[i] = block[-1]
+            else:
+                del self._blocks[i], self._maxes[i]
+            return
+        # 短くなったブロックは隣と結合（長すぎれば分け直す）
+        j = i - 1 if i > 0 else i
+        merged = self._blocks[j] + self._blocks[j + 1]
+        self._blocks[j:j + 2] = [merged]
+        self._maxes[j:j + 2] = [merged[-1]]
+        if len(merged) > 2 * self.BLOCK:
+            self._split(j)
+
+    def _split(self, i: int):
+        block = self._blocks[i]
+        half = len(block) // 2
+        self._blocks[i:i + 1] = [block[:half], block[half:]]
+        self._maxes[i:i + 1] = [block[half - 1], block[-1]]
+
+    def __getitem__(self, k: int) -> float:
+        """小さい方から k 番目（0始まり）の値"""
+        if not 0 <= k < self._len:
+            raise IndexError(k)
+        for block in self._blocks:
+            if k < len(block):
+                return block[k]
+            k -= len(block)
+
+
+class RollingWindow:
+    """
+    直近 window 個の値の平均・分散・最小・最大・分位点
+
+    平均・分散は値の追加と窓から外れた値の削除を Welford 法で更新する。
+    最小・最大は単調デック（(位置, 値) を単調に保つ）、分位点は SortedBlocks で求める。
+    """
+
+    def __init__(self, window: int, quantiles: bool = True):
+        if window < 1:
+            raise ValueError(f"window must be positive: {window}")
+        self.window = window
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._values = deque()
+        self._position = 0
+        self._min = deque()
+        self._max = deque()
+        self._sorted = SortedBlocks() if quantiles else None
+
+    @property
+    def full(self) -> bool:
+        """窓が埋まっているか"""
+        return self.count == self.window
+
+    def push(self, x: float):
+        """値を1つ追加（窓から外れた最古の値は削除）"""
+        if self.count == self.window:
+            self._remove(self._values.popleft())
+
+        self._values.append(x)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+
+        # 単調デック: 新しい値より大きい（小さい）値は今後最小（最大）にならない
+        position = self._position
+        self._position += 1
+        while self._min and self._min[-1][1] >= x:
+            self._min.pop()
+        self._min.append((position, x))
+        while self._max and self._max[-1][1] <= x:
+            self._max.pop()
+        self._max.append((position, x))
+        oldest = position - self.window
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+
+        if self._sorted is not None:
+            self._sorted.add(x)
+
+    def _remove(self, y: float):
+        self.count -= 1
+        if self.count == 0:
+            self.mean = 0.0
+            self._m2 = 0.0
+        else:
+            delta = y - self.mean
+            self.mean -= delta / self.count
+            self._m2 = max(self._m2 - delta * (y - self.mean), 0.0)
+        if self._sorted is not None:
+            self._sorted.remove(y)
+
+    @property
+    def variance(self) -> float:
+        """窓内の母分散（値がなければ NaN）"""
+        return self._m2 / self.count if self.count else math.nan
+
+    @property
+    def std(self) -> float:
+        """窓内の母標準偏差"""
+        return math.sqrt(self.variance)
+
+    @property
+    def min(self) -> float:
+        return self._min[0][1] if self.count else math.nan
+
+    @property
+    def max(self) -> float:
+        return self._max[0][1] if self.count else math.nan
+
+    def values(self) -> Sequence[float]:
+        """窓内の値（古い順）"""
+        return tuple(self._values)
+
+    def quantile(self, q: float) -> float:
+        """窓内の分位点（numpy.quantile の既定と同じ線形補間）"""
+        if self._sorted is None:
+            raise ValueError("RollingWindow was created with quantiles=False")
+        if not self.count:
+            return math.nan
+        pos = q * (self.count - 1)
+        lo = int(math.floor(pos))
+        hi = min(lo + 1, self.count - 1)
+        low = self._sorted[lo]
+        return low + (self._sorted[hi] - low) * (pos - lo)
+
+
+class MultiWindow:
+    """複数の窓の RollingWindow をまとめて更新する"""
+
+    def __init__(self, windows: Iterable[int], quantiles: bool = True):
+        self.windows: Dict[int, RollingWindow] = {w: RollingWindow(w, quantiles) for w in windows}
+
+    def push(self, x: float):
+        """全ての窓に値を1つ追加"""
+        for window in self.windows.values():
+            window.push(x)
+
+    def __getitem__(self, window: int) -> RollingWindow:
+        return self.windows[window]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.windows)
+
+
+def rolling(values: Iterable[float], window: int, quantiles: bool = False) -> Iterator[RollingWindow]:
+    """値を1つずつ追加しながら、その時点の RollingWindow を返す"""
+    stats = RollingWindow(window, quantiles)
+    for x in values:
+        stats.push(x)
+        yield stats
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+圧縮・メモリマップのティックストア（通貨ペアごとのセグメントファイル）
+
+数年分の USDJPY / USDTRY / TRYJPY のティック (時刻 int64 ns, bid float64, ask float64) を
+dataset/ticks/ に置くためのバイナリ形式。追記は新しいセグメントを書いてから manifest を差し替えるだけで、
+既存のセグメントは書き直さない。
+
+ディレクトリ構成（例: dataset/ticks/）:
+  manifest.json          # {"format": "mci-ticks", "version": 1, "pairs": {"USDJPY": [セグメント, ...]}}
+  USDJPY/000001.seg      # zlib: ブロックを連結したファイル
+  USDJPY/000001.idx.npy  # 疎な時刻インデックス（ブロックごとの先頭・末尾の時刻、先頭行、各列のバイト位置）
+  USDJPY/000002.ts       # raw: 列ごとの生配列（.ts / .bid / .ask）
+  ...
+
+セグメントの形式（encoding）:
+  zlib  block_rows 行ごとのブロックに分け、時刻は前の行との差分を zigzag 符号化、
+        bid/ask はバイト単位で並べ替え（shuffle）てから zlib で圧縮する。範囲読み込みでは
+        インデックスで対象ブロックだけを選び、メモリマップから該当バイトだけを展開する
+  raw   無圧縮の列配列。範囲読み込みはメモリマップ上のビュー（コピーなし）を返す
+
+時刻の範囲は [start, end)（start 以上 end 未満）。start / end は int64 ns、datetime64、'2025-01-01' などの文字列。
+同じペアへの追記は時刻順（前回の最後の時刻以上）に限る。小さな追記でセグメントが増えたら compact でまとめる。
+
+使い方:
+  python3 tools/tick_store.py import dataset/ticks USDJPY usdjpy_ticks.csv.gz
+  python3 tools/tick_store.py info dataset/ticks
+  python3 tools/tick_store.py export dataset/ticks USDJPY out.csv --start 2025-01-01 --end 2025-02-01
+  python3 tools/tick_store.py compact dataset/ticks USDJPY --encoding raw
+  python3 tools/tick_store.py mci dataset/ticks --start 2024-01 --end 2025-01 --freq D --how close
+
+  from tick_store import TickStore
+  store = TickStore('dataset/ticks')
+  store.append('USDJPY', ts, bid, ask)
+  ticks = store.read_range('USDJPY', '2025-01-01', '2025-02-01')   # {'ts', 'bid', 'ask'}
+  for ts, bid, ask in store.iter_range('USDJPY', '2025-01-01'):     # ブロック（raw はセグメント）単位
+      ...
+"""
+
+import argparse
+import bisect
+import csv
+import json
+import os
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from fx_ingest import (CHUNK_ROWS, EPOCH_UNITS, FREQUENCIES, METHODS, OUTPUT_COLUMNS, BucketAccumulator,
+                       build_mci, detect_columns, parse_times, write_columns)
+
+MANIFEST = 'manifest.json'
+FORMAT_NAME = 'mci-ticks'
+FORMAT_VERSION = 1
+ENCODINGS = ('zlib', 'raw')
+PAIRS = ('USDJPY', 'USDTRY', 'TRYJPY')
+COLUMNS = ('ts', 'bid', 'ask')
+
+# 1ブロックの行数（zlib では展開の単位、raw では疎インデックスの間隔）
+BLOCK_ROWS = 1 << 16
+COMPRESSION_LEVEL = 6
+
+# 疎インデックスの1行（ブロックごと）。ts / bid / ask は各列のバイト位置、end は zlib ブロックの終端
+INDEX_DTYPE = np.dtype([('first', '<i8'), ('last', '<i8'), ('row', '<i8'),
+                        ('ts', '<i8'), ('bid', '<i8'), ('ask', '<i8'), ('end', '<i8')])
+
+
+def to_ns(value) -> Optional[int]:
+    """範囲指定を int64 ns に変換（None はそのまま）"""
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(np.datetime64(value).astype('M8[ns]').astype(np.int64))
+
+
+def zigzag_encode(deltas: np.ndarray) -> np.ndarray:
+    """符号付き差分を符号なし整数に（0, -1, 1, -2, ... -> 0, 1, 2, 3, ...）"""
+    deltas = deltas.astype('<i8')
+    return ((deltas << 1) ^ (deltas >> 63)).view('<u8')
+
+
+def zigzag_decode(values: np.ndarray) -> np.ndarray:
+    values = values.view('<u8')
+    return ((values >> np.uint64(1)) ^ (np.uint64(0) - (values & np.uint64(1)))).view('<i8')
+
+
+def shuffle(values: np.ndarray) -> bytes:
+    """8バイト値を「全要素の1バイト目、2バイト目、…」の順に並べ替える（圧縮率が上がる）"""
+    return np.ascontiguousarray(values).view(np.uint8).reshape(-1, 8).T.tobytes()
+
+
+def unshuffle(data: bytes, dtype: str) -> np.ndarray:
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(8, -1)
+    return np.ascontiguousarray(planes.T).view(dtype).ravel()
+
+
+def encode_block(ts: np.ndarray, bid: np.ndarray, ask: np.ndarray, level: int = COMPRESSION_LEVEL) -> List[bytes]:
+    """1ブロックを [時刻, bid, ask] の圧縮バイト列に（時刻は先頭からの差分、先頭の値はインデックスに持つ）"""
+    deltas = np.diff(ts, prepend=ts[:1])
+    return [zlib.compress(shuffle(zigzag_encode(deltas)), level),
+            zlib.compress(shuffle(bid.astype('<f8')), level),
+            zlib.compress(shuffle(ask.astype('<f8')), level)]
+
+
+def decode_block(buffer, entry) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """インデックスの1行が指すブロックを展開"""
+    ts = np.cumsum(zigzag_decode(unshuffle(zlib.decompress(buffer[entry['ts']:entry['bid']]), '<u8')))
+    ts += entry['first']
+    bid = unshuffle(zlib.decompress(buffer[entry['bid']:entry['ask']]), '<f8')
+    ask = unshuffle(zlib.decompress(buffer[entry['ask']:entry['end']]), '<f8')
+    return ts, bid, ask
+
+
+class SegmentWriter:
+    """
+    1セグメントを書き出す（write() を何回呼んでもよい、close() でインデックスを保存）
+
+    ファイルは一時名で書き、close() で本来の名前に置き換える。
+    """
+
+    def __init__(self, directory: str, name: str, encoding: str = 'zlib',
+                 block_rows: int = BLOCK_ROWS, level: int = COMPRESSION_LEVEL):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding {encoding}, expected one of {ENCODINGS}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.name = name
+        self.encoding = encoding
+        self.block_rows = block_rows
+        self.level = level
+        self.rows = 0
+        self._index = []
+        self._pending = [np.empty(0, '<i8'), np.empty(0, '<f8'), np.empty(0, '<f8')]
+        suffixes = ('.seg',) if encoding == 'zlib' else ('.ts', '.bid', '.ask')
+        self.files = [name + suffix for suffix in suffixes]
+        self._handles = [open(os.path.join(directory, f + '.tmp'), 'wb') for f in self.files]
+
+    def write(self, ts: np.ndarray, bid: np.ndarray, ask: np.ndarray):
+        ts = np.asarray(ts, dtype='<i8')
+        if self.encoding == 'raw':
+            self._write_raw(ts, np.asarray(bid, '<f8'), np.asarray(ask, '<f8'))
+            return
+        pending = [np.concatenate([p, np.asarray(x)]) for p, x in zip(self._pending, (ts, bid, ask))]
+        full = len(pending[0]) // self.block_rows * self.block_rows
+        for start in range(0, full, self.block_rows):
+            self._write_block(*(p[start:start + self.block_rows] for p in pending))
+        self._pending = [p[full:] for p in pending]
+
+    def _write_raw(self, ts, bid, ask):
+        for handle, values in zip(self._handles, (ts, bid, ask)):
+            handle.write(values.tobytes())
+        self.rows += len(ts)
+
+    def _raw_index(self) -> List[tuple]:
+        """raw の疎インデックス（block_rows 行ごとの先頭・末尾の時刻）を書き終えた時刻列から作る"""
+        if not self.rows:
+            return []
+        ts = np.memmap(os.path.join(self.directory, self.files[0] + '.tmp'), dtype='<i8', mode='r')
+        rows = np.arange(0, self.rows, self.block_rows)
+        lasts = np.minimum(rows + self.block_rows, self.rows) - 1
+        offsets = rows * 8
+        return list(zip(ts[rows].tolist(), ts[lasts].tolist(), rows.tolist(),
+                        offsets.tolist(), offsets.tolist(), offsets.tolist(), [0] * len(rows)))
+
+    def _write_block(self, ts, bid, ask):
+        handle = self._handles[0]
+        start = handle.tell()
+        payload = encode_block(ts, bid, ask, self.level)
+        offsets = np.cumsum([start] + [len(p) for p in payload]).tolist()
+        for p in payload:
+            handle.write(p)
+        self._index.append((ts[0], ts[-1], self.rows, *offsets))
+        self.rows += len(ts)
+
+    def close(self) -> Dict:
+        """残りを書き出してファイルを確定し、manifest に載せるセグメント情報を返す"""
+        if self.encoding == 'zlib' and len(self._pending[0]):
+            self._write_block(*self._pending)
+        for handle in self._handles:
+            handle.close()
+        if self.encoding == 'raw':
+            self._index = self._raw_index()
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        np.save(os.path.join(self.directory, self.name + '.idx.npy'), index, allow_pickle=False)
+        for f in self.files:
+            os.replace(os.path.join(self.directory, f + '.tmp'), os.path.join(self.directory, f))
+        return {
+            'name': self.name,
+            'encoding': self.encoding,
+            'rows': self.rows,
+            'first': int(index['first'][0]) if len(index) else None,
+            'last': int(index['last'][-1]) if len(index) else None,
+            'block_rows': self.block_rows,
+            'bytes': sum(os.path.getsize(os.path.join(self.directory, f)) for f in self.files),
+        }
+
+
+class Segment:
+    """読み込み用のセグメント（ファイルとインデックスは初めて読むときにメモリマップする）"""
+
+    def __init__(self, directory: str, entry: Dict):
+        self.directory = directory
+        self.entry = entry
+        self._index = None
+        self._maps = None
+
+    @property
+    def index(self) -> np.ndarray:
+        if self._index is None:
+            self._index = np.load(os.path.join(self.directory, self.entry['name'] + '.idx.npy'),
+                                  mmap_mode='r', allow_pickle=False)
+        return self._index
+
+    def _open(self):
+        if self._maps is None:
+            name = os.path.join(self.directory, self.entry['name'])
+            if self.entry['encoding'] == 'zlib':
+                self._maps = np.memmap(name + '.seg', dtype=np.uint8, mode='r')
+            else:
+                self._maps = tuple(np.memmap(name + suffix, dtype=dtype, mode='r')
+                                   for suffix, dtype in (('.ts', '<i8'), ('.bid', '<f8'), ('.ask', '<f8')))
+        return self._maps
+
+    def blocks(self, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+        """[start, end) と重なるブロック番号の範囲"""
+        index = self.index
+        lo = 0 if start is None else int(np.searchsorted(index['last'], start, 'left'))
+        hi = len(index) if end is None else int(np.searchsorted(index['first'], end, 'left'))
+        return lo, max(lo, hi)
+
+    def read(self, start: Optional[int], end: Optional[int]) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """[start, end) のティックを返す（raw は1つのビュー、zlib はブロックごとに展開した配列）"""
+        lo, hi = self.blocks(start, end)
+        if lo == hi:
+            return
+        index = self.index
+        if self.entry['encoding'] == 'raw':
+            ts, bid, ask = self._open()
+            row_lo = int(index['row'][lo])
+            row_hi = int(index['row'][hi]) if hi < len(index) else self.entry['rows']
+            window = ts[row_lo:row_hi]
+            i = row_lo + (0 if start is None else int(np.searchsorted(window, start, 'left')))
+            j = row_lo + (len(window) if end is None else int(np.searchsorted(window, end, 'left')))
+            if i < j:
+                yield ts[i:j], bid[i:j], ask[i:j]
+            return
+        buffer = self._open()
+        for b in range(lo, hi):
+            ts, bid, ask = decode_block(buffer, index[b])
+            i = 0 if start is None or b > lo else int(np.searchsorted(ts, start, 'left'))
+            j = len(ts) if end is None or b < hi - 1 else int(np.searchsorted(ts, end, 'left'))
+            if i < j:
+                yield ts[i:j], bid[i:j], ask[i:j]
+
+
+class TickStore:
+    """
+    通貨ペアごとのセグメントを manifest.json で管理するティックストア
+
+    Args:
+        path: ストアのディレクトリ（なければ最初の append で作る）
+        encoding: 新しいセグメントの形式（zlib / raw）
+        block_rows: 1ブロックの行数
+    """
+
+    def __init__(self, path: str, encoding: str = 'zlib', block_rows: int = BLOCK_ROWS,
+                 level: int = COMPRESSION_LEVEL):
+        self.path = path
+        self.encoding = encoding
+        self.block_rows = block_rows
+        self.level = level
+        self._segments: Dict[str, List[Segment]] = {}
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self) -> Dict:
+        path = os.path.join(self.path, MANIFEST)
+        if not os.path.isfile(path):
+            return {'format': FORMAT_NAME, 'version': FORMAT_VERSION, 'pairs': {}}
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != FORMAT_NAME or manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported tick store format in {self.path}")
+        return manifest
+
+    def _write_manifest(self):
+        # manifest は最後に書く（途中で失敗したセグメントは manifest に載らない）
+        os.makedirs(self.path, exist_ok=True)
+        tmp = os.path.join(self.path, MANIFEST + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+        self._segments.clear()
+
+    @property
+    def pairs(self) -> List[str]:
+        return sorted(self.manifest['pairs'])
+
+    def entries(self, pair: str) -> List[Dict]:
+        return self.manifest['pairs'].get(pair, [])
+
+    def segments(self, pair: str) -> List[Segment]:
+        if pair not in self._segments:
+            directory = os.path.join(self.path, pair)
+            self._segments[pair] = [Segment(directory, entry) for entry in self.entries(pair)]
+        return self._segments[pair]
+
+    def rows(self, pair: str) -> int:
+        return sum(entry['rows'] for entry in self.entries(pair))
+
+    def span(self, pair: str) -> Tuple[Optional[int], Optional[int]]:
+        """ペアの最初と最後の時刻（ns）"""
+        entries = self.entries(pair)
+        return (entries[0]['first'], entries[-1]['last']) if entries else (None, None)
+
+    def _next_name(self, pair: str) -> str:
+        entries = self.entries(pair)
+        return f"{int(entries[-1]['name']) + 1 if entries else 1:06d}"
+
+    def append(self, pair: str, ts, bid, ask, encoding: Optional[str] = None) -> Optional[Dict]:
+        """
+        ティックを新しいセグメントとして追記
+
+        ts は int64 ns または datetime64。時刻順で、既存の最後の時刻以上であること（ValueError）。
+        """
+        ts = np.asarray(ts)
+        ts = ts.astype('M8[ns]').astype('<i8') if ts.dtype.kind == 'M' else ts.astype('<i8')
+        bid = np.asarray(bid, dtype='<f8')
+        ask = np.asarray(ask, dtype='<f8')
+        if not (len(ts) == len(bid) == len(ask)):
+            raise ValueError("ts, bid and ask must have the same length")
+        if not len(ts):
+            return None
+        if np.any(np.diff(ts) < 0):
+            raise ValueError(f"{pair}: timestamps must be sorted")
+        last = self.span(pair)[1]
+        if last is not None and ts[0] < last:
+            raise ValueError(f"{pair}: ticks must be appended in time order (store ends at {np.datetime64(last, 'ns')})")
+
+        writer = SegmentWriter(os.path.join(self.path, pair), self._next_name(pair),
+                               encoding or self.encoding, self.block_rows, self.level)
+        writer.write(ts, bid, ask)
+        entry = writer.close()
+        self.manifest['pairs'].setdefault(pair, []).append(entry)
+        self._write_manifest()
+        return entry
+
+    def iter_range(self, pair: str, start=None, end=None) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """[start, end) のティックを (ts, bid, ask) のチャンクで返す（重なるセグメント・ブロックだけを読む）"""
+        if pair not in self.manifest['pairs']:
+            raise KeyError(f"Pair {pair} not found in {self.path}")
+        start, end = to_ns(start), to_ns(end)
+        segments = self.segments(pair)
+        lasts = [s.entry['last'] for s in segments]
+        first = 0 if start is None else bisect.bisect_left(lasts, start)
+        for segment in segments[first:]:
+            if end is not None and segment.entry['first'] >= end:
+                break
+            yield from segment.read(start, end)
+
+    def read_range(self, pair: str, start=None, end=None) -> Dict[str, np.ndarray]:
+        """
+        [start, end) のティックを {'ts', 'bid', 'ask'} で返す
+
+        範囲が raw セグメント1つに収まるときはメモリマップ上のビュー（読み取り専用、コピーなし）。
+        それ以外は該当チャンクを連結した配列。
+        """
+        chunks = list(self.iter_range(pair, start, end))
+        if len(chunks) == 1:
+            return dict(zip(COLUMNS, chunks[0]))
+        if not chunks:
+            return {'ts': np.empty(0, '<i8'), 'bid': np.empty(0, '<f8'), 'ask': np.empty(0, '<f8')}
+        return {name: np.concatenate([c[k] for c in chunks]) for k, name in enumerate(COLUMNS)}
+
+    def compact(self, pair: str, encoding: Optional[str] = None) -> Dict:
+        """ペアの全セグメントを1つにまとめる（ブロック単位で読み書きするのでメモリは一定）"""
+        old = self.entries(pair)
+        writer = SegmentWriter(os.path.join(self.path, pair), self._next_name(pair),
+                               encoding or self.encoding, self.block_rows, self.level)
+        for ts, bid, ask in self.iter_range(pair):
+            writer.write(ts, bid, ask)
+        entry = writer.close()
+        self.manifest['pairs'][pair] = [entry]
+        self._write_manifest()
+        directory = os.path.join(self.path, pair)
+        for e in old:
+            suffixes = ('.seg',) if e['encoding'] == 'zlib' else ('.ts', '.bid', '.ask')
+            for suffix in suffixes + ('.idx.npy',):
+                os.remove(os.path.join(directory, e['name'] + suffix))
+        return entry
+
+
+def import_csv(store: TickStore, pair: str, path: str, chunksize: int = CHUNK_ROWS,
+               time_col: Optional[str] = None, time_format: Optional[str] = None, epoch: str = 's',
+               encoding: Optional[str] = None) -> int:
+    """
+    CSV（bid・ask 列、または価格列1つ）をチャンクごとにセグメントとして追記
+
+    列の検出と時刻の変換は fx_ingest と同じ。価格列が1つなら bid = ask = 価格。
+    """
+    time_col, price_cols, _ = detect_columns(path, time_col)
+    usecols = [time_col, *price_cols]
+    rows = 0
+    for chunk in pd.read_csv(path, usecols=usecols, dtype={c: np.float64 for c in price_cols},
+                             chunksize=chunksize, skipinitialspace=True):
+        ts = parse_times(chunk[time_col], time_format, epoch)
+        bid = chunk[price_cols[0]].to_numpy(dtype=np.float64)
+        ask = chunk[price_cols[-1]].to_numpy(dtype=np.float64)
+        valid = ~np.isnat(ts) & (bid > 0) & (ask > 0)
+        ts, bid, ask = ts[valid], bid[valid], ask[valid]
+        order = np.argsort(ts, kind='stable')
+        store.append(pair, ts[order], bid[order], ask[order], encoding)
+        rows += len(ts)
+    return rows
+
+
+def mci_window(store: TickStore, start=None, end=None, freq: str = 'M', how: str = 'mean',
+               ppp: str = 'annual', scheme: str = 'linear') -> Dict[str, np.ndarray]:
+    """
+    [start, end) のティック（仲値）を期間ごとに集約してMCIを計算（fx_ingest.build_mci と同じ列）
+
+    範囲に重なるブロックだけを読むので、長い履歴の一部の期間でも全体は展開しない。
+    """
+    if how == 'vwap':
+        raise ValueError("The tick store has no volume; use mean or close")
+    rates = {}
+    for pair in PAIRS:
+        if pair not in store.manifest['pairs']:
+            continue
+        accumulator = BucketAccumulator(freq)
+        for ts, bid, ask in store.iter_range(pair, start, end):
+            accumulator.add(ts.view('M8[ns]'), (bid + ask) / 2)
+        rates[pair] = accumulator.result(how)
+    missing = [pair for pair in ('USDJPY', 'USDTRY') if pair not in rates]
+    if missing:
+        raise KeyError(f"{', '.join(missing)} not found in {store.path}")
+    return build_mci(rates, ppp, scheme)
+
+
+def format_ns(value: Optional[int]) -> str:
+    return '-' if value is None else str(np.datetime64(value, 'ns').astype('M8[s]'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='圧縮・メモリマップのティックストア')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    imp = sub.add_parser('import', help='CSVのティックを追記')
+    imp.add_argument('store', help='ストアのディレクトリ（例: dataset/ticks）')
+    imp.add_argument('pair', help='通貨ペア（例: USDJPY）')
+    imp.add_argument('csv', nargs='+', help='入力CSV（時刻順に並べて指定）')
+    imp.add_argument('--encoding', choices=ENCODINGS, default='zlib', help='セグメントの形式（既定: zlib）')
+    imp.add_argument('--block-rows', type=int, default=BLOCK_ROWS, help=f'1ブロックの行数（既定: {BLOCK_ROWS}）')
+    imp.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                     help=f'1セグメントあたりの最大行数（既定: {CHUNK_ROWS}）')
+    imp.add_argument('--time-col', help='時刻列（既定: 自動検出）')
+    imp.add_argument('--time-format', help='時刻の書式（既定: ISO8601）')
+    imp.add_argument('--epoch', choices=EPOCH_UNITS, default='s', help='数値の時刻の単位（既定: s）')
+
+    info = sub.add_parser('info', help='ペアごとの行数・期間・サイズ')
+    info.add_argument('store')
+
+    export = sub.add_parser('export', help='範囲のティックをCSVに出力')
+    export.add_argument('store')
+    export.add_argument('pair')
+    export.add_argument('csv')
+    export.add_argument('--start', help='開始（含む、例: 2025-01-01）')
+    export.add_argument('--end', help='終了（含まない）')
+
+    compact = sub.add_parser('compact', help='ペアのセグメントを1つにまとめる')
+    compact.add_argument('store')
+    compact.add_argument('pair')
+    compact.add_argument('--encoding', choices=ENCODINGS, help='まとめた後の形式（既定: zlib）')
+
+    mci = sub.add_parser('mci', help='範囲のティックを集約してMCIを計算')
+    mci.add_argument('store')
+    mci.add_argument('--start', help='開始（含む）')
+    mci.add_argument('--end', help='終了（含まない）')
+    mci.add_argument('--freq', choices=FREQUENCIES, default='M', help='集約頻度（既定: M）')
+    mci.add_argument('--how', choices=[m for m in METHODS if m != 'vwap'], default='mean', help='集約方法（既定: mean）')
+    mci.add_argument('--ppp', choices=('annual', 'interpolated'), default='annual', help='PPP（既定: annual）')
+    mci.add_argument('--output', default='mci_ticks.csv', help='出力CSV（既定: mci_ticks.csv）')
+
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        store = TickStore(args.store, args.encoding, args.block_rows)
+        for path in args.csv:
+            rows = import_csv(store, args.pair, path, args.chunk_rows, args.time_col, args.time_format, args.epoch)
+            print(f"✓ {path} -> {args.store}/{args.pair} ({rows}行)")
+    elif args.command == 'info':
+        store = TickStore(args.store)
+        print(f"{'pair':<8} {'rows':>12} {'segments':>8} {'MB':>9} {'B/tick':>7}  期間")
+        for pair in store.pairs:
+            entries = store.entries(pair)
+            rows = store.rows(pair)
+            size = sum(e['bytes'] for e in entries)
+            first, last = store.span(pair)
+            print(f"{pair:<8} {rows:>12} {len(entries):>8} {size / 1e6:>9.1f} {size / max(rows, 1):>7.2f}  "
+                  f"{format_ns(first)} 〜 {format_ns(last)}")
+    elif args.command == 'export':
+        store = TickStore(args.store)
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['timestamp', 'bid', 'ask'])
+            rows = 0
+            for ts, bid, ask in store.iter_range(args.pair, args.start, args.end):
+                stamps = np.datetime_as_string(ts.view('M8[ns]'), unit='auto')
+                writer.writerows(zip(stamps.tolist(), bid.tolist(), ask.tolist()))
+                rows += len(ts)
+        print(f"✓ {args.store}/{args.pair} -> {args.csv} ({rows}行)")
+    elif args.command == 'compact':
+        store = TickStore(args.store)
+        entry = store.compact(args.pair, args.encoding)
+        print(f"✓ {args.pair}: {entry['rows']}行を1セグメントにまとめました（{entry['encoding']}, {entry['bytes'] / 1e6:.1f} MB）")
+    else:
+        columns = mci_window(TickStore(args.store), args.start, args.end, args.freq, args.how, args.ppp)
+        names = OUTPUT_COLUMNS + [c for c in ('S_TRYJPY_market', 'triangle_gap') if c in columns]
+        write_columns(columns, names, args.output)
+        print(f"✓ {args.output} に保存しました（{len(columns['date'])}期間）")
+
+
+if __name__ == '__main__':
+    main()